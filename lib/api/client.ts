@@ -115,6 +115,25 @@ class ApiClient {
     }
   }
 
+  async getQuestionsBatch(questionIds: string[]): Promise<Question[]> {
+    if (questionIds.length === 0) return [];
+    try {
+      // 长列表走 POST，避免 URL 过长
+      const response =
+        questionIds.length > 50
+          ? await this.client.post<Question[]>('/api/questions/batch', {
+              ids: questionIds.map(Number),
+            })
+          : await this.client.get<Question[]>('/api/questions/batch', {
+              params: { ids: questionIds.join(',') },
+            });
+      return response.data || [];
+    } catch (error) {
+      console.error('Error getting questions batch:', error);
+      return [];
+    }
+  }
+
   async getQuestions(paperId?: string, topic?: string, difficulty?: string): Promise<Question[]> {
     try {
       const params = new URLSearchParams();
@@ -1,14 +1,85 @@
 """
 数据库连接和会话管理
+
+DB_PROFILE 选择数据库配置：
+- default：默认配置，读写共用一个异步引擎
+- production：SQLite 生产配置，开启 WAL 并调优 pragma；
+  读请求使用只读连接池（DB_READ_POOL_SIZE），所有写操作经由单个写连接串行执行，
+  大批量导入期间读请求不受阻塞
+
+SQLite 的所有连接都会开启 foreign_keys，子表的 ON DELETE CASCADE 依赖此设置。
+
+进程内所有写操作（写会话、后台导入、快照恢复、预渲染缓存回写）先取得同一把写锁，
+串行执行：后台导入使用同步引擎，不经过写引擎的连接池，
+没有写锁时其它写操作会在 busy_timeout 后以 "database is locked" 失败。
+等待写锁超过 DB_WRITE_TIMEOUT_SECONDS（默认 300 秒）时写会话返回 503。
+写锁只在单个进程内有效，多 worker 部署时进程之间仍依赖 SQLite 的 busy_timeout。
 """
+import asyncio
 import os
-from sqlalchemy import create_engine
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from dotenv import load_dotenv
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./question_bank.db")
+DB_PROFILE = os.getenv("DB_PROFILE", "default")
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+PRODUCTION = DB_PROFILE == "production" and IS_SQLITE
+
+
+def _to_async_url(url: str) -> str:
+    """同步数据库 URL 转换为对应的异步驱动 URL"""
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if url.startswith("postgresql:"):
+        return url.replace("postgresql:", "postgresql+asyncpg:", 1)
+    return url
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", _to_async_url(DATABASE_URL))
+
+# 生产配置的 SQLite pragma
+PRODUCTION_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",  # WAL 模式下 NORMAL 即可保证一致性
+    "cache_size": -int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536")),  # 负数表示 KB
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "temp_store": "MEMORY",
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+}
+READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "8"))
+WRITE_TIMEOUT_SECONDS = float(os.getenv("DB_WRITE_TIMEOUT_SECONDS", "300"))
+
+
+def _install_pragmas(sync_engine, read_only: bool = False):
+    """在每个新连接上执行生产配置的 pragma"""
+    @event.listens_for(sync_engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in PRODUCTION_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+
+def _enable_foreign_keys(sync_engine):
+    """SQLite 默认不检查外键，在每个新连接上开启"""
+    @event.listens_for(sync_engine, "connect")
+    def _set_foreign_keys(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
 
 # 创建数据库引擎
 engine = create_engine(
@@ -17,24 +88,120 @@ engine = create_engine(
     echo=False
 )
 
-# 创建会话工厂
+# 创建会话工厂（脚本和建表使用）
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 异步引擎和会话工厂（API 路由使用，查询不阻塞事件循环）
+if PRODUCTION:
+    _install_pragmas(engine)
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=READ_POOL_SIZE,
+        max_overflow=0,
+        echo=False
+    )
+    _install_pragmas(async_engine.sync_engine, read_only=True)
+    # 单连接写引擎：写事务在连接池上排队，避免争抢 SQLite 写锁
+    async_write_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=WRITE_TIMEOUT_SECONDS,
+        echo=False
+    )
+    _install_pragmas(async_write_engine.sync_engine)
+else:
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, echo=False)
+    async_write_engine = async_engine
+
+if IS_SQLITE:
+    for _engine in {engine, async_engine.sync_engine, async_write_engine.sync_engine}:
+        _enable_foreign_keys(_engine)
+
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+AsyncWriteSessionLocal = async_sessionmaker(
+    async_write_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 
-def get_db():
-    """获取数据库会话"""
-    db = SessionLocal()
+_write_lock = threading.Lock()
+WRITE_LOCK_POLL_SECONDS = 0.05
+
+
+class WriteLockTimeout(Exception):
+    """等待写锁超时"""
+
+
+@contextmanager
+def write_lock(timeout: Optional[float] = WRITE_TIMEOUT_SECONDS):
+    """
+    取得进程内写锁（同步代码使用，如后台导入线程）
+
+    timeout 为 None 时一直等待，为 0 时不等待；超时抛出 WriteLockTimeout。
+    """
+    if not _acquire_write_lock(timeout):
+        raise WriteLockTimeout("等待写锁超时")
     try:
-        yield db
+        yield
     finally:
-        db.close()
+        _write_lock.release()
 
 
-def init_db():
-    """初始化数据库"""
-    from app.models.database import Base
-    Base.metadata.create_all(bind=engine)
+def _acquire_write_lock(timeout: Optional[float]) -> bool:
+    if timeout == 0:
+        return _write_lock.acquire(blocking=False)
+    return _write_lock.acquire(timeout=-1 if timeout is None else timeout)
+
+
+async def acquire_write_lock(timeout: Optional[float] = WRITE_TIMEOUT_SECONDS) -> bool:
+    """
+    异步取得进程内写锁，超时返回 False
 
+    轮询等待而不是在线程池中阻塞：请求被取消时不会留下一个稍后才取得锁、无人释放的线程。
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while not _write_lock.acquire(blocking=False):
+        if deadline is not None and time.monotonic() >= deadline:
+            return False
+        await asyncio.sleep(WRITE_LOCK_POLL_SECONDS)
+    return True
 
 
+def release_write_lock():
+    """释放 acquire_write_lock 取得的写锁"""
+    _write_lock.release()
 
+
+async def get_db():
+    """获取异步数据库会话（只读）"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_write_db():
+    """获取异步数据库会话（写操作），持有写锁直到请求结束"""
+    if not await acquire_write_lock():
+        raise HTTPException(status_code=503, detail="写操作繁忙（正在导入数据），请稍后重试")
+    try:
+        async with AsyncWriteSessionLocal() as db:
+            yield db
+    finally:
+        release_write_lock()
+
+
+def init_db():
+    """初始化数据库（建表，并把旧版本建立的数据库升级到当前表结构，见 app.services.schema）"""
+    from app.services.schema import upgrade_schema
+    from app.services.search import init_search_index
+    upgrade_schema(engine)
+    init_search_index(engine)
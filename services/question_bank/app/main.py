@@ -1,13 +1,18 @@
 """
 题库管理服务主应用
 """
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 import os
 from dotenv import load_dotenv
 
-from app.database import init_db
-from app.routers import questions, admin
+from app.database import init_db, engine, async_engine, async_write_engine
+from app.middleware import CompressionMiddleware, MetricsMiddleware
+from app.models.database import Base
+from app.routers import questions, admin, embedded, images
+from app.services.snapshot import restore_on_startup
+from app.services.embedded import EMBEDDED_MODE, EMBEDDED_INDEX_PATH, load_bank
+from app.services import metrics
 
 load_dotenv()
 
@@ -28,19 +33,50 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# 注册路由
-app.include_router(questions.router)
-app.include_router(admin.router)
+# 响应压缩（gzip/brotli，按 Accept-Encoding 协商）
+app.add_middleware(CompressionMiddleware)
+
+# 运行时指标：最外层中间件记录完整耗时（含压缩），SQL 计数通过引擎和 ORM 事件采集
+if metrics.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    for _engine in {engine, async_engine.sync_engine, async_write_engine.sync_engine}:
+        metrics.instrument_engine(_engine)
+    metrics.instrument_orm(Base)
+
+# 注册路由（嵌入模式只提供只读接口，数据来自内存索引；图片库接口两种模式共用）
+if EMBEDDED_MODE:
+    app.include_router(embedded.router)
+else:
+    app.include_router(questions.router)
+    app.include_router(admin.router)
+app.include_router(images.router)
 
 
 @app.on_event("startup")
 async def startup_event():
-    """应用启动时初始化数据库"""
+    """应用启动时初始化数据库（配置了 SNAPSHOT_RESTORE_PATH 时先从快照恢复空库）"""
+    if EMBEDDED_MODE:
+        print(f"📚 嵌入模式，载入题库索引: {EMBEDDED_INDEX_PATH}")
+        bank = load_bank()
+        print(f"✅ 已载入 {bank.stats.total_papers} 套试卷、{bank.stats.total_questions} 道题目")
+        return
+    
+    manifest = restore_on_startup()
+    if manifest:
+        print(f"📦 已从快照恢复: {manifest['name']} {manifest['rows']}")
     print("🚀 初始化数据库...")
     init_db()
     print("✅ 数据库初始化完成")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """应用关闭时释放数据库连接池"""
+    await async_engine.dispose()
+    if async_write_engine is not async_engine:
+        await async_write_engine.dispose()
+
+
 @app.get("/")
 async def root():
     """根路径"""
@@ -58,6 +94,12 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus 文本格式的运行时指标"""
+    return Response(content=metrics.render_metrics(), media_type=metrics.CONTENT_TYPE)
+
+
 if __name__ == "__main__":
     import uvicorn
     host = os.getenv("HOST", "0.0.0.0")
@@ -0,0 +1,145 @@
+"""
+响应压缩和指标采集中间件
+
+按 Accept-Encoding 协商压缩方式（brotli 优先，其次 gzip），只压缩
+JSON/文本类且不小于 COMPRESSION_MIN_SIZE 字节的响应。
+分块发送的流式响应（如快照下载）原样透传，不做缓冲。
+
+brotli 为可选依赖，未安装时只提供 gzip。
+
+指标采集见 MetricsMiddleware 和 app.services.metrics。
+"""
+import gzip
+import os
+import time
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.services import metrics
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - 未安装 brotli 时退回 gzip
+    brotli = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+# 动态响应使用较低的 brotli 质量，压缩率已明显优于 gzip 且耗时相近
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript")
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """根据 Accept-Encoding 选择压缩方式，不接受压缩时返回 None"""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+
+    wildcard = accepted.get("*", 0.0)
+    if brotli is not None and accepted.get("br", wildcard) > 0:
+        return "br"
+    if accepted.get("gzip", wildcard) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """压缩响应体"""
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def _is_compressible(content_type: Optional[str]) -> bool:
+    return bool(content_type) and content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    """协商式 gzip/brotli 压缩（纯 ASGI 实现，不影响流式响应）"""
+
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        start_message: Optional[Message] = None
+
+        async def send_wrapper(message: Message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                # 等拿到响应体再决定是否压缩
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            headers = MutableHeaders(raw=start_message["headers"])
+            body = message.get("body", b"")
+            compressible = _is_compressible(headers.get("content-type"))
+            if compressible:
+                headers.add_vary_header("Accept-Encoding")
+
+            if (
+                encoding is not None
+                and compressible
+                and not message.get("more_body", False)
+                and "content-encoding" not in headers
+                and len(body) >= self.minimum_size
+            ):
+                body = compress(body, encoding)
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(body))
+                message = {"type": "http.response.body", "body": body, "more_body": False}
+
+            await send(start_message)
+            start_message = None
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class MetricsMiddleware:
+    """记录请求耗时、状态码、正在处理的请求数和每个请求的 SQL 计数（纯 ASGI 实现）"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = metrics.begin_request()
+        status = 500  # 未发出响应就抛出异常时按 500 记录
+
+        async def send_wrapper(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # 路由匹配后 FastAPI 把匹配到的路由写入 scope，用路由模板作标签
+            route = getattr(scope.get("route"), "path", metrics.UNMATCHED_ROUTE)
+            metrics.end_request(stats, scope["method"], route, status, time.perf_counter() - start)
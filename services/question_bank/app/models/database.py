@@ -1,9 +1,19 @@
 """
 数据库模型定义
+
+子表外键均为 ON DELETE CASCADE（SQLite 连接上开启了 foreign_keys），
+删除试卷时由数据库级联删除章节、题目和图片，ORM 不加载子对象
+（关系设置 passive_deletes=True）。
+
+差量导入保留已有行的ID，新增的章节和题目ID更大，ID 顺序不等于试卷中的顺序：
+试卷的章节按 order_index、章节的题目按题号排序加载。
 """
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, JSON
+from sqlalchemy import (
+    BigInteger, Column, Integer, SmallInteger, String, Text, ForeignKey, DateTime, JSON,
+    Index, LargeBinary, UniqueConstraint
+)
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import query_expression, relationship
 from datetime import datetime
 
 Base = declarative_base()
@@ -12,48 +22,78 @@ Base = declarative_base()
 class Paper(Base):
     """试卷表"""
     __tablename__ = "papers"
+    __table_args__ = (
+        # 试卷查询和导入去重都按 (年份, 省份, 科目) 精确匹配
+        UniqueConstraint("year", "province", "subject", name="uq_papers_year_province_subject"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     year = Column(Integer, nullable=False, index=True)
     province = Column(String(50), nullable=False, index=True)
-    subject = Column(String(100), nullable=False)
+    subject = Column(String(100), nullable=False, index=True)
     exam_type = Column(String(50), nullable=False)
+    # 冗余计数（导入时写入，列表接口直接读取）
+    total_sections = Column(Integer, nullable=False, default=0)
+    total_questions = Column(Integer, nullable=False, default=0)
+    total_images = Column(Integer, nullable=False, default=0)
+    content_hash = Column(String(40), nullable=True)  # 整张试卷内容的哈希（差量导入用）
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # 关联
-    sections = relationship("Section", back_populates="paper", cascade="all, delete-orphan")
+    sections = relationship("Section", back_populates="paper", cascade="all, delete-orphan",
+                            passive_deletes=True, order_by="Section.order_index")
 
 
 class Section(Base):
     """章节表"""
     __tablename__ = "sections"
+    __table_args__ = (
+        # 试卷内按章节顺序遍历（题目列表的排序键）
+        Index("ix_sections_paper_order", "paper_id", "order_index", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    paper_id = Column(Integer, ForeignKey("papers.id"), nullable=False)
+    paper_id = Column(Integer, ForeignKey("papers.id", ondelete="CASCADE"), nullable=False, index=True)
     section_number = Column(String(10), nullable=False)  # 一、二、三
     section_name = Column(String(100), nullable=False)  # 单项选择题、填空题等
     order_index = Column(Integer, nullable=False)  # 排序
+    content_hash = Column(String(40), nullable=True)  # 章节字段的哈希
     
     # 关联
     paper = relationship("Paper", back_populates="sections")
-    questions = relationship("Question", back_populates="section", cascade="all, delete-orphan")
+    questions = relationship("Question", back_populates="section", cascade="all, delete-orphan",
+                             passive_deletes=True, order_by="[Question.question_number, Question.id]")
 
 
 class Question(Base):
     """题目表"""
     __tablename__ = "questions"
+    __table_args__ = (
+        # 章节内按题号遍历（题目列表的排序键）
+        Index("ix_questions_section_number", "section_id", "question_number", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    section_id = Column(Integer, ForeignKey("sections.id"), nullable=False)
+    section_id = Column(Integer, ForeignKey("sections.id", ondelete="CASCADE"), nullable=False, index=True)
     question_number = Column(Integer, nullable=False)  # 题号
     content = Column(Text, nullable=False)  # 题目内容（Markdown格式）
     answer = Column(Text, nullable=True)  # 答案和解析（Markdown格式）
+    content_hash = Column(String(40), nullable=True)  # 题目及其图片的哈希
+    # 标注元数据（scripts/annotate_question_bank.py 写入试卷 JSON 的 metadata，未标注时为空）
+    difficulty = Column(Integer, nullable=True)  # 难度 1-5
+    time_estimate_sec = Column(Integer, nullable=True)  # 预估用时（秒）
+    concept_tags = Column(JSON, nullable=True)  # 知识点标签列表
+    skills = Column(JSON, nullable=True)  # 能力要求列表
+    minhash = Column(LargeBinary, nullable=True)  # 题目内容的 MinHash 签名（见 app.services.similarity）
     created_at = Column(DateTime, default=datetime.utcnow)
+    # 题目内容开头的截取（仅在查询通过 with_expression 请求时加载，见 app.services.fieldsets）
+    content_preview = query_expression()
     
     # 关联
     section = relationship("Section", back_populates="questions")
-    images = relationship("QuestionImage", back_populates="question", cascade="all, delete-orphan")
+    images = relationship("QuestionImage", back_populates="question", cascade="all, delete-orphan",
+                          passive_deletes=True)
 
 
 class QuestionImage(Base):
@@ -61,16 +101,62 @@ class QuestionImage(Base):
     __tablename__ = "question_images"
     
     id = Column(Integer, primary_key=True, index=True)
-    question_id = Column(Integer, ForeignKey("questions.id"), nullable=False)
+    question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"), nullable=False, index=True)
     alt_text = Column(String(200), nullable=True)
     url = Column(Text, nullable=False)
     position = Column(String(50), default="inline")  # inline, after, etc.
     caption = Column(String(200), nullable=True)  # 图片说明
     question_ref = Column(Integer, nullable=True)  # 关联题号
+    # 图片库中的原图（见 app.services.images），原图不可用时为空
+    image_hash = Column(String(64), nullable=True)  # 原图内容的 SHA-256
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
     
     # 关联
     question = relationship("Question", back_populates="images")
 
 
+class QuestionLsh(Base):
+    """题目签名的 LSH 桶（相似题候选查找）"""
+    __tablename__ = "question_lsh"
+    
+    # 主键 (band, bucket, question_id) 即按桶号查找候选的覆盖索引
+    band = Column(SmallInteger, primary_key=True)
+    bucket = Column(BigInteger, primary_key=True)
+    question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"), primary_key=True, index=True)
+
+
+class BankStats(Base):
+    """题库统计表（物化统计，单行）"""
+    __tablename__ = "bank_stats"
+    
+    id = Column(Integer, primary_key=True)
+    total_papers = Column(Integer, nullable=False, default=0)
+    total_questions = Column(Integer, nullable=False, default=0)
+    total_images = Column(Integer, nullable=False, default=0)
+    min_year = Column(Integer, nullable=True)
+    max_year = Column(Integer, nullable=True)
+    provinces = Column(JSON, nullable=False, default=list)
+    subjects = Column(JSON, nullable=False, default=list)
+    generation = Column(Integer, nullable=False, default=0)  # 数据版本号，每次写操作递增
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class PaperBlob(Base):
+    """试卷详情预渲染缓存（序列化后的 PaperDetail JSON）"""
+    __tablename__ = "paper_blobs"
+    __table_args__ = (
+        UniqueConstraint("year", "province", "subject", name="uq_paper_blobs_key"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    year = Column(Integer, nullable=False)
+    province = Column(String(50), nullable=False)
+    subject = Column(String(100), nullable=False)
+    generation = Column(Integer, nullable=False)  # 渲染时的数据版本号
+    body = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
 
 
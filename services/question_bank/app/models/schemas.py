@@ -13,6 +13,9 @@ class ImageSchema(BaseModel):
     position: str = "inline"
     caption: Optional[str] = None
     question_ref: Optional[int] = None
+    image_hash: Optional[str] = None  # 图片库中的内容哈希，原图地址为 /api/images/{image_hash}
+    width: Optional[int] = None
+    height: Optional[int] = None
 
 
 class QuestionBase(BaseModel):
@@ -32,6 +35,59 @@ class QuestionDetail(QuestionBase):
         from_attributes = True
 
 
+class QuestionBatchRequest(BaseModel):
+    """批量获取题目请求"""
+    ids: List[int] = Field(..., min_length=1, max_length=500, description="题目ID列表")
+
+
+class QuestionSearchResult(QuestionDetail):
+    """题目搜索结果"""
+    snippet: Optional[str] = None  # 关键词高亮片段（全文检索命中时返回）
+
+
+class SimilarQuestion(QuestionDetail):
+    """相似题目"""
+    year: int
+    similarity: float  # 估计的 Jaccard 相似度
+
+
+class DuplicateQuestion(BaseModel):
+    """重复题分组中的题目"""
+    id: int
+    year: int
+    province: str
+    section_name: str
+    question_number: int
+    content_preview: str
+
+
+class DuplicateGroup(BaseModel):
+    """一组近似重复的题目"""
+    similarity: float  # 组内相连题目对的最低相似度
+    questions: List[DuplicateQuestion]
+
+
+class DuplicateReport(BaseModel):
+    """近似重复题报告"""
+    threshold: float
+    total_groups: int
+    total_questions: int  # 涉及的题目数
+    groups: List[DuplicateGroup] = []
+
+
+class QuestionQueryResult(BaseModel):
+    """元数据查询结果"""
+    total: int  # 命中的题目总数
+    ids: List[int] = []  # 本页题目ID（按ID升序）
+    facets: dict = {}  # 命中题目在各难度、题型下的数量
+
+
+class QuestionSample(BaseModel):
+    """随机抽题结果"""
+    pool_size: int  # 符合条件的题目数
+    questions: List[QuestionDetail] = []
+
+
 class SectionBase(BaseModel):
     """章节基础信息"""
     section_number: str
@@ -92,8 +148,28 @@ class StatsResponse(BaseModel):
 
 class ImportRequest(BaseModel):
     """导入请求"""
-    data_path: str = Field(..., description="JSON数据文件路径")
+    data_path: str = Field(..., description="数据文件路径（JSON 或 NDJSON）")
     overwrite: bool = Field(default=False, description="是否覆盖已存在的数据")
+    chunk_size: Optional[int] = Field(
+        default=None, ge=1, description="每导入多少张试卷提交一次，为空时整个文件一个事务"
+    )
+    diff: bool = Field(
+        default=False, description="差量导入：按内容哈希只写入有变化的章节和题目，题目ID保持不变"
+    )
+
+
+class ImportChanges(BaseModel):
+    """差量导入的变更统计"""
+    papers_inserted: int = 0
+    papers_updated: int = 0
+    papers_unchanged: int = 0
+    sections_inserted: int = 0
+    sections_updated: int = 0
+    sections_deleted: int = 0
+    questions_inserted: int = 0
+    questions_updated: int = 0
+    questions_deleted: int = 0
+    questions_unchanged: int = 0
 
 
 class ImportResponse(BaseModel):
@@ -103,4 +179,36 @@ class ImportResponse(BaseModel):
     papers_imported: int
     questions_imported: int
     images_imported: int
+    changes: Optional[ImportChanges] = None  # 差量导入时返回
 
+
+
+class ImportJobStatus(BaseModel):
+    """导入任务状态"""
+    id: str
+    status: str  # queued / running / succeeded / failed
+    data_path: str
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    papers_processed: int = 0
+    questions_processed: int = 0
+    bytes_read: int = 0
+    bytes_total: int = 0
+    progress: float = 0.0  # 按已读取字节估算，0~1
+    elapsed_seconds: Optional[float] = None
+    papers_per_second: Optional[float] = None
+    questions_per_second: Optional[float] = None
+    eta_seconds: Optional[float] = None  # 预计剩余秒数
+    result: Optional[ImportResponse] = None  # 成功后的导入结果
+    error: Optional[str] = None
+
+
+class SnapshotInfo(BaseModel):
+    """快照清单"""
+    name: str
+    path: str
+    size_bytes: Optional[int] = None
+    sha256: Optional[str] = None
+    created_at: Optional[str] = None
+    rows: dict = {}  # 各表行数
@@ -1,117 +1,90 @@
 """
 管理员 API 路由（数据导入等）
+
+写操作沿用同步 ORM 逻辑，通过 AsyncSession.run_sync() 在异步会话上执行；
+数据导入作为后台任务提交（见 app.services.jobs），
+快照导出/恢复见 app.services.snapshot。
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, ORJSONResponse
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-import json
 from pathlib import Path
-from app.database import get_db
-from app.models.database import Paper, Section, Question, QuestionImage
-from app.models.schemas import ImportRequest, ImportResponse
+from typing import List
+from app.database import get_db, get_write_db, WriteLockTimeout
+from app.models.database import Base, Paper, Section, Question, QuestionImage, QuestionLsh, PaperBlob
+from app.models.schemas import ImportRequest, ImportJobStatus, SnapshotInfo, DuplicateReport
+from app.services.stats import StatsDelta, apply_stats_delta, refresh_stats
+from app.services.paper_cache import clear_paper_blobs
+from app.services.search import reset_search_index
+from app.services.similarity import DEFAULT_DUPLICATE_THRESHOLD, duplicate_report
+from app.services.cache import response_cache
+from app.services.importer import validate_file
+from app.services.jobs import import_jobs
+from app.services.snapshot import (
+    SnapshotError, export_snapshot, list_snapshots, read_manifest, restore_snapshot, snapshot_file
+)
 
-router = APIRouter(prefix="/api/admin", tags=["admin"])
+router = APIRouter(prefix="/api/admin", tags=["admin"], default_response_class=ORJSONResponse)
 
 
-@router.post("/import", response_model=ImportResponse)
-async def import_data(
-    request: ImportRequest,
-    db: Session = Depends(get_db)
-):
-    """导入题库数据"""
+@router.post("/import", response_model=ImportJobStatus, status_code=202)
+async def import_data(request: ImportRequest):
+    """
+    提交导入任务（后台执行，通过 /api/admin/jobs/{job_id} 查询进度）
+
+    提交前先流式校验整个数据文件，格式错误或缺少必填字段时返回 422，不创建任务。
+    """
+    data_path = Path(request.data_path)
+    if not data_path.exists():
+        raise HTTPException(status_code=404, detail=f"数据文件不存在: {request.data_path}")
     try:
-        # 读取JSON文件
-        data_path = Path(request.data_path)
-        if not data_path.exists():
-            raise HTTPException(status_code=404, detail=f"数据文件不存在: {request.data_path}")
-        
-        with open(data_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        papers_imported = 0
-        questions_imported = 0
-        images_imported = 0
-        
-        # 遍历所有试卷
-        for paper_data in data.get('papers', []):
-            year = paper_data['year']
-            province = paper_data['province']
-            subject = paper_data['subject']
-            
-            # 检查是否已存在
-            existing_paper = db.query(Paper).filter(
-                Paper.year == year,
-                Paper.province == province,
-                Paper.subject == subject
-            ).first()
-            
-            if existing_paper and not request.overwrite:
-                print(f"跳过已存在的试卷: {year}年{province}{subject}")
-                continue
-            elif existing_paper and request.overwrite:
-                # 删除旧数据（级联删除相关数据）
-                db.delete(existing_paper)
-                db.commit()
-            
-            # 创建试卷
-            paper = Paper(
-                year=year,
-                province=province,
-                subject=subject,
-                exam_type=paper_data.get('exam_type', '专升本')
-            )
-            db.add(paper)
-            db.flush()  # 获取paper.id
-            papers_imported += 1
-            
-            # 创建章节和题目
-            for idx, section_data in enumerate(paper_data.get('sections', [])):
-                section = Section(
-                    paper_id=paper.id,
-                    section_number=section_data['section_number'],
-                    section_name=section_data['section_name'],
-                    order_index=idx
-                )
-                db.add(section)
-                db.flush()  # 获取section.id
-                
-                # 创建题目
-                for question_data in section_data.get('questions', []):
-                    question = Question(
-                        section_id=section.id,
-                        question_number=question_data['question_number'],
-                        content=question_data.get('content', ''),
-                        answer=question_data.get('answer', None)
-                    )
-                    db.add(question)
-                    db.flush()  # 获取question.id
-                    questions_imported += 1
-                    
-                    # 创建图片记录
-                    for image_data in question_data.get('images', []):
-                        image = QuestionImage(
-                            question_id=question.id,
-                            alt_text=image_data.get('alt_text'),
-                            url=image_data['url'],
-                            position=image_data.get('position', 'inline'),
-                            caption=image_data.get('caption'),
-                            question_ref=image_data.get('question_ref')
-                        )
-                        db.add(image)
-                        images_imported += 1
-        
-        db.commit()
-        
-        return ImportResponse(
-            success=True,
-            message=f"成功导入数据",
-            papers_imported=papers_imported,
-            questions_imported=questions_imported,
-            images_imported=images_imported
-        )
+        await run_in_threadpool(validate_file, data_path)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"数据文件不合法: {e}")
     
-    except Exception as e:
+    job = import_jobs.submit(request)
+    return job.to_dict()
+
+
+@router.get("/jobs", response_model=List[ImportJobStatus])
+async def list_jobs():
+    """导入任务列表（最近提交的在前）"""
+    return [job.to_dict() for job in import_jobs.list()]
+
+
+@router.get("/jobs/{job_id}", response_model=ImportJobStatus)
+async def get_job(job_id: str):
+    """查询导入任务进度"""
+    job = import_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"导入任务不存在: {job_id}")
+    return job.to_dict()
+
+
+def _delete_paper(db: Session, year: int, province: str, subject: str) -> bool:
+    """删除试卷（章节、题目、图片由外键级联删除），返回是否存在"""
+    paper = db.execute(
+        select(Paper.id, Paper.total_questions, Paper.total_images).where(
+            Paper.year == year,
+            Paper.province == province,
+            Paper.subject == subject
+        )
+    ).first()
+    if paper is None:
         db.rollback()
-        raise HTTPException(status_code=500, detail=f"导入失败: {str(e)}")
+        return False
+    
+    db.execute(delete(Paper).where(Paper.id == paper.id))
+    clear_paper_blobs(db, year, province, subject)
+    # 统计按被删试卷的冗余计数增量更新，不重新统计整个题库
+    delta = StatsDelta()
+    delta.remove_paper((year, province, subject), paper.total_questions, paper.total_images)
+    apply_stats_delta(db, delta)
+    db.commit()
+    return True
 
 
 @router.delete("/papers/{year}")
@@ -119,46 +92,126 @@ async def delete_paper(
     year: int,
     province: str = "广东",
     subject: str = "高等数学",
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_write_db)
 ):
     """删除指定年份的试卷"""
-    paper = db.query(Paper).filter(
-        Paper.year == year,
-        Paper.province == province,
-        Paper.subject == subject
-    ).first()
+    deleted = await db.run_sync(_delete_paper, year, province, subject)
     
-    if not paper:
+    if not deleted:
         raise HTTPException(status_code=404, detail=f"未找到{year}年{province}{subject}试卷")
     
-    db.delete(paper)
-    db.commit()
+    response_cache.invalidate()
     
     return {"success": True, "message": f"已删除{year}年{province}{subject}试卷"}
 
 
+@router.get("/duplicates", response_model=DuplicateReport)
+async def get_duplicates(
+    threshold: float = Query(DEFAULT_DUPLICATE_THRESHOLD, ge=0, le=1, description="最低相似度"),
+    db: AsyncSession = Depends(get_db)
+):
+    """近似重复题报告"""
+    return await db.run_sync(duplicate_report, threshold)
+
+
+def _reset_database(db: Session):
+    """删除所有数据（逐表批量删除）"""
+    for model in (QuestionImage, QuestionLsh, Question, Section, Paper):
+        db.execute(delete(model))
+    clear_paper_blobs(db)
+    refresh_stats(db)
+    db.commit()
+
+
+def _truncate_database(db: Session):
+    """
+    删表重建，耗时与数据量无关
+
+    SQLite 中 DDL 不在事务内，中途失败时缺失的表会在服务下次启动时由 init_db 补建。
+    """
+    conn = db.connection()
+    tables = [model.__table__ for model in (Paper, Section, Question, QuestionImage, QuestionLsh, PaperBlob)]
+    Base.metadata.drop_all(conn, tables=tables)
+    Base.metadata.create_all(conn, tables=tables)
+    reset_search_index(db)
+    refresh_stats(db)
+    db.commit()
+
+
 @router.post("/reset")
 async def reset_database(
     confirm: bool = False,
-    db: Session = Depends(get_db)
+    truncate: bool = False,
+    db: AsyncSession = Depends(get_write_db)
 ):
-    """重置数据库（危险操作）"""
+    """重置数据库（危险操作）；truncate=true 时删表重建，适合快速清空测试库"""
     if not confirm:
         raise HTTPException(status_code=400, detail="需要确认操作")
     
     try:
-        # 删除所有数据
-        db.query(QuestionImage).delete()
-        db.query(Question).delete()
-        db.query(Section).delete()
-        db.query(Paper).delete()
-        db.commit()
+        await db.run_sync(_truncate_database if truncate else _reset_database)
+        response_cache.invalidate()
         
         return {"success": True, "message": "数据库已重置"}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"重置失败: {str(e)}")
 
 
+@router.post("/snapshots", response_model=SnapshotInfo)
+async def create_snapshot():
+    """导出题库快照到快照目录"""
+    try:
+        return await run_in_threadpool(export_snapshot)
+    except SnapshotError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/snapshots", response_model=List[SnapshotInfo])
+async def get_snapshots():
+    """快照列表（最新的在前）"""
+    return list_snapshots()
+
+
+@router.get("/snapshots/{name}")
+async def download_snapshot(name: str):
+    """下载快照文件（新节点拉取后通过 SNAPSHOT_RESTORE_PATH 启动恢复）"""
+    try:
+        path = snapshot_file(name)
+    except SnapshotError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not path.exists():
+        raise HTTPException(status_code=404, detail=f"快照不存在: {name}")
+    
+    manifest = await run_in_threadpool(read_manifest, path)
+    headers = {"X-Checksum-SHA256": manifest["sha256"]} if manifest else {}
+    return FileResponse(path, media_type="application/vnd.sqlite3", filename=name, headers=headers)
+
+
+@router.post("/snapshots/{name}/restore", response_model=SnapshotInfo)
+async def restore_from_snapshot(name: str, confirm: bool = False):
+    """用快照覆盖当前题库（危险操作）"""
+    if not confirm:
+        raise HTTPException(status_code=400, detail="需要确认操作")
+    
+    try:
+        path = snapshot_file(name)
+        if not path.exists():
+            raise HTTPException(status_code=404, detail=f"快照不存在: {name}")
+        return await run_in_threadpool(restore_snapshot, path)
+    except SnapshotError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except WriteLockTimeout:
+        raise HTTPException(status_code=503, detail="写操作繁忙（正在导入数据），请稍后重试")
+    finally:
+        response_cache.invalidate()
+
+
+@router.get("/cache")
+async def get_cache_stats():
+    """读缓存命中统计"""
+    return response_cache.stats()
+
+
 
 
@@ -0,0 +1,228 @@
+"""
+嵌入式只读模式的题库 API 路由
+
+与 app.routers.questions 路径、参数和响应格式一致，数据来自内存中的
+预构建索引（见 app.services.embedded），不访问数据库。
+"""
+from itertools import islice
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.responses import ORJSONResponse
+from typing import List, Optional
+from app.models.schemas import (
+    PaperSummary, PaperDetail, QuestionDetail, QuestionSearchResult, StatsResponse,
+    QuestionBatchRequest, QuestionQueryResult, QuestionSample, SimilarQuestion
+)
+from app.routers.questions import (
+    NEXT_CURSOR_HEADER, MAX_BATCH_GET_IDS, MAX_QUERY_IDS, MAX_SAMPLE_SIZE, FIELDS_QUERY, EXCLUDE_QUERY,
+    _decode_cursor, _parse_fieldset, _query_metadata, _sample_question_ids
+)
+from app.services.embedded import get_bank
+from app.services.fieldsets import (
+    SEARCH_FIELDS, SEARCH_DEFAULT_FIELDS, PAPER_QUESTION_FIELDS, PAPER_QUESTION_DEFAULT_FIELDS,
+    select_fields
+)
+from app.services.pagination import encode_cursor
+from app.services.similarity import DEFAULT_SIMILAR_THRESHOLD
+
+router = APIRouter(prefix="/api", tags=["questions"], default_response_class=ORJSONResponse)
+
+
+@router.get("/papers/stats", response_model=StatsResponse)
+async def get_stats():
+    """获取题库统计信息"""
+    return get_bank().stats
+
+
+@router.get("/papers", response_model=List[PaperSummary])
+async def get_papers(
+    response: Response,
+    province: Optional[str] = Query(None, description="省份筛选"),
+    subject: Optional[str] = Query(None, description="科目筛选"),
+    year: Optional[int] = Query(None, description="年份筛选"),
+    skip: int = Query(0, ge=0, description="偏移量（兼容旧客户端，建议改用 after）"),
+    limit: int = Query(100, ge=1, le=200),
+    after: Optional[str] = Query(None, description="分页游标（取自上一页响应头 X-Next-Cursor）")
+):
+    """获取试卷列表（按年份、ID 倒序）"""
+    papers = (
+        paper for paper in get_bank().papers
+        if (not province or paper.province == province)
+        and (not subject or paper.subject == subject)
+        and (not year or paper.year == year)
+    )
+    if after:
+        last_year, last_id = _decode_cursor(after, "papers", (int, int))
+        papers = (paper for paper in papers if (paper.year, paper.id) < (last_year, last_id))
+    else:
+        papers = islice(papers, skip, None)
+
+    result = list(islice(papers, limit))
+    if len(result) == limit:
+        last = result[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor("papers", [last.year, last.id])
+    return result
+
+
+@router.get("/papers/{year}", response_model=PaperDetail)
+async def get_paper_by_year(
+    year: int,
+    province: str = Query("广东", description="省份"),
+    subject: str = Query("高等数学", description="科目"),
+    fields: Optional[str] = FIELDS_QUERY,
+    exclude: Optional[str] = EXCLUDE_QUERY
+):
+    """获取指定年份的试卷详情（返回预渲染的 JSON；fields/exclude 作用于章节下的题目）"""
+    fieldset = _parse_fieldset(fields, exclude, PAPER_QUESTION_FIELDS, PAPER_QUESTION_DEFAULT_FIELDS)
+    if fieldset is None:
+        body = get_bank().paper_body(year, province, subject)
+    else:
+        body = get_bank().paper_fields_body(year, province, subject, fieldset)
+    if body is None:
+        raise HTTPException(status_code=404, detail=f"未找到{year}年{province}{subject}试卷")
+    return Response(content=body, media_type="application/json")
+
+
+def _get_questions_by_ids(ids: List[int]) -> List[QuestionDetail]:
+    """按ID批量获取题目，按请求顺序返回，忽略不存在的ID"""
+    bank = get_bank()
+    return [bank.questions[i] for i in ids if i in bank.questions]
+
+
+@router.get("/questions/query", response_model=QuestionQueryResult)
+async def query_questions(
+    response: Response,
+    tags: Optional[str] = Query(None, description="知识点标签，逗号分隔，如 limit-calculation,limit-special"),
+    match: str = Query("all", pattern="^(all|any)$", description="多个标签同时满足（all）或满足其一（any）"),
+    difficulty_min: Optional[int] = Query(None, ge=1, le=5, description="最低难度"),
+    difficulty_max: Optional[int] = Query(None, ge=1, le=5, description="最高难度"),
+    question_type: Optional[str] = Query(None, alias="type", description="题型，逗号分隔：choice / fill / solution"),
+    year_min: Optional[int] = Query(None, description="起始年份"),
+    year_max: Optional[int] = Query(None, description="截止年份"),
+    limit: int = Query(100, ge=1, le=MAX_QUERY_IDS),
+    after: Optional[str] = Query(None, description="分页游标（取自上一页响应头 X-Next-Cursor）")
+):
+    """按标注元数据多维筛选题目（位图索引求交），返回题目ID，详情用批量接口获取"""
+    return _query_metadata(
+        get_bank().metadata_index, response, tags, match, difficulty_min, difficulty_max,
+        question_type, year_min, year_max, limit, after
+    )
+
+
+@router.get("/questions/sample", response_model=QuestionSample)
+async def sample_questions(
+    k: int = Query(10, ge=1, le=MAX_SAMPLE_SIZE, description="抽取题目数"),
+    year_min: Optional[int] = Query(None, description="起始年份"),
+    year_max: Optional[int] = Query(None, description="截止年份"),
+    section_name: Optional[str] = Query(None, description="章节名称"),
+    tag: Optional[str] = Query(None, description="知识点标签"),
+    difficulty_weights: Optional[str] = Query(
+        None, description="难度权重，如 2:1,3:2,4:1（未列出的难度和未标注的题目不参与）"
+    ),
+    exclude_ids: Optional[str] = Query(None, description="不抽取的题目ID，逗号分隔"),
+    seed: Optional[int] = Query(None, description="随机种子（数据不变时同一种子抽到同一组题）")
+):
+    """按条件不放回地随机抽题（练习组卷）"""
+    pool_size, ids = _sample_question_ids(
+        get_bank().metadata_index, k, year_min, year_max, section_name, tag,
+        difficulty_weights, exclude_ids, seed
+    )
+    return QuestionSample(pool_size=pool_size, questions=_get_questions_by_ids(ids))
+
+
+@router.get("/questions/batch", response_model=List[QuestionDetail])
+async def get_questions_batch(
+    ids: str = Query(..., description="逗号分隔的题目ID，如 1,2,3")
+):
+    """批量获取题目详情"""
+    try:
+        id_list = [int(i) for i in ids.split(",") if i.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"无效的题目ID列表: {ids}")
+
+    if not id_list:
+        raise HTTPException(status_code=400, detail="题目ID列表不能为空")
+    if len(id_list) > MAX_BATCH_GET_IDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"单次最多获取{MAX_BATCH_GET_IDS}道题目，更长的列表请使用 POST"
+        )
+
+    return _get_questions_by_ids(id_list)
+
+
+@router.post("/questions/batch", response_model=List[QuestionDetail])
+async def post_questions_batch(request: QuestionBatchRequest):
+    """批量获取题目详情（长ID列表）"""
+    return _get_questions_by_ids(request.ids)
+
+
+@router.get("/questions/{question_id}", response_model=QuestionDetail)
+async def get_question(question_id: int):
+    """获取题目详情"""
+    question = get_bank().question(question_id)
+    if not question:
+        raise HTTPException(status_code=404, detail="题目不存在")
+    return question
+
+
+@router.get("/questions/{question_id}/similar", response_model=List[SimilarQuestion])
+async def get_similar_questions(
+    question_id: int,
+    threshold: float = Query(DEFAULT_SIMILAR_THRESHOLD, ge=0, le=1, description="最低相似度（估计的 Jaccard 相似度）"),
+    limit: int = Query(20, ge=1, le=100)
+):
+    """获取相似题目（按相似度从高到低，通过 LSH 桶查找候选）"""
+    bank = get_bank()
+    matches = bank.lsh_index.find_similar(question_id, threshold, limit)
+    if matches is None:
+        raise HTTPException(status_code=404, detail="题目不存在")
+    return [
+        SimilarQuestion(**bank.questions[similar_id].model_dump(), year=bank.question_years[similar_id],
+                        similarity=score)
+        for similar_id, score in matches
+    ]
+
+
+@router.get("/questions", response_model=List[QuestionSearchResult])
+async def search_questions(
+    response: Response,
+    year: Optional[int] = Query(None, description="年份"),
+    section_name: Optional[str] = Query(None, description="章节名称"),
+    keyword: Optional[str] = Query(None, description="关键词搜索（题目内容和答案）"),
+    skip: int = Query(0, ge=0, description="偏移量（兼容旧客户端，建议改用 after）"),
+    limit: int = Query(50, ge=1, le=200),
+    after: Optional[str] = Query(None, description="分页游标（取自上一页响应头 X-Next-Cursor）"),
+    fields: Optional[str] = FIELDS_QUERY,
+    exclude: Optional[str] = EXCLUDE_QUERY
+):
+    """搜索题目（按题目ID排列；嵌入模式下关键词为子串匹配，不做相关度排序）"""
+    fieldset = _parse_fieldset(fields, exclude, SEARCH_FIELDS, SEARCH_DEFAULT_FIELDS)
+    bank = get_bank()
+    last_id = 0
+    if after:
+        last_id, = _decode_cursor(after, "questions", (int,))
+
+    questions = (
+        q for q in bank.questions_after(last_id)
+        if (not year or bank.question_years[q.id] == year)
+        and (not section_name or section_name in q.section_name)
+        and (not keyword or keyword in q.content or (q.answer is not None and keyword in q.answer))
+    )
+    if not after:
+        questions = islice(questions, skip, None)
+
+    result = [QuestionSearchResult(**q.model_dump()) for q in islice(questions, limit)]
+    next_cursor = None
+    if len(result) == limit:
+        next_cursor = encode_cursor("questions", [result[-1].id])
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+    if fieldset is not None:
+        return ORJSONResponse(
+            [
+                select_fields({**r.model_dump(), "content_preview": r.content}, fieldset, SEARCH_FIELDS)
+                for r in result
+            ],
+            headers={NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+        )
+    return result
@@ -0,0 +1,65 @@
+"""
+图片库接口
+
+按内容哈希返回图片库中的原图或缩略图（见 app.services.images）。
+内容哈希决定文件内容，响应按不可变资源长期缓存；支持 ETag 条件请求和单段 Range 请求。
+数据库模式和嵌入模式共用，不访问数据库。
+"""
+import re
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from app.services.images import CONTENT_TYPES, RangeNotSatisfiable, image_store, parse_range
+
+router = APIRouter(prefix="/api/images", tags=["images"])
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+IMAGE_HASH = re.compile(r"^[0-9a-f]{64}$")
+
+
+def _read(path, start: int = 0, length: Optional[int] = None) -> bytes:
+    """读取文件中从 start 开始的 length 个字节（length 为空时读到结尾）"""
+    with open(path, "rb") as f:
+        f.seek(start)
+        return f.read() if length is None else f.read(length)
+
+
+@router.get("/{image_hash}")
+async def get_image(
+    image_hash: str,
+    request: Request,
+    w: Optional[int] = Query(None, ge=1, le=4096, description="期望宽度（返回不窄于该宽度的最小缩略图）")
+):
+    """按内容哈希获取图片"""
+    located = image_store.locate(image_hash, w) if IMAGE_HASH.match(image_hash) else None
+    if located is None:
+        raise HTTPException(status_code=404, detail="图片不存在")
+    path, extension, variant_width = located
+
+    etag = f'"{image_hash}"' if variant_width is None else f'"{image_hash}-w{variant_width}"'
+    headers = {
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in if_none_match):
+        return Response(status_code=304, headers=headers)
+
+    media_type = CONTENT_TYPES[extension]
+    size = path.stat().st_size
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range.strip() == etag):
+        try:
+            byte_range = parse_range(range_header, size)
+        except RangeNotSatisfiable:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+        if byte_range is not None:
+            start, end = byte_range
+            body = await run_in_threadpool(_read, path, start, end - start + 1)
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            return Response(content=body, status_code=206, headers=headers, media_type=media_type)
+
+    body = await run_in_threadpool(_read, path)
+    return Response(content=body, headers=headers, media_type=media_type)
@@ -1,87 +1,170 @@
 """
 题库管理 API 路由
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from app.database import get_db
-from app.models.database import Paper, Section, Question, QuestionImage
+import random
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import and_, or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+from fastapi.responses import ORJSONResponse
+from typing import List, Optional, Sequence
+from app.database import get_db, acquire_write_lock, release_write_lock, AsyncWriteSessionLocal
+from app.models.database import Paper, Section, Question
 from app.models.schemas import (
-    PaperSummary, PaperDetail, QuestionDetail, StatsResponse
+    PaperSummary, PaperDetail, QuestionDetail, QuestionSearchResult, StatsResponse,
+    QuestionBatchRequest, QuestionQueryResult, QuestionSample, SimilarQuestion
 )
+from app.services import stats as stats_service
+from app.services.fieldsets import (
+    SEARCH_FIELDS, SEARCH_DEFAULT_FIELDS,
+    PAPER_QUESTION_FIELDS, PAPER_QUESTION_DEFAULT_FIELDS,
+    InvalidFieldset, parse_fieldset, image_fields, question_fields, question_load_options
+)
+from app.services.metadata_index import MetadataIndex, QUESTION_TYPES, get_metadata_index
+from app.services.paper_cache import get_paper_blob, store_paper_blob, render_paper_fields
+from app.services.search import apply_keyword_search
+from app.services.similarity import DEFAULT_SIMILAR_THRESHOLD, find_similar
+from app.services.pagination import encode_cursor, decode_cursor, InvalidCursor
+from app.services.cache import response_cache
+
+# JSON 响应使用 orjson 序列化（长 Markdown/LaTeX 字符串编码更快）
+router = APIRouter(prefix="/api", tags=["questions"], default_response_class=ORJSONResponse)
+
+# 下一页游标通过响应头返回，保持响应体结构不变
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# GET 批量接口的ID数量上限（更长的列表使用 POST）
+MAX_BATCH_GET_IDS = 200
+
+# 元数据查询单页返回的ID数量上限
+MAX_QUERY_IDS = 1000
 
-router = APIRouter(prefix="/api", tags=["questions"])
+# 单次随机抽题的题目数上限
+MAX_SAMPLE_SIZE = 100
+
+# 题目列表（非全文检索）的排序键，也是游标的内容：按试卷、章节顺序、题号排列，
+# 章节ID和题目ID保证唯一。沿 ix_sections_paper_order 和 ix_questions_section_number
+# 嵌套遍历即为该顺序，不需要排序；游标按行值比较从索引中定位
+QUESTION_ORDER = (Section.paper_id, Section.order_index, Section.id, Question.question_number, Question.id)
+
+# 题目详情所需的关联数据一次性预加载，避免逐题懒加载
+QUESTION_DETAIL_OPTIONS = (
+    joinedload(Question.section),
+    selectinload(Question.images),
+)
+
+
+def _question_detail(q: Question, model=QuestionDetail, **extra):
+    """ORM 题目转换为响应模型"""
+    return model(
+        id=q.id,
+        question_number=q.question_number,
+        content=q.content,
+        answer=q.answer,
+        section_name=q.section.section_name,
+        images=[image_fields(img) for img in q.images],
+        **extra
+    )
+
+
+def _decode_cursor(cursor: str, kind: str, types: Sequence[type]) -> list:
+    """解码游标，非法时返回 400"""
+    try:
+        return decode_cursor(cursor, kind, types)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+# 稀疏字段集参数（两者都不传时返回完整响应）
+FIELDS_QUERY = Query(None, description="只返回这些题目字段，逗号分隔，如 id,question_number,content_preview")
+EXCLUDE_QUERY = Query(None, description="不返回这些题目字段，逗号分隔，如 answer,images")
+
+
+def _parse_fieldset(fields: Optional[str], exclude: Optional[str], available, default):
+    """解析稀疏字段集，非法时返回 400"""
+    try:
+        return parse_fieldset(fields, exclude, available, default)
+    except InvalidFieldset as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/papers/stats", response_model=StatsResponse)
-async def get_stats(db: Session = Depends(get_db)):
+async def get_stats(db: AsyncSession = Depends(get_db)):
     """获取题库统计信息"""
-    papers = db.query(Paper).all()
-    questions = db.query(Question).all()
-    images = db.query(QuestionImage).all()
-    
-    years = [p.year for p in papers]
-    provinces = list(set(p.province for p in papers))
-    subjects = list(set(p.subject for p in papers))
-    
-    return StatsResponse(
-        total_papers=len(papers),
-        total_questions=len(questions),
-        total_images=len(images),
+    cache_key = ("stats",)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    generation = response_cache.generation
+    stats = await db.run_sync(stats_service.get_stats)
+    
+    result = StatsResponse(
+        total_papers=stats.total_papers,
+        total_questions=stats.total_questions,
+        total_images=stats.total_images,
         year_range={
-            "start": min(years) if years else 0,
-            "end": max(years) if years else 0
+            "start": stats.min_year or 0,
+            "end": stats.max_year or 0
         },
-        provinces=provinces,
-        subjects=subjects
+        provinces=stats.provinces,
+        subjects=stats.subjects
     )
+    response_cache.set(cache_key, result, generation)
+    return result
 
 
 @router.get("/papers", response_model=List[PaperSummary])
 async def get_papers(
+    response: Response,
     province: Optional[str] = Query(None, description="省份筛选"),
     subject: Optional[str] = Query(None, description="科目筛选"),
     year: Optional[int] = Query(None, description="年份筛选"),
-    skip: int = Query(0, ge=0),
+    skip: int = Query(0, ge=0, description="偏移量（兼容旧客户端，建议改用 after）"),
     limit: int = Query(100, ge=1, le=200),
-    db: Session = Depends(get_db)
+    after: Optional[str] = Query(None, description="分页游标（取自上一页响应头 X-Next-Cursor）"),
+    db: AsyncSession = Depends(get_db)
 ):
-    """获取试卷列表"""
-    query = db.query(Paper)
+    """获取试卷列表（按年份、ID 倒序）"""
+    cache_key = ("papers", province, subject, year, skip, limit, after)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        result, next_cursor = cached
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+        return result
+    
+    generation = response_cache.generation
+    query = select(Paper)
     
     if province:
-        query = query.filter(Paper.province == province)
+        query = query.where(Paper.province == province)
     if subject:
-        query = query.filter(Paper.subject == subject)
+        query = query.where(Paper.subject == subject)
     if year:
-        query = query.filter(Paper.year == year)
-    
-    papers = query.order_by(Paper.year.desc()).offset(skip).limit(limit).all()
-    
-    # 计算统计信息
-    result = []
-    for paper in papers:
-        sections_count = len(paper.sections)
-        questions_count = sum(len(section.questions) for section in paper.sections)
-        images_count = sum(
-            len(question.images) 
-            for section in paper.sections 
-            for question in section.questions
-        )
-        
-        paper_summary = PaperSummary(
-            id=paper.id,
-            year=paper.year,
-            province=paper.province,
-            subject=paper.subject,
-            exam_type=paper.exam_type,
-            total_sections=sections_count,
-            total_questions=questions_count,
-            total_images=images_count,
-            created_at=paper.created_at
-        )
-        result.append(paper_summary)
+        query = query.where(Paper.year == year)
+    
+    query = query.order_by(Paper.year.desc(), Paper.id.desc())
+    if after:
+        last_year, last_id = _decode_cursor(after, "papers", (int, int))
+        query = query.where(or_(
+            Paper.year < last_year,
+            and_(Paper.year == last_year, Paper.id < last_id)
+        ))
+    else:
+        query = query.offset(skip)
     
+    papers = (await db.execute(query.limit(limit))).scalars().all()
+    
+    next_cursor = None
+    if len(papers) == limit:
+        last = papers[-1]
+        next_cursor = encode_cursor("papers", [last.year, last.id])
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    
+    # 计数字段已冗余存储在试卷表中，无需遍历章节和题目
+    result = [PaperSummary.model_validate(paper) for paper in papers]
+    response_cache.set(cache_key, (result, next_cursor), generation)
     return result
 
 
@@ -90,91 +173,320 @@ async def get_paper_by_year(
     year: int,
     province: str = Query("广东", description="省份"),
     subject: str = Query("高等数学", description="科目"),
-    db: Session = Depends(get_db)
+    fields: Optional[str] = FIELDS_QUERY,
+    exclude: Optional[str] = EXCLUDE_QUERY,
+    db: AsyncSession = Depends(get_db)
+):
+    """获取指定年份的试卷详情（返回预渲染的 JSON；fields/exclude 作用于章节下的题目）"""
+    fieldset = _parse_fieldset(fields, exclude, PAPER_QUESTION_FIELDS, PAPER_QUESTION_DEFAULT_FIELDS)
+    if fieldset is not None:
+        cache_key = ("paper", year, province, subject, fieldset)
+        body = response_cache.get(cache_key)
+        if body is None:
+            generation = response_cache.generation
+            body = await db.run_sync(render_paper_fields, year, province, subject, fieldset)
+            if body is None:
+                raise HTTPException(status_code=404, detail=f"未找到{year}年{province}{subject}试卷")
+            response_cache.set(cache_key, body, generation)
+        return Response(content=body, media_type="application/json")
+    
+    cache_key = ("paper", year, province, subject)
+    body = response_cache.get(cache_key)
+    
+    if body is None:
+        generation = response_cache.generation
+        blob = await db.run_sync(get_paper_blob, year, province, subject)
+        body = blob.body
+        if body is None:
+            raise HTTPException(status_code=404, detail=f"未找到{year}年{province}{subject}试卷")
+        if blob.rendered and await acquire_write_lock(timeout=0):
+            # 回写尽力而为：写锁被占用时不等待，直接返回刚渲染的内容
+            try:
+                # 先结束读事务释放共享锁，再交给写会话回写
+                await db.rollback()
+                async with AsyncWriteSessionLocal() as write_db:
+                    await write_db.run_sync(
+                        store_paper_blob, year, province, subject, blob.generation, body
+                    )
+            finally:
+                release_write_lock()
+        response_cache.set(cache_key, body, generation)
+    
+    return Response(content=body, media_type="application/json")
+
+
+async def _get_questions_by_ids(db: AsyncSession, ids: List[int]) -> List[QuestionDetail]:
+    """按ID批量获取题目（固定查询次数），按请求顺序返回，忽略不存在的ID"""
+    questions = (await db.execute(
+        select(Question)
+        .options(*QUESTION_DETAIL_OPTIONS)
+        .where(Question.id.in_(set(ids)))
+    )).scalars().all()
+    by_id = {q.id: q for q in questions}
+    return [_question_detail(by_id[i]) for i in ids if i in by_id]
+
+
+def _split_list(value: Optional[str]) -> List[str]:
+    """逗号分隔的参数"""
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
+
+
+def _query_metadata(index: MetadataIndex, response: Response, tags: Optional[str], match: str,
+                    difficulty_min: Optional[int], difficulty_max: Optional[int],
+                    question_type: Optional[str], year_min: Optional[int], year_max: Optional[int],
+                    limit: int, after: Optional[str]) -> QuestionQueryResult:
+    """在位图索引上执行元数据查询（数据库模式与嵌入模式共用）"""
+    types = _split_list(question_type)
+    unknown = [t for t in types if t not in QUESTION_TYPES]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"未知题型: {', '.join(unknown)}（可选: {', '.join(QUESTION_TYPES)}）"
+        )
+    last_id = 0
+    if after:
+        last_id, = _decode_cursor(after, "metadata", (int,))
+
+    bitmap = index.query(
+        tags=_split_list(tags), match_all=(match == "all"),
+        difficulty_min=difficulty_min, difficulty_max=difficulty_max,
+        types=types, year_min=year_min, year_max=year_max
+    )
+    ids = index.question_ids(bitmap, after=last_id, limit=limit)
+    if len(ids) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor("metadata", [ids[-1]])
+    return QuestionQueryResult(total=index.count(bitmap), ids=ids, facets=index.facets(bitmap))
+
+
+@router.get("/questions/query", response_model=QuestionQueryResult)
+async def query_questions(
+    response: Response,
+    tags: Optional[str] = Query(None, description="知识点标签，逗号分隔，如 limit-calculation,limit-special"),
+    match: str = Query("all", pattern="^(all|any)$", description="多个标签同时满足（all）或满足其一（any）"),
+    difficulty_min: Optional[int] = Query(None, ge=1, le=5, description="最低难度"),
+    difficulty_max: Optional[int] = Query(None, ge=1, le=5, description="最高难度"),
+    question_type: Optional[str] = Query(None, alias="type", description="题型，逗号分隔：choice / fill / solution"),
+    year_min: Optional[int] = Query(None, description="起始年份"),
+    year_max: Optional[int] = Query(None, description="截止年份"),
+    limit: int = Query(100, ge=1, le=MAX_QUERY_IDS),
+    after: Optional[str] = Query(None, description="分页游标（取自上一页响应头 X-Next-Cursor）"),
+    db: AsyncSession = Depends(get_db)
 ):
-    """获取指定年份的试卷详情"""
-    paper = db.query(Paper).filter(
-        Paper.year == year,
-        Paper.province == province,
-        Paper.subject == subject
-    ).first()
+    """按标注元数据多维筛选题目（位图索引求交），返回题目ID，详情用批量接口获取"""
+    index = await db.run_sync(get_metadata_index)
+    return _query_metadata(
+        index, response, tags, match, difficulty_min, difficulty_max,
+        question_type, year_min, year_max, limit, after
+    )
+
+
+def _sample_question_ids(index: MetadataIndex, k: int, year_min: Optional[int], year_max: Optional[int],
+                         section_name: Optional[str], tag: Optional[str],
+                         difficulty_weights: Optional[str], exclude_ids: Optional[str],
+                         seed: Optional[int]) -> tuple:
+    """解析抽题参数并抽取题目ID，返回 (候选题目数, 题目ID列表)（数据库模式与嵌入模式共用）"""
+    weights = None
+    if difficulty_weights:
+        weights = {}
+        try:
+            for item in _split_list(difficulty_weights):
+                level, _, weight = item.partition(":")
+                weights[int(level)] = float(weight)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"无效的难度权重: {difficulty_weights}")
+        if any(level not in range(1, 6) or weight < 0 for level, weight in weights.items()):
+            raise HTTPException(status_code=400, detail=f"难度须为1-5、权重不能为负: {difficulty_weights}")
+    try:
+        exclude = [int(i) for i in _split_list(exclude_ids)]
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"无效的题目ID列表: {exclude_ids}")
+
+    return index.sampler.sample(
+        k, random.Random(seed), tag=tag, year_min=year_min, year_max=year_max,
+        section_name=section_name, difficulty_weights=weights, exclude=exclude
+    )
+
+
+@router.get("/questions/sample", response_model=QuestionSample)
+async def sample_questions(
+    k: int = Query(10, ge=1, le=MAX_SAMPLE_SIZE, description="抽取题目数"),
+    year_min: Optional[int] = Query(None, description="起始年份"),
+    year_max: Optional[int] = Query(None, description="截止年份"),
+    section_name: Optional[str] = Query(None, description="章节名称"),
+    tag: Optional[str] = Query(None, description="知识点标签"),
+    difficulty_weights: Optional[str] = Query(
+        None, description="难度权重，如 2:1,3:2,4:1（未列出的难度和未标注的题目不参与）"
+    ),
+    exclude_ids: Optional[str] = Query(None, description="不抽取的题目ID，逗号分隔"),
+    seed: Optional[int] = Query(None, description="随机种子（数据不变时同一种子抽到同一组题）"),
+    db: AsyncSession = Depends(get_db)
+):
+    """按条件不放回地随机抽题（练习组卷）"""
+    index = await db.run_sync(get_metadata_index)
+    pool_size, ids = _sample_question_ids(
+        index, k, year_min, year_max, section_name, tag, difficulty_weights, exclude_ids, seed
+    )
+    return QuestionSample(pool_size=pool_size, questions=await _get_questions_by_ids(db, ids))
+
+
+@router.get("/questions/batch", response_model=List[QuestionDetail])
+async def get_questions_batch(
+    ids: str = Query(..., description="逗号分隔的题目ID，如 1,2,3"),
+    db: AsyncSession = Depends(get_db)
+):
+    """批量获取题目详情"""
+    try:
+        id_list = [int(i) for i in ids.split(",") if i.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"无效的题目ID列表: {ids}")
     
-    if not paper:
-        raise HTTPException(status_code=404, detail=f"未找到{year}年{province}{subject}试卷")
+    if not id_list:
+        raise HTTPException(status_code=400, detail="题目ID列表不能为空")
+    if len(id_list) > MAX_BATCH_GET_IDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"单次最多获取{MAX_BATCH_GET_IDS}道题目，更长的列表请使用 POST"
+        )
     
-    return paper
+    return await _get_questions_by_ids(db, id_list)
+
+
+@router.post("/questions/batch", response_model=List[QuestionDetail])
+async def post_questions_batch(
+    request: QuestionBatchRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """批量获取题目详情（长ID列表）"""
+    return await _get_questions_by_ids(db, request.ids)
 
 
 @router.get("/questions/{question_id}", response_model=QuestionDetail)
 async def get_question(
     question_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """获取题目详情"""
-    question = db.query(Question).filter(Question.id == question_id).first()
+    cache_key = ("question", question_id)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    generation = response_cache.generation
+    question = (await db.execute(
+        select(Question)
+        .options(*QUESTION_DETAIL_OPTIONS)
+        .where(Question.id == question_id)
+    )).scalars().first()
     
     if not question:
         raise HTTPException(status_code=404, detail="题目不存在")
     
-    return QuestionDetail(
-        id=question.id,
-        question_number=question.question_number,
-        content=question.content,
-        answer=question.answer,
-        section_name=question.section.section_name,
-        images=[
-            {
-                "alt_text": img.alt_text,
-                "url": img.url,
-                "position": img.position,
-                "caption": img.caption,
-                "question_ref": img.question_ref
-            }
-            for img in question.images
-        ]
-    )
+    result = _question_detail(question)
+    response_cache.set(cache_key, result, generation)
+    return result
 
 
-@router.get("/questions", response_model=List[QuestionDetail])
+@router.get("/questions/{question_id}/similar", response_model=List[SimilarQuestion])
+async def get_similar_questions(
+    question_id: int,
+    threshold: float = Query(DEFAULT_SIMILAR_THRESHOLD, ge=0, le=1, description="最低相似度（估计的 Jaccard 相似度）"),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db)
+):
+    """获取相似题目（按相似度从高到低，通过 LSH 桶查找候选）"""
+    matches = await db.run_sync(find_similar, question_id, threshold, limit)
+    if matches is None:
+        raise HTTPException(status_code=404, detail="题目不存在")
+    if not matches:
+        return []
+    
+    questions = (await db.execute(
+        select(Question)
+        .options(joinedload(Question.section).joinedload(Section.paper), selectinload(Question.images))
+        .where(Question.id.in_([similar_id for similar_id, _ in matches]))
+    )).scalars().all()
+    by_id = {q.id: q for q in questions}
+    return [
+        _question_detail(by_id[similar_id], SimilarQuestion, year=by_id[similar_id].section.paper.year,
+                         similarity=score)
+        for similar_id, score in matches
+    ]
+
+
+@router.get("/questions", response_model=List[QuestionSearchResult])
 async def search_questions(
+    response: Response,
     year: Optional[int] = Query(None, description="年份"),
     section_name: Optional[str] = Query(None, description="章节名称"),
-    keyword: Optional[str] = Query(None, description="关键词搜索"),
-    skip: int = Query(0, ge=0),
+    keyword: Optional[str] = Query(None, description="关键词搜索（题目内容和答案，按相关度排序）"),
+    skip: int = Query(0, ge=0, description="偏移量（兼容旧客户端，建议改用 after）"),
     limit: int = Query(50, ge=1, le=200),
-    db: Session = Depends(get_db)
+    after: Optional[str] = Query(None, description="分页游标（取自上一页响应头 X-Next-Cursor）"),
+    fields: Optional[str] = FIELDS_QUERY,
+    exclude: Optional[str] = EXCLUDE_QUERY,
+    db: AsyncSession = Depends(get_db)
 ):
-    """搜索题目"""
-    query = db.query(Question).join(Section).join(Paper)
+    """搜索题目（默认按试卷内的章节顺序和题号排列，全文检索时按相关度排列）"""
+    fieldset = _parse_fieldset(fields, exclude, SEARCH_FIELDS, SEARCH_DEFAULT_FIELDS)
+    query = (
+        select(Question)
+        .join(Section, Question.section_id == Section.id)
+        .join(Paper, Section.paper_id == Paper.id)
+        .options(*(QUESTION_DETAIL_OPTIONS if fieldset is None else question_load_options(fieldset)))
+    )
     
     if year:
-        query = query.filter(Paper.year == year)
+        query = query.where(Paper.year == year)
     if section_name:
-        query = query.filter(Section.section_name.contains(section_name))
+        query = query.where(Section.section_name.contains(section_name))
+    
+    snippet = rank = None
     if keyword:
-        query = query.filter(Question.content.contains(keyword))
+        query, snippet, rank = apply_keyword_search(query, keyword)
     
-    questions = query.offset(skip).limit(limit).all()
+    if rank is not None:
+        # 全文检索：按 (相关度, ID) 排序
+        query = query.order_by(rank, Question.id)
+        if after:
+            last_rank, last_id = _decode_cursor(after, "questions_fts", (float, int))
+            query = query.where(or_(
+                rank > last_rank,
+                and_(rank == last_rank, Question.id > last_id)
+            ))
+    else:
+        # 差量导入保留已有题目ID、新题目ID更大，题目ID不等于试卷中的顺序
+        query = query.add_columns(*QUESTION_ORDER).order_by(*QUESTION_ORDER)
+        if after:
+            last_key = _decode_cursor(after, "questions", (int,) * len(QUESTION_ORDER))
+            query = query.where(tuple_(*QUESTION_ORDER) > tuple_(*last_key))
     
-    return [
-        QuestionDetail(
-            id=q.id,
-            question_number=q.question_number,
-            content=q.content,
-            answer=q.answer,
-            section_name=q.section.section_name,
-            images=[
-                {
-                    "alt_text": img.alt_text,
-                    "url": img.url,
-                    "position": img.position,
-                    "caption": img.caption,
-                    "question_ref": img.question_ref
-                }
-                for img in q.images
-            ]
+    if not after:
+        query = query.offset(skip)
+    
+    result = (await db.execute(query.limit(limit))).all()
+    if rank is None:
+        rows = [(row[0], None, None) for row in result]
+    else:
+        rows = [tuple(row) for row in result]
+    
+    next_cursor = None
+    if len(rows) == limit:
+        last_question, _, last_rank = rows[-1]
+        if rank is not None:
+            next_cursor = encode_cursor("questions_fts", [last_rank, last_question.id])
+        else:
+            next_cursor = encode_cursor("questions", list(result[-1][1:]))
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    
+    if fieldset is not None:
+        # 只含所选字段，不经过完整的响应模型
+        return ORJSONResponse(
+            [question_fields(q, fieldset, SEARCH_FIELDS, snippet=highlight) for q, highlight, _ in rows],
+            headers={NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
         )
-        for q in questions
+    return [
+        _question_detail(q, QuestionSearchResult, snippet=highlight)
+        for q, highlight, _ in rows
     ]
 
 
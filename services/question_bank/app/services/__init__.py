@@ -0,0 +1,7 @@
+"""
+Services Package
+"""
+
+
+
+
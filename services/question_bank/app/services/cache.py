@@ -0,0 +1,90 @@
+"""
+进程内读缓存
+
+题库数据只会通过 admin 接口变化，读接口的结果可以在进程内缓存：
+- LRU 淘汰，条目数上限由 CACHE_MAX_ENTRIES 控制（默认 1024）
+- 每个条目有 TTL，由 CACHE_TTL_SECONDS 控制（默认 300 秒），
+  多 worker 部署时其它进程的写操作最多在 TTL 后可见
+- 写操作提交后调用 invalidate() 递增版本号并清空缓存
+
+读取前先记下版本号，写回时版本号已变化则放弃写回，
+避免写操作期间读到的旧数据被缓存下来。
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class ResponseCache:
+    """带 TTL 和版本号失效的 LRU 缓存"""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def generation(self) -> int:
+        """当前版本号（读数据库前获取，写回缓存时传入）"""
+        return self._generation
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """读取缓存，未命中或已过期返回 None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key: Hashable, value: Any, generation: int):
+        """写入缓存；读取期间发生过写操作（版本号变化）时不写入"""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self):
+        """递增版本号并清空缓存（写操作提交后调用）"""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """命中统计"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "generation": self._generation,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+response_cache = ResponseCache(
+    max_entries=int(os.getenv("CACHE_MAX_ENTRIES", "1024")),
+    ttl_seconds=float(os.getenv("CACHE_TTL_SECONDS", "300")),
+)
@@ -0,0 +1,215 @@
+"""
+嵌入式只读题库（不使用数据库）
+
+边缘/只读部署时（BANK_MODE=embedded），题库数据来自预先构建的索引文件
+（scripts/build_index.py 从试卷 JSON 生成），启动时整体载入内存：
+- 题目按ID、试卷按 (年份, 省份, 科目) 均为字典查找
+- 试卷详情在载入时预渲染为 PaperDetail JSON 字节
+- 统计信息在载入时计算
+- 指定稀疏字段集的试卷详情按需从索引数据渲染
+- 题目元数据位图索引在载入时构建
+- 相似题的 LSH 索引在载入时由索引文件中的 MinHash 签名构建
+
+索引文件中已分配好试卷、章节、题目ID，同一份索引每次载入得到的ID相同。
+"""
+import json
+import os
+from bisect import bisect_right
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+import orjson
+
+from app.models.schemas import PaperDetail, PaperSummary, QuestionDetail, StatsResponse
+from app.services.fieldsets import PAPER_QUESTION_FIELDS, select_fields
+from app.services.images import ImageIngester
+from app.services.importer import parse_paper_file, question_metadata
+from app.services.metadata_index import MetadataIndex
+from app.services.similarity import LshIndex, content_signature
+
+EMBEDDED_MODE = os.getenv("BANK_MODE", "database") == "embedded"
+EMBEDDED_INDEX_PATH = Path(os.getenv("EMBEDDED_INDEX_PATH", "./bank_index.json"))
+
+INDEX_VERSION = 1
+
+
+def build_index(paths: Iterable[Path]) -> dict:
+    """从试卷 JSON 文件构建索引（分配ID），按文件顺序编号；图片同时存入图片库"""
+    papers = []
+    section_id = question_id = 0
+    images = ImageIngester()
+    for path in paths:
+        for paper_data in parse_paper_file(path):
+            sections = []
+            for section_data in paper_data.get('sections', []):
+                section_id += 1
+                questions = []
+                for question_data in section_data.get('questions', []):
+                    question_id += 1
+                    signature = content_signature(question_data.get('content', ''))
+                    questions.append({
+                        "id": question_id,
+                        "question_number": question_data['question_number'],
+                        "content": question_data.get('content', ''),
+                        "answer": question_data.get('answer', None),
+                        **question_metadata(question_data),
+                        "minhash": signature.hex() if signature is not None else None,
+                        "images": [
+                            {
+                                "alt_text": image_data.get('alt_text'),
+                                "url": image_data['url'],
+                                "position": image_data.get('position', 'inline'),
+                                "caption": image_data.get('caption'),
+                                "question_ref": image_data.get('question_ref'),
+                                **images.ingest(image_data['url']),
+                            }
+                            for image_data in question_data.get('images', [])
+                        ],
+                    })
+                sections.append({
+                    "id": section_id,
+                    "section_number": section_data['section_number'],
+                    "section_name": section_data['section_name'],
+                    "questions": questions,
+                })
+            papers.append({
+                "id": len(papers) + 1,
+                "year": paper_data['year'],
+                "province": paper_data['province'],
+                "subject": paper_data['subject'],
+                "exam_type": paper_data.get('exam_type', '专升本'),
+                "sections": sections,
+            })
+
+    return {
+        "version": INDEX_VERSION,
+        "built_at": datetime.utcnow().isoformat(),
+        "papers": papers,
+    }
+
+
+class EmbeddedBank:
+    """内存中的只读题库"""
+
+    def __init__(self, index: dict):
+        if index.get("version") != INDEX_VERSION:
+            raise ValueError(f"不支持的索引版本: {index.get('version')}")
+        created_at = datetime.fromisoformat(index["built_at"])
+        self.created_at = created_at
+
+        self.papers: List[PaperSummary] = []  # 按 (年份, ID) 倒序
+        self.paper_bodies: Dict[Tuple[int, str, str], bytes] = {}
+        self.paper_data: Dict[Tuple[int, str, str], dict] = {}  # 索引中的试卷数据
+        self.questions: Dict[int, QuestionDetail] = {}
+        self.question_ids: List[int] = []  # 升序
+        self.question_years: Dict[int, int] = {}
+        metadata_rows = []
+        signatures: Dict[int, Optional[bytes]] = {}
+        total_images = 0
+
+        for paper in index["papers"]:
+            total_questions = sum(len(section["questions"]) for section in paper["sections"])
+            paper_images = 0
+            for section in paper["sections"]:
+                for question in section["questions"]:
+                    self.questions[question["id"]] = QuestionDetail(
+                        section_name=section["section_name"], **question
+                    )
+                    self.question_years[question["id"]] = paper["year"]
+                    minhash = question.get("minhash")
+                    signatures[question["id"]] = bytes.fromhex(minhash) if minhash else None
+                    metadata_rows.append((
+                        question["id"], paper["year"], section["section_name"],
+                        question.get("difficulty"), question.get("concept_tags")
+                    ))
+                    paper_images += len(question["images"])
+            total_images += paper_images
+
+            fields = {key: paper[key] for key in ("id", "year", "province", "subject", "exam_type")}
+            self.papers.append(PaperSummary(
+                total_sections=len(paper["sections"]),
+                total_questions=total_questions,
+                total_images=paper_images,
+                created_at=created_at,
+                **fields
+            ))
+            detail = PaperDetail(sections=paper["sections"], created_at=created_at, **fields)
+            key = (paper["year"], paper["province"], paper["subject"])
+            self.paper_bodies[key] = detail.model_dump_json().encode("utf-8")
+            self.paper_data[key] = paper
+
+        self.papers.sort(key=lambda p: (p.year, p.id), reverse=True)
+        self.question_ids = sorted(self.questions)
+        self.metadata_index = MetadataIndex(metadata_rows)
+        self.lsh_index = LshIndex(signatures)
+
+        years = [p.year for p in self.papers]
+        self.stats = StatsResponse(
+            total_papers=len(self.papers),
+            total_questions=len(self.questions),
+            total_images=total_images,
+            year_range={"start": min(years, default=0), "end": max(years, default=0)},
+            provinces=sorted({p.province for p in self.papers}),
+            subjects=sorted({p.subject for p in self.papers}),
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "EmbeddedBank":
+        """载入索引文件"""
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def paper_body(self, year: int, province: str, subject: str) -> Optional[bytes]:
+        """试卷详情 JSON"""
+        return self.paper_bodies.get((year, province, subject))
+
+    def paper_fields_body(self, year: int, province: str, subject: str,
+                          fieldset: FrozenSet[str]) -> Optional[bytes]:
+        """按所选题目字段渲染试卷详情 JSON"""
+        paper = self.paper_data.get((year, province, subject))
+        if paper is None:
+            return None
+        return orjson.dumps({
+            **{key: paper[key] for key in ("year", "province", "subject", "exam_type", "id")},
+            "sections": [
+                {
+                    "id": section["id"],
+                    "section_number": section["section_number"],
+                    "section_name": section["section_name"],
+                    "questions": [
+                        select_fields({**q, "content_preview": q["content"]}, fieldset, PAPER_QUESTION_FIELDS)
+                        for q in section["questions"]
+                    ],
+                }
+                for section in paper["sections"]
+            ],
+            "created_at": self.created_at,
+        })
+
+    def question(self, question_id: int) -> Optional[QuestionDetail]:
+        """按ID取题目"""
+        return self.questions.get(question_id)
+
+    def questions_after(self, last_id: int) -> Iterable[QuestionDetail]:
+        """按ID顺序遍历大于 last_id 的题目"""
+        for question_id in self.question_ids[bisect_right(self.question_ids, last_id):]:
+            yield self.questions[question_id]
+
+
+# 当前载入的题库（嵌入模式启动时设置）
+bank: Optional[EmbeddedBank] = None
+
+
+def load_bank(path: Path = EMBEDDED_INDEX_PATH) -> EmbeddedBank:
+    """载入索引文件并设为当前题库"""
+    global bank
+    bank = EmbeddedBank.load(path)
+    return bank
+
+
+def get_bank() -> EmbeddedBank:
+    """当前题库（未载入时抛出 RuntimeError）"""
+    if bank is None:
+        raise RuntimeError("嵌入式题库尚未载入")
+    return bank
@@ -0,0 +1,132 @@
+"""
+稀疏字段集（fields= / exclude=）
+
+列表页通常只需要题号、题目首行和章节，不需要完整的题目内容、答案和图片。
+接口通过 fields（只返回这些字段）或 exclude（默认字段中去掉这些字段）
+指定题目字段，查询只加载所需的列（其余列延迟加载、不会读取），
+响应也只包含所选字段。两个参数都不传时返回完整的默认响应。
+
+content_preview 为题目内容首行（最多 PREVIEW_LENGTH 个字符），不在默认字段中，
+需要通过 fields 显式请求；数据库只截取前 PREVIEW_LENGTH 个字符，不读取整段内容。
+"""
+from typing import FrozenSet, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload, load_only, selectinload, with_expression
+from app.models.database import Question, Section
+
+PREVIEW_LENGTH = 80
+
+# 题目详情/搜索结果的字段
+QUESTION_FIELDS = ("id", "question_number", "content", "content_preview", "answer",
+                   "section_name", "images")
+QUESTION_DEFAULT_FIELDS = ("id", "question_number", "content", "answer", "section_name", "images")
+SEARCH_FIELDS = QUESTION_FIELDS + ("snippet",)
+SEARCH_DEFAULT_FIELDS = QUESTION_DEFAULT_FIELDS + ("snippet",)
+
+# 试卷详情中章节下的题目字段
+PAPER_QUESTION_FIELDS = ("id", "question_number", "content", "content_preview", "answer")
+PAPER_QUESTION_DEFAULT_FIELDS = ("question_number", "content", "answer")
+
+
+class InvalidFieldset(ValueError):
+    """字段列表包含未知字段或参数冲突"""
+
+
+def _split(value: str) -> list:
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+def parse_fieldset(fields: Optional[str], exclude: Optional[str],
+                   available: Tuple[str, ...], default: Tuple[str, ...]) -> Optional[FrozenSet[str]]:
+    """
+    解析 fields/exclude 参数，返回所选字段集合
+
+    两个参数都为空时返回 None（使用完整的默认响应）。
+    """
+    if fields is None and exclude is None:
+        return None
+    if fields is not None and exclude is not None:
+        raise InvalidFieldset("fields 和 exclude 不能同时使用")
+
+    names = _split(fields if fields is not None else exclude)
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise InvalidFieldset(
+            f"未知字段: {', '.join(unknown)}（可选: {', '.join(available)}）"
+        )
+    if fields is not None:
+        if not names:
+            raise InvalidFieldset("fields 不能为空")
+        return frozenset(names)
+    return frozenset(default) - frozenset(names)
+
+
+def content_preview(content: Optional[str]) -> str:
+    """题目内容首行（最多 PREVIEW_LENGTH 个字符）"""
+    if not content:
+        return ""
+    return content[:PREVIEW_LENGTH].split("\n", 1)[0].rstrip()
+
+
+def question_load_options(fieldset: FrozenSet[str], with_section: bool = True) -> list:
+    """只加载所选字段所需的列和关联（未选的 content/answer 延迟加载，不会读取）"""
+    columns = [
+        getattr(Question, name) for name in ("question_number", "content", "answer")
+        if name in fieldset
+    ]
+    options = [load_only(Question.id, *columns)]
+    if "content_preview" in fieldset:
+        options.append(with_expression(
+            Question.content_preview, func.substr(Question.content, 1, PREVIEW_LENGTH)
+        ))
+    if with_section and "section_name" in fieldset:
+        options.append(joinedload(Question.section).load_only(Section.section_name))
+    if "images" in fieldset:
+        options.append(selectinload(Question.images))
+    return options
+
+
+def image_fields(img) -> dict:
+    """ORM 图片转换为响应字典"""
+    return {
+        "alt_text": img.alt_text,
+        "url": img.url,
+        "position": img.position,
+        "caption": img.caption,
+        "question_ref": img.question_ref,
+        "image_hash": img.image_hash,
+        "width": img.width,
+        "height": img.height
+    }
+
+
+def question_fields(q: Question, fieldset: FrozenSet[str], available: Tuple[str, ...], **extra) -> dict:
+    """ORM 题目按所选字段转换为响应字典（只访问已加载的属性）"""
+    result = {}
+    for name in available:
+        if name not in fieldset:
+            continue
+        if name in extra:
+            result[name] = extra[name]
+        elif name == "content_preview":
+            result[name] = content_preview(q.content_preview)
+        elif name == "section_name":
+            result[name] = q.section.section_name
+        elif name == "images":
+            result[name] = [image_fields(img) for img in q.images]
+        else:
+            result[name] = getattr(q, name)
+    return result
+
+
+def select_fields(values: dict, fieldset: FrozenSet[str], available: Tuple[str, ...]) -> dict:
+    """字典按所选字段取值（content_preview 由 values["content_preview"] 中的内容生成）"""
+    result = {}
+    for name in available:
+        if name not in fieldset:
+            continue
+        if name == "content_preview":
+            result[name] = content_preview(values[name])
+        else:
+            result[name] = values[name]
+    return result
@@ -0,0 +1,295 @@
+"""
+内容寻址的图片库
+
+题目图片在导入时读取原图字节，按 SHA-256 存入 IMAGE_STORE_DIR（默认 ./image_store）：
+原图为 <哈希前两位>/<哈希>.<扩展名>，各宽度的缩略图为 <哈希>_w<宽度>.<扩展名>。
+相同的图片（如多年试卷重复使用的插图）只存一份；question_images 记录内容哈希和宽高。
+
+原图来源：
+- IMAGE_SOURCE_DIR：本地图片目录，按 URL 中的文件名查找（如解析工具输出的 images 目录），
+  只读取解析后仍在该目录内的文件；数据文件中的本地路径和 file:// URL 不会被读取
+- IMAGE_FETCH_REMOTE=true 时下载 http(s) URL（默认关闭）。导入在写事务中执行，
+  导入时从不下载，下载只在 scripts/ingest_images.py 回填和构建嵌入索引时进行
+都找不到时图片只保留原始 URL，哈希和宽高为空。
+
+缩略图宽度由 IMAGE_VARIANT_WIDTHS 控制（默认 320,640,1280），只生成比原图窄的宽度；
+生成缩略图需要 Pillow（可选依赖，未安装时只存原图）。GIF 可能是动图，不生成缩略图。
+
+内容哈希决定文件内容，图片接口（/api/images/{哈希}）按不可变资源返回长期缓存头。
+图片库是独立的目录，不在数据库快照中，部署时需要一并同步。
+"""
+import hashlib
+import os
+import urllib.request
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - 未安装 Pillow 时不生成缩略图
+    Image = None
+
+IMAGE_STORE_DIR = Path(os.getenv("IMAGE_STORE_DIR", "./image_store"))
+IMAGE_SOURCE_DIR = os.getenv("IMAGE_SOURCE_DIR")
+IMAGE_FETCH_REMOTE = os.getenv("IMAGE_FETCH_REMOTE", "false").lower() == "true"
+IMAGE_VARIANT_WIDTHS = tuple(sorted(
+    int(width) for width in os.getenv("IMAGE_VARIANT_WIDTHS", "320,640,1280").split(",") if width.strip()
+))
+
+FETCH_TIMEOUT_SECONDS = 10
+MAX_IMAGE_BYTES = 20 * 1024 * 1024
+
+# 扩展名 -> Content-Type
+CONTENT_TYPES = {
+    "jpg": "image/jpeg",
+    "png": "image/png",
+    "gif": "image/gif",
+    "webp": "image/webp",
+}
+# 扩展名 -> Pillow 保存格式及参数
+_SAVE_OPTIONS = {
+    "jpg": ("JPEG", {"quality": 85, "optimize": True, "progressive": True}),
+    "png": ("PNG", {"optimize": True}),
+    "webp": ("WEBP", {"quality": 80}),
+}
+
+# 题目图片行中由图片库填写的字段
+EMPTY_IMAGE_FIELDS = {"image_hash": None, "width": None, "height": None}
+
+# JPEG 中携带图片尺寸的帧头标记（SOF0-SOF15，除去 DHT/JPG/DAC）
+_JPEG_SOF = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+class StoredImage(NamedTuple):
+    """存入图片库的图片"""
+    image_hash: str
+    extension: str
+    width: int
+    height: int
+
+
+class RangeNotSatisfiable(ValueError):
+    """Range 请求超出文件范围"""
+
+
+def _jpeg_size(data: bytes) -> Optional[Tuple[int, int]]:
+    i = 2
+    while i + 9 <= len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:  # 填充字节
+            i += 1
+            continue
+        if marker in _JPEG_SOF:
+            return int.from_bytes(data[i + 7:i + 9], "big"), int.from_bytes(data[i + 5:i + 7], "big")
+        if 0xD0 <= marker <= 0xD9 or marker == 0x01:  # 无长度字段的标记
+            i += 2
+            continue
+        i += 2 + int.from_bytes(data[i + 2:i + 4], "big")
+    return None
+
+
+def _webp_size(data: bytes) -> Optional[Tuple[int, int]]:
+    chunk = data[12:16]
+    if chunk == b"VP8 " and len(data) >= 30:
+        return (int.from_bytes(data[26:28], "little") & 0x3FFF,
+                int.from_bytes(data[28:30], "little") & 0x3FFF)
+    if chunk == b"VP8L" and len(data) >= 25:
+        bits = int.from_bytes(data[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X" and len(data) >= 30:
+        return int.from_bytes(data[24:27], "little") + 1, int.from_bytes(data[27:30], "little") + 1
+    return None
+
+
+def sniff_image(data: bytes) -> Optional[Tuple[str, int, int]]:
+    """由文件头识别图片格式和宽高，返回 (扩展名, 宽, 高)；不支持的格式返回 None"""
+    size = None
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and len(data) >= 24:
+        extension = "png"
+        size = int.from_bytes(data[16:20], "big"), int.from_bytes(data[20:24], "big")
+    elif data[:3] == b"\xff\xd8\xff":
+        extension = "jpg"
+        size = _jpeg_size(data)
+    elif data[:6] in (b"GIF87a", b"GIF89a") and len(data) >= 10:
+        extension = "gif"
+        size = int.from_bytes(data[6:8], "little"), int.from_bytes(data[8:10], "little")
+    elif data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        extension = "webp"
+        size = _webp_size(data)
+    if size is None:
+        return None
+    return (extension,) + size
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    解析单段 Range 请求头，返回 [start, end] 闭区间
+
+    不是单段 bytes 范围时返回 None（返回完整内容）；范围超出文件时抛出 RangeNotSatisfiable。
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    start, dash, end = spec.strip().partition("-")
+    if not dash:
+        return None
+    try:
+        if not start:
+            # bytes=-N：最后 N 个字节
+            length = int(end)
+            if length <= 0:
+                raise RangeNotSatisfiable(header)
+            return max(size - length, 0), size - 1
+        first = int(start)
+        last = int(end) if end else size - 1
+    except ValueError:
+        return None
+    if first >= size:
+        raise RangeNotSatisfiable(header)
+    if first > last:
+        return None
+    return first, min(last, size - 1)
+
+
+class ImageStore:
+    """磁盘上的内容寻址图片库"""
+
+    def __init__(self, root: Path, variant_widths: Sequence[int] = IMAGE_VARIANT_WIDTHS):
+        self.root = root
+        self.variant_widths = tuple(sorted(variant_widths))
+        self._extensions: Dict[str, str] = {}  # 哈希 -> 扩展名（只记录已找到的原图）
+
+    def path(self, image_hash: str, extension: str, width: Optional[int] = None) -> Path:
+        """原图或指定宽度缩略图的路径"""
+        name = image_hash if width is None else f"{image_hash}_w{width}"
+        return self.root / image_hash[:2] / f"{name}.{extension}"
+
+    def _write(self, path: Path, data: bytes):
+        """先写临时文件再改名，并发读取不会读到写了一半的文件"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+    def put(self, data: bytes) -> Optional[StoredImage]:
+        """存入图片（已存在的相同内容不重复写入），不支持的格式返回 None"""
+        sniffed = sniff_image(data)
+        if sniffed is None:
+            return None
+        extension, width, height = sniffed
+        image = StoredImage(hashlib.sha256(data).hexdigest(), extension, width, height)
+
+        path = self.path(image.image_hash, extension)
+        if not path.exists():
+            # 先写缩略图再写原图：原图存在即表示该图片已完整存入
+            try:
+                self._write_variants(image, data)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ 缩略图生成失败: {image.image_hash} ({e})")
+            self._write(path, data)
+        self._extensions[image.image_hash] = extension
+        return image
+
+    def _write_variants(self, image: StoredImage, data: bytes):
+        """生成比原图窄的各宽度缩略图"""
+        if Image is None or image.extension not in _SAVE_OPTIONS:
+            return
+        widths = [width for width in self.variant_widths if width < image.width]
+        if not widths:
+            return
+        image_format, options = _SAVE_OPTIONS[image.extension]
+        with Image.open(BytesIO(data)) as original:
+            original.load()
+            if image_format == "JPEG" and original.mode not in ("RGB", "L"):
+                original = original.convert("RGB")
+            for width in widths:
+                height = max(1, round(image.height * width / image.width))
+                buffer = BytesIO()
+                original.resize((width, height), Image.LANCZOS).save(buffer, image_format, **options)
+                self._write(self.path(image.image_hash, image.extension, width), buffer.getvalue())
+
+    def locate(self, image_hash: str, width: Optional[int] = None) -> Optional[Tuple[Path, str, Optional[int]]]:
+        """
+        查找图片文件，返回 (路径, 扩展名, 缩略图宽度)；不存在时返回 None
+
+        指定 width 时返回不窄于 width 的最小缩略图，没有时（原图本身不够宽）返回原图，
+        此时缩略图宽度为 None。
+        """
+        extension = self._extensions.get(image_hash)
+        if extension is None:
+            for candidate in CONTENT_TYPES:
+                if self.path(image_hash, candidate).exists():
+                    extension = self._extensions[image_hash] = candidate
+                    break
+            else:
+                return None
+        if width is not None:
+            for variant_width in self.variant_widths:
+                if variant_width >= width:
+                    path = self.path(image_hash, extension, variant_width)
+                    if path.exists():
+                        return path, extension, variant_width
+        return self.path(image_hash, extension), extension, None
+
+
+class ImageIngester:
+    """导入时把题目图片存入图片库（同一次导入中相同 URL 只处理一次）"""
+
+    def __init__(self, store: Optional[ImageStore] = None, source_dir: Optional[str] = IMAGE_SOURCE_DIR,
+                 fetch_remote: bool = IMAGE_FETCH_REMOTE):
+        self.store = store or image_store
+        self.source_dir = Path(source_dir).resolve() if source_dir else None
+        self.fetch_remote = fetch_remote
+        self._fields: Dict[str, dict] = {}
+        self._hashes = set()
+        self.stored = 0  # 本次导入存入的不同图片数
+        self.missing = 0  # 找不到原图的 URL 数
+
+    @property
+    def enabled(self) -> bool:
+        return self.source_dir is not None or self.fetch_remote
+
+    def _read(self, url: str) -> Optional[bytes]:
+        """按配置的来源读取原图（本地文件限定在 source_dir 内）"""
+        parsed = urlparse(url)
+        if self.source_dir is not None:
+            # 解析符号链接和 ".." 后仍须位于图片目录内
+            path = (self.source_dir / Path(parsed.path).name).resolve()
+            if path.is_relative_to(self.source_dir) and path.is_file():
+                return path.read_bytes()
+        if self.fetch_remote and parsed.scheme in ("http", "https"):
+            try:
+                with urllib.request.urlopen(url, timeout=FETCH_TIMEOUT_SECONDS) as response:
+                    return response.read(MAX_IMAGE_BYTES + 1)  # 超过上限的不存入
+            except OSError as e:
+                print(f"⚠️ 图片下载失败: {url} ({e})")
+        return None
+
+    def ingest(self, url: str) -> dict:
+        """读取并存入图片，返回题目图片行的 image_hash/width/height 字段"""
+        if not self.enabled:
+            return EMPTY_IMAGE_FIELDS
+        fields = self._fields.get(url)
+        if fields is not None:
+            return fields
+
+        data = self._read(url)
+        image = self.store.put(data) if data and len(data) <= MAX_IMAGE_BYTES else None
+        if image is None:
+            self.missing += 1
+            fields = EMPTY_IMAGE_FIELDS
+        else:
+            if image.image_hash not in self._hashes:
+                self._hashes.add(image.image_hash)
+                self.stored += 1
+            fields = {"image_hash": image.image_hash, "width": image.width, "height": image.height}
+        self._fields[url] = fields
+        return fields
+
+
+# 全局图片库（导入和图片接口共用）
+image_store = ImageStore(IMAGE_STORE_DIR)
@@ -0,0 +1,698 @@
+"""
+题库数据导入
+
+导入逻辑使用同步 Session，既可以在脚本中直接调用，也可以在异步路由中
+通过 AsyncSession.run_sync() 执行。
+
+BulkImporter 在导入开始时读取各表当前最大ID，为新行预先分配ID，
+行数据先在内存中按表累积，达到批量大小后按外键顺序以 executemany
+批量插入，不再逐行 flush 取自增ID。默认整个导入在一个事务中完成，
+也可以每导入 chunk_size 张试卷提交一次。
+
+数据文件按试卷逐个流式解析（iter_papers），边解析边写入，
+内存占用与文件大小无关。支持：
+- 批量格式 JSON：{"meta": {...}, "papers": [...]}
+- 单年份格式 JSON：{"meta": {...}, "paper": {...}}
+- NDJSON（.ndjson / .jsonl）：每行一张试卷
+
+新写入或内容变化的题目同时计算 MinHash 签名和 LSH 桶（见 app.services.similarity），
+内容未变的题目不重算。这些题目的图片同时从本地图片目录存入图片库（见 app.services.images），
+记录内容哈希和宽高；导入不下载远程图片。
+
+多个文件（如按年份拆分的数据）可通过 import_paper_files 导入：
+解析和校验在进程池中并行进行，写入仍由调用方的单个会话串行完成。
+"""
+import hashlib
+import json
+import re
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session
+from app.models.database import Paper, Section, Question, QuestionImage, QuestionLsh
+from app.models.schemas import ImportChanges, ImportResponse
+from app.services.images import ImageIngester
+from app.services.similarity import content_signature, lsh_buckets
+from app.services.stats import StatsDelta, apply_stats_delta
+
+# 累积的题目数达到该值时写入一批
+DEFAULT_BATCH_SIZE = 5000
+
+# 预分配ID的表
+_TABLES = (Paper, Section, Question, QuestionImage)
+# 按外键依赖排列的插入顺序
+_INSERT_ORDER = (Paper, Section, Question, QuestionLsh, QuestionImage)
+
+
+# 流式解析每次读取的字符数
+_READ_SIZE = 1 << 16
+# 解码错误位于缓冲末尾这么多字符以内时，可能只是值被分块截断（如 "tru"、"\u00"），补读后重试
+_TRUNCATION_MARGIN = 16
+_WHITESPACE = re.compile(r"\s*")
+NDJSON_SUFFIXES = {".ndjson", ".jsonl"}
+
+
+class _JsonStream:
+    """在分块读取的文本上逐个解码 JSON 值，只保留当前值所需的缓冲"""
+
+    def __init__(self, f):
+        self.f = f
+        self.buf = ""
+        self.pos = 0
+        self.consumed = 0  # 已丢弃的缓冲之前的字符数
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        chunk = self.f.read(_READ_SIZE)
+        if not chunk:
+            self.eof = True
+        self.consumed += self.pos
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+
+    def _error(self, message: str, pos: int) -> ValueError:
+        """带文件中绝对位置（字符数）的格式错误"""
+        return ValueError(f"JSON 格式错误: {message}，位置 {self.consumed + pos}")
+
+    def peek(self) -> str:
+        """跳过空白，返回下一个字符（结尾时返回空串）"""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf) or self.eof:
+                return self.buf[self.pos:self.pos + 1]
+            self._fill()
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise self._error(f"期望 '{char}'", self.pos)
+        self.pos += 1
+
+    def value(self):
+        """解码下一个完整的 JSON 值"""
+        self.peek()
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as e:
+                # 只有值在缓冲末尾被截断时才补读；文件中间的格式错误立即报错，不把剩余文件读入缓冲
+                truncated = e.msg.startswith("Unterminated string") or e.pos >= len(self.buf) - _TRUNCATION_MARGIN
+                if self.eof or not truncated:
+                    raise self._error(e.msg, e.pos) from e
+                self._fill()
+                continue
+            if end == len(self.buf) and not self.eof:
+                # 值恰好在缓冲末尾结束（如被截断的数字），补读后重新解码
+                self._fill()
+                continue
+            self.pos = end
+            return obj
+
+
+def _iter_json_papers(f) -> Iterator[dict]:
+    """流式解析批量格式或单年份格式的 JSON"""
+    stream = _JsonStream(f)
+    stream.expect("{")
+    if stream.peek() == "}":
+        return
+
+    while True:
+        key = stream.value()
+        stream.expect(":")
+        if key == "papers":
+            stream.expect("[")
+            if stream.peek() == "]":
+                stream.pos += 1
+            else:
+                while True:
+                    yield stream.value()
+                    if stream.peek() == ",":
+                        stream.pos += 1
+                        continue
+                    stream.expect("]")
+                    break
+        elif key == "paper":
+            yield stream.value()
+        else:
+            stream.value()  # meta 等其它字段
+
+        if stream.peek() == ",":
+            stream.pos += 1
+            continue
+        stream.expect("}")
+        return
+
+
+def _iter_ndjson_papers(f) -> Iterator[dict]:
+    """逐行解析 NDJSON"""
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        record = json.loads(line)
+        yield record.get("paper", record)
+
+
+def iter_papers(data_path: Path,
+                on_read: Optional[Callable[[int], None]] = None) -> Iterator[dict]:
+    """按试卷逐个读取数据文件，on_read 在每张试卷之后收到已读取的字节数"""
+    with open(data_path, 'r', encoding='utf-8') as f:
+        if data_path.suffix.lower() in NDJSON_SUFFIXES:
+            papers = _iter_ndjson_papers(f)
+        else:
+            papers = _iter_json_papers(f)
+        for paper_data in papers:
+            if on_read is not None:
+                on_read(f.buffer.tell())
+            yield paper_data
+
+
+def validate_paper(paper_data: dict):
+    """校验试卷数据的必填字段，不合法时抛出 ValueError"""
+    if not isinstance(paper_data, dict):
+        raise ValueError(f"试卷不是对象: {type(paper_data).__name__}")
+    for field in ('year', 'province', 'subject'):
+        if field not in paper_data:
+            raise ValueError(f"试卷缺少字段: {field}")
+    if not isinstance(paper_data['year'], int):
+        raise ValueError(f"试卷年份不是整数: {paper_data['year']!r}")
+
+    label = f"{paper_data['year']}年{paper_data['province']}{paper_data['subject']}"
+    for section_data in paper_data.get('sections', []):
+        for field in ('section_number', 'section_name'):
+            if field not in section_data:
+                raise ValueError(f"{label}: 章节缺少字段: {field}")
+        for question_data in section_data.get('questions', []):
+            if not isinstance(question_data.get('question_number'), int):
+                raise ValueError(f"{label}: 题号缺失或不是整数")
+            metadata = question_data.get('metadata')
+            if metadata is not None:
+                _validate_metadata(label, question_data['question_number'], metadata)
+            for image_data in question_data.get('images', []):
+                if 'url' not in image_data:
+                    raise ValueError(
+                        f"{label}: 第{question_data['question_number']}题图片缺少 url"
+                    )
+
+
+def _validate_metadata(label: str, question_number: int, metadata):
+    """校验题目标注元数据（字段均可缺省）"""
+    prefix = f"{label}: 第{question_number}题元数据"
+    if not isinstance(metadata, dict):
+        raise ValueError(f"{prefix}不是对象")
+    difficulty = metadata.get('difficulty')
+    if difficulty is not None and (not isinstance(difficulty, int) or not 1 <= difficulty <= 5):
+        raise ValueError(f"{prefix}难度不是 1-5 的整数: {difficulty!r}")
+    for field in ('conceptTags', 'skills'):
+        values = metadata.get(field)
+        if values is not None and not (
+            isinstance(values, list) and all(isinstance(v, str) for v in values)
+        ):
+            raise ValueError(f"{prefix} {field} 不是字符串列表")
+
+
+def question_metadata(question_data: dict) -> dict:
+    """题目标注元数据对应的列值（未标注时全部为 None）"""
+    metadata = question_data.get('metadata') or {}
+    return {
+        "difficulty": metadata.get('difficulty'),
+        "time_estimate_sec": metadata.get('timeEstimateSec'),
+        "concept_tags": metadata.get('conceptTags'),
+        "skills": metadata.get('skills'),
+    }
+
+
+def validate_file(data_path) -> int:
+    """流式校验数据文件中的全部试卷（不保留试卷数据），返回试卷数；不合法时抛出 ValueError"""
+    count = 0
+    for paper_data in iter_papers(Path(data_path)):
+        validate_paper(paper_data)
+        count += 1
+    return count
+
+
+def parse_paper_file(data_path) -> List[dict]:
+    """读取并校验一个数据文件中的全部试卷（可在子进程中执行）"""
+    papers = list(iter_papers(Path(data_path)))
+    for paper_data in papers:
+        validate_paper(paper_data)
+    return papers
+
+
+def _hash(*parts) -> str:
+    """规范化 JSON 的 SHA-1"""
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _normalize_paper(paper_data: dict) -> Tuple[dict, list]:
+    """
+    把试卷数据整理为待写入的行（不含ID），并计算内容哈希
+
+    返回 (试卷字段, [(章节行, [(题目行, [图片行])])])。
+    题目哈希覆盖题目字段和图片，章节哈希只覆盖章节自身字段，
+    试卷哈希覆盖整棵试卷树，内容没变的试卷可以直接跳过。
+    """
+    sections = []
+    total_questions = 0
+    total_images = 0
+    for idx, section_data in enumerate(paper_data.get('sections', [])):
+        questions = []
+        for question_data in section_data.get('questions', []):
+            question_row = {
+                "question_number": question_data['question_number'],
+                "content": question_data.get('content', ''),
+                "answer": question_data.get('answer', None),
+                **question_metadata(question_data),
+            }
+            images = [
+                {
+                    "alt_text": image_data.get('alt_text'),
+                    "url": image_data['url'],
+                    "position": image_data.get('position', 'inline'),
+                    "caption": image_data.get('caption'),
+                    "question_ref": image_data.get('question_ref'),
+                }
+                for image_data in question_data.get('images', [])
+            ]
+            question_row["content_hash"] = _hash(question_row, images)
+            questions.append((question_row, images))
+            total_questions += 1
+            total_images += len(images)
+
+        section_row = {
+            "section_number": section_data['section_number'],
+            "section_name": section_data['section_name'],
+            "order_index": idx,
+        }
+        section_row["content_hash"] = _hash(section_row)
+        sections.append((section_row, questions))
+
+    paper_row = {
+        "exam_type": paper_data.get('exam_type', '专升本'),
+        "total_sections": len(sections),
+        "total_questions": total_questions,
+        "total_images": total_images,
+    }
+    paper_row["content_hash"] = _hash(paper_row, [
+        [section_row["content_hash"], [question_row["content_hash"] for question_row, _ in questions]]
+        for section_row, questions in sections
+    ])
+    return paper_row, sections
+
+
+def _match_key(seen: Counter, *key) -> tuple:
+    """新旧行匹配用的键：编号相同的行按出现次序区分"""
+    occurrence = seen[key]
+    seen[key] += 1
+    return key + (occurrence,)
+
+
+class BulkImporter:
+    """批量导入器：预分配ID，按表批量插入"""
+
+    def __init__(self, db: Session, overwrite: bool = False, batch_size: int = DEFAULT_BATCH_SIZE,
+                 diff: bool = False):
+        self.db = db
+        self.overwrite = overwrite
+        self.batch_size = batch_size
+        self.diff = diff
+
+        self.papers_imported = 0
+        self.questions_imported = 0
+        self.images_imported = 0
+        self.changes = Counter()
+
+        # 各表下一个可用ID
+        self._next_ids = {
+            model: (db.scalar(select(func.max(model.id))) or 0) + 1
+            for model in _TABLES
+        }
+        # 已存在试卷：(年份, 省份, 科目) -> ID
+        self._existing = {
+            (year, province, subject): paper_id
+            for paper_id, year, province, subject in db.execute(
+                select(Paper.id, Paper.year, Paper.province, Paper.subject)
+            )
+        }
+        # 本次导入写入过的试卷内容哈希（其余试卷差量比较时按主键查询）
+        self._hashes = {}
+        self._pending = {model: [] for model in _INSERT_ORDER}
+        self._pending_paper_ids = set()
+        # 导入持有写锁，不下载远程图片（由 scripts/ingest_images.py 回填）
+        self._images = ImageIngester(fetch_remote=False)
+        # 自上次提交以来对统计的增量
+        self._stats = StatsDelta()
+
+    def _allocate_id(self, model) -> int:
+        """预分配ID"""
+        new_id = self._next_ids[model]
+        self._next_ids[model] = new_id + 1
+        return new_id
+
+    def _paper_counts(self, paper_id: int) -> Tuple[int, int]:
+        """已写入试卷的冗余题目数和图片数"""
+        return tuple(self.db.execute(
+            select(Paper.total_questions, Paper.total_images).where(Paper.id == paper_id)
+        ).one())
+
+    def _delete_paper(self, paper_id: int, key: tuple):
+        """删除已存在的试卷（级联删除相关数据）"""
+        if paper_id in self._pending_paper_ids:
+            # 同一文件中重复出现的试卷，先写入再删除
+            self.flush()
+        self._stats.remove_paper(key, *self._paper_counts(paper_id))
+        self.db.execute(delete(Paper).where(Paper.id == paper_id))
+
+    def _add_question(self, section_id: int, question_row: dict, images: list,
+                      question_id: Optional[int] = None, signature: Optional[bytes] = None) -> int:
+        """
+        加入题目、LSH 桶和图片行（图片同时存入图片库）
+
+        question_id 为空时新分配ID并插入题目；否则为更新已有题目，
+        题目行由调用方更新（签名由调用方计算后传入）。
+        """
+        if question_id is None:
+            question_id = self._allocate_id(Question)
+            signature = content_signature(question_row["content"])
+            self._pending[Question].append({
+                "id": question_id, "section_id": section_id, **question_row, "minhash": signature
+            })
+        if signature is not None:
+            for band, bucket in lsh_buckets(signature):
+                self._pending[QuestionLsh].append({"band": band, "bucket": bucket, "question_id": question_id})
+        for image_row in images:
+            self._pending[QuestionImage].append({
+                "id": self._allocate_id(QuestionImage),
+                "question_id": question_id,
+                **image_row,
+                **self._images.ingest(image_row["url"]),
+            })
+        return question_id
+
+    def add_paper(self, paper_data: dict) -> bool:
+        """加入一张试卷，返回是否写入（已存在且不覆盖、或差量导入时内容未变则跳过）"""
+        year = paper_data['year']
+        province = paper_data['province']
+        subject = paper_data['subject']
+        key = (year, province, subject)
+        paper_row, sections = _normalize_paper(paper_data)
+
+        # 检查是否已存在
+        existing_id = self._existing.get(key)
+        if existing_id is not None and self.diff:
+            return self._diff_paper(existing_id, paper_row, sections)
+        elif existing_id is not None and not self.overwrite:
+            print(f"跳过已存在的试卷: {year}年{province}{subject}")
+            return False
+        elif existing_id is not None:
+            self._delete_paper(existing_id, key)
+
+        paper_id = self._allocate_id(Paper)
+        self._pending[Paper].append({
+            "id": paper_id,
+            "year": year,
+            "province": province,
+            "subject": subject,
+            **paper_row,
+        })
+
+        # 章节和题目
+        for section_row, questions in sections:
+            section_id = self._allocate_id(Section)
+            self._pending[Section].append({"id": section_id, "paper_id": paper_id, **section_row})
+            for question_row, images in questions:
+                self._add_question(section_id, question_row, images)
+            self.changes["sections_inserted"] += 1
+            self.changes["questions_inserted"] += len(questions)
+
+        self._pending_paper_ids.add(paper_id)
+        self._existing[key] = paper_id
+        self._hashes[paper_id] = paper_row["content_hash"]
+
+        self.papers_imported += 1
+        self.questions_imported += paper_row["total_questions"]
+        self.images_imported += paper_row["total_images"]
+        self.changes["papers_inserted"] += 1
+        self._stats.add_paper(key, paper_row["total_questions"], paper_row["total_images"])
+
+        if len(self._pending[Question]) >= self.batch_size:
+            self.flush()
+        return True
+
+    def _diff_paper(self, paper_id: int, paper_row: dict, sections: list) -> bool:
+        """
+        差量更新已存在的试卷，返回是否有变化
+
+        章节按章节号与已有章节匹配；题目先在同一章节内按题号匹配，
+        剩下的再按题号在整张试卷范围内匹配（题目换了章节）。
+        哈希相同的行不动，变化的行原地更新（保留ID），多出的行插入，缺少的行删除。
+        """
+        if paper_id not in self._hashes:
+            self._hashes[paper_id] = self.db.scalar(
+                select(Paper.content_hash).where(Paper.id == paper_id)
+            )
+        if self._hashes[paper_id] == paper_row["content_hash"]:
+            self.changes["papers_unchanged"] += 1
+            self.changes["questions_unchanged"] += paper_row["total_questions"]
+            return False
+        if paper_id in self._pending_paper_ids:
+            # 同一文件中重复出现的试卷：先写入上一次的待插入行，再与数据库比较，
+            # 否则会删除待插入行引用的章节，或重复插入 LSH 桶和图片行
+            self.flush()
+
+        db = self.db
+        seen = Counter()
+        old_sections = {
+            _match_key(seen, number): (section_id, content_hash)
+            for section_id, number, content_hash in db.execute(
+                select(Section.id, Section.section_number, Section.content_hash)
+                .where(Section.paper_id == paper_id)
+                .order_by(Section.order_index, Section.id)
+            )
+        }
+        seen = Counter()
+        old_questions = {
+            _match_key(seen, section_id, number): (question_id, section_id, content_hash)
+            for question_id, section_id, number, content_hash in db.execute(
+                select(Question.id, Question.section_id, Question.question_number, Question.content_hash)
+                .join(Section, Question.section_id == Section.id)
+                .where(Section.paper_id == paper_id)
+                .order_by(Section.order_index, Question.id)
+            )
+        }
+
+        section_inserts, section_updates = [], []
+        incoming = []  # [章节ID, 题目行, 图片行, 匹配到的旧题目]
+        seen_sections, seen_questions = Counter(), Counter()
+        for section_row, questions in sections:
+            old = old_sections.pop(_match_key(seen_sections, section_row["section_number"]), None)
+            if old is None:
+                section_id = self._allocate_id(Section)
+                section_inserts.append({"id": section_id, "paper_id": paper_id, **section_row})
+                self.changes["sections_inserted"] += 1
+            else:
+                section_id, old_hash = old
+                if old_hash != section_row["content_hash"]:
+                    section_updates.append({"id": section_id, **section_row})
+                    self.changes["sections_updated"] += 1
+
+            for question_row, images in questions:
+                key = _match_key(seen_questions, section_id, question_row["question_number"])
+                incoming.append([section_id, question_row, images, old_questions.pop(key, None)])
+
+        # 同章节内没匹配上的题目，按题号在其余旧题目中匹配
+        leftovers = defaultdict(list)
+        for (_, number, _), old in old_questions.items():
+            leftovers[number].append(old)
+        for entry in incoming:
+            number = entry[1]["question_number"]
+            if entry[3] is None and leftovers[number]:
+                entry[3] = leftovers[number].pop(0)
+
+        question_updates, stale_images = [], []
+        for section_id, question_row, images, old in incoming:
+            if old is None:
+                self._add_question(section_id, question_row, images)
+                self.changes["questions_inserted"] += 1
+                self.questions_imported += 1
+                self.images_imported += len(images)
+                continue
+
+            question_id, old_section_id, old_hash = old
+            if old_hash != question_row["content_hash"]:
+                # 内容变化：更新题目和签名，图片和 LSH 桶整体替换
+                signature = content_signature(question_row["content"])
+                question_updates.append({
+                    "id": question_id, "section_id": section_id, **question_row, "minhash": signature
+                })
+                stale_images.append(question_id)
+                self._add_question(section_id, question_row, images, question_id=question_id,
+                                   signature=signature)
+                self.changes["questions_updated"] += 1
+                self.questions_imported += 1
+                self.images_imported += len(images)
+            elif old_section_id != section_id:
+                # 内容未变，只是移到了别的章节
+                question_updates.append({"id": question_id, "section_id": section_id, **question_row})
+                self.changes["questions_updated"] += 1
+            else:
+                self.changes["questions_unchanged"] += 1
+
+        deleted_questions = [old[0] for olds in leftovers.values() for old in olds]
+        deleted_sections = [section_id for section_id, _ in old_sections.values()]
+        self.changes["questions_deleted"] += len(deleted_questions)
+        self.changes["sections_deleted"] += len(deleted_sections)
+
+        # 先建新章节，再移动/删除题目，最后删除空章节（删除题目时图片级联删除）
+        if section_inserts:
+            db.execute(insert(Section), section_inserts)
+        if section_updates:
+            db.execute(update(Section), section_updates)
+        if stale_images:
+            db.execute(delete(QuestionImage).where(QuestionImage.question_id.in_(stale_images)))
+            db.execute(delete(QuestionLsh).where(QuestionLsh.question_id.in_(stale_images)))
+        if deleted_questions:
+            db.execute(delete(Question).where(Question.id.in_(deleted_questions)))
+        if question_updates:
+            db.execute(update(Question), question_updates)
+        if deleted_sections:
+            db.execute(delete(Section).where(Section.id.in_(deleted_sections)))
+        old_questions_total, old_images_total = self._paper_counts(paper_id)
+        self._stats.adjust(paper_row["total_questions"] - old_questions_total,
+                           paper_row["total_images"] - old_images_total)
+        db.execute(update(Paper), [{"id": paper_id, **paper_row}])
+
+        self._pending_paper_ids.add(paper_id)
+        self._hashes[paper_id] = paper_row["content_hash"]
+        self.papers_imported += 1
+        self.changes["papers_updated"] += 1
+
+        if len(self._pending[Question]) >= self.batch_size:
+            self.flush()
+        return True
+
+    def flush(self):
+        """按外键顺序批量写入累积的行（不提交）"""
+        for model in _INSERT_ORDER:
+            rows = self._pending[model]
+            if rows:
+                self.db.execute(insert(model), rows)
+                self._pending[model] = []
+        self._pending_paper_ids.clear()
+
+    def commit(self):
+        """写入累积的数据、按增量更新统计并提交事务"""
+        self.flush()
+        apply_stats_delta(self.db, self._stats)
+        self.db.commit()
+        self._stats = StatsDelta()
+
+    def finish(self) -> ImportResponse:
+        """提交剩余数据，返回导入结果"""
+        self.commit()
+
+        return ImportResponse(
+            success=True,
+            message="成功导入数据",
+            papers_imported=self.papers_imported,
+            questions_imported=self.questions_imported,
+            images_imported=self.images_imported,
+            changes=ImportChanges(**self.changes) if self.diff else None
+        )
+
+
+def import_papers(db: Session, papers: Iterable[dict], overwrite: bool = False,
+                  chunk_size: Optional[int] = None, diff: bool = False) -> ImportResponse:
+    """
+    导入试卷数据并提交事务
+
+    chunk_size 为空时整个导入一个事务；否则每导入 chunk_size 张试卷提交一次，
+    失败时已提交的分块会保留。diff 为真时对已存在的试卷做差量更新（忽略 overwrite）。
+    """
+    importer = BulkImporter(db, overwrite=overwrite, diff=diff)
+    pending = 0
+    for paper_data in papers:
+        if importer.add_paper(paper_data):
+            pending += 1
+        if chunk_size and pending >= chunk_size:
+            importer.commit()
+            pending = 0
+    return importer.finish()
+
+
+def import_file(db: Session, data_path: Path, overwrite: bool = False,
+                chunk_size: Optional[int] = None, diff: bool = False) -> ImportResponse:
+    """流式导入数据文件"""
+    return import_papers(db, iter_papers(data_path), overwrite, chunk_size, diff)
+
+
+# 每个文件导入完成（或失败）时的回调：(文件路径, 导入结果, 异常)
+FileCallback = Callable[[Path, Optional[ImportResponse], Optional[Exception]], None]
+
+
+def _parse_files(paths: Sequence[Path], workers: Optional[int]) -> Iterator[Tuple[Path, object]]:
+    """解析多个文件，按完成顺序返回 (路径, 试卷列表或异常)"""
+    if workers == 1 or len(paths) <= 1:
+        for path in paths:
+            try:
+                yield path, parse_paper_file(path)
+            except Exception as e:
+                yield path, e
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(parse_paper_file, str(path)): path for path in paths}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result()
+            except Exception as e:
+                yield futures[future], e
+
+
+def import_paper_files(db: Session, paths: Sequence[Path], overwrite: bool = False,
+                       workers: Optional[int] = None,
+                       on_file: Optional[FileCallback] = None,
+                       diff: bool = False) -> ImportResponse:
+    """
+    并行解析多个数据文件，由当前会话逐个文件写入并提交
+
+    workers 为进程数（默认 CPU 核数，1 表示在当前进程解析）。
+    某个文件解析或写入失败时回滚该文件并继续导入其余文件。
+    """
+    papers_imported = questions_imported = images_imported = 0
+    changes = Counter()
+    failed = 0
+
+    for path, parsed in _parse_files([Path(p) for p in paths], workers):
+        result, error = None, None
+        if isinstance(parsed, Exception):
+            error = parsed
+        else:
+            try:
+                result = import_papers(db, parsed, overwrite, diff=diff)
+            except Exception as e:
+                db.rollback()
+                error = e
+
+        if error is not None:
+            failed += 1
+        else:
+            papers_imported += result.papers_imported
+            questions_imported += result.questions_imported
+            images_imported += result.images_imported
+            if result.changes is not None:
+                changes.update(result.changes.model_dump())
+        if on_file is not None:
+            on_file(path, result, error)
+
+    return ImportResponse(
+        success=failed == 0,
+        message=f"成功导入 {len(paths) - failed}/{len(paths)} 个文件",
+        papers_imported=papers_imported,
+        questions_imported=questions_imported,
+        images_imported=images_imported,
+        changes=ImportChanges(**changes) if diff else None
+    )
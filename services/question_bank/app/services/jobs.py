@@ -0,0 +1,185 @@
+"""
+后台导入任务
+
+POST /api/admin/import 只负责提交任务，导入在单个后台线程中按提交顺序逐个执行：
+- 请求立即返回任务ID，不会因大文件占住请求或触发代理超时
+- 同一时间只有一个导入在写库，并发提交的导入排队等待，不争抢 SQLite 写锁
+- 导入全程持有进程内写锁（见 app.database），删除/重置等写操作等待导入结束后再执行，
+  不会因 SQLite 写锁超时以 "database is locked" 失败
+- 进度（已处理试卷/题目数、读取字节数）在导入过程中实时更新，
+  GET /api/admin/jobs/{job_id} 据此计算速率和预计剩余时间
+
+任务记录只保存在进程内存中，最多保留 JOB_HISTORY_SIZE 个已结束的任务。
+"""
+import os
+import queue
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional
+
+from app.database import SessionLocal, write_lock
+from app.models.schemas import ImportRequest, ImportResponse
+from app.services.cache import response_cache
+from app.services.importer import import_papers, iter_papers
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class ImportJob:
+    """一个导入任务及其进度"""
+
+    def __init__(self, request: ImportRequest):
+        self.id = uuid.uuid4().hex
+        self.request = request
+        self.status = QUEUED
+        self.created_at = datetime.utcnow()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.papers_processed = 0
+        self.questions_processed = 0
+        self.bytes_read = 0
+        self.bytes_total = Path(request.data_path).stat().st_size
+        self.result: Optional[ImportResponse] = None
+        self.error: Optional[str] = None
+        self._started = None  # time.monotonic()
+        self._elapsed = None
+
+    def set_bytes_read(self, position: int):
+        """记录文件读取位置"""
+        self.bytes_read = position
+
+    def track(self, papers: Iterable[dict]) -> Iterator[dict]:
+        """统计已处理的试卷和题目数"""
+        for paper_data in papers:
+            yield paper_data
+            self.papers_processed += 1
+            self.questions_processed += sum(
+                len(section_data.get('questions', [])) for section_data in paper_data.get('sections', [])
+            )
+
+    def elapsed(self) -> Optional[float]:
+        """已运行秒数"""
+        if self._elapsed is not None:
+            return self._elapsed
+        if self._started is not None:
+            return time.monotonic() - self._started
+        return None
+
+    def to_dict(self) -> dict:
+        """任务状态快照（包含速率和预计剩余时间）"""
+        elapsed = self.elapsed()
+        papers_rate = questions_rate = eta = None
+        progress = 1.0 if self.status == SUCCEEDED else (
+            min(self.bytes_read / self.bytes_total, 1.0) if self.bytes_total else 0.0
+        )
+        if elapsed:
+            papers_rate = round(self.papers_processed / elapsed, 2)
+            questions_rate = round(self.questions_processed / elapsed, 2)
+            if self.status == RUNNING and self.bytes_read:
+                eta = round(elapsed * (self.bytes_total - self.bytes_read) / self.bytes_read, 1)
+
+        return {
+            "id": self.id,
+            "status": self.status,
+            "data_path": self.request.data_path,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "papers_processed": self.papers_processed,
+            "questions_processed": self.questions_processed,
+            "bytes_read": self.bytes_read,
+            "bytes_total": self.bytes_total,
+            "progress": round(progress, 4),
+            "elapsed_seconds": round(elapsed, 1) if elapsed is not None else None,
+            "papers_per_second": papers_rate,
+            "questions_per_second": questions_rate,
+            "eta_seconds": eta,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class ImportJobQueue:
+    """导入任务队列，单个后台线程串行执行"""
+
+    def __init__(self, history_size: int = 100):
+        self.history_size = history_size
+        self._jobs: "OrderedDict[str, ImportJob]" = OrderedDict()
+        self._queue: "queue.Queue[ImportJob]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+
+    def submit(self, request: ImportRequest) -> ImportJob:
+        """提交导入任务（首次提交时启动后台线程）"""
+        job = ImportJob(request)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="import-worker", daemon=True)
+                self._worker.start()
+        self._queue.put(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[ImportJob]:
+        """按ID获取任务"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[ImportJob]:
+        """所有任务（按提交时间倒序）"""
+        with self._lock:
+            return list(reversed(self._jobs.values()))
+
+    def _prune(self):
+        """只保留最近 history_size 个已结束的任务"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in (SUCCEEDED, FAILED)]
+        for job_id in finished[:max(len(finished) - self.history_size, 0)]:
+            del self._jobs[job_id]
+
+    def _run(self):
+        """后台线程：逐个执行任务"""
+        while True:
+            job = self._queue.get()
+            try:
+                self._execute(job)
+            finally:
+                self._queue.task_done()
+
+    def _execute(self, job: ImportJob):
+        """执行一个导入任务"""
+        request = job.request
+        job.status = RUNNING
+        job.started_at = datetime.utcnow()
+        job._started = time.monotonic()
+
+        with write_lock(timeout=None):
+            db = SessionLocal()
+            try:
+                papers = iter_papers(Path(request.data_path), on_read=job.set_bytes_read)
+                job.result = import_papers(
+                    db, job.track(papers), request.overwrite, request.chunk_size, request.diff
+                )
+                job.status = SUCCEEDED
+            except Exception as e:
+                db.rollback()
+                traceback.print_exc()
+                job.error = f"导入失败: {str(e)}"
+                job.status = FAILED
+            finally:
+                db.close()
+                job._elapsed = time.monotonic() - job._started
+                job.finished_at = datetime.utcnow()
+                # 分块提交时失败前的数据已经写入，成功与否都要失效读缓存
+                response_cache.invalidate()
+
+
+import_jobs = ImportJobQueue(history_size=int(os.getenv("JOB_HISTORY_SIZE", "100")))
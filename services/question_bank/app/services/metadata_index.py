@@ -0,0 +1,181 @@
+"""
+题目元数据位图索引
+
+按知识点标签、难度、题型（由章节名推断）、年份为每个取值建立一个位图：
+第 i 位表示按ID升序排列的第 i 道题目。多维筛选（如“极限 ∧ 难度≥3 ∧ 填空题”）
+就是几个位图的按位与/或，与题库规模基本无关，不需要回表扫描。
+
+位图用 Python 大整数表示。索引按数据版本号（BankStats.generation）缓存在进程内，
+导入、删除、重置后的第一次查询时重建；嵌入模式在载入时直接从内存数据构建。
+随机抽题用的分桶（app.services.sampling）随索引一起构建。
+"""
+from bisect import bisect_right
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.models.database import Paper, Section, Question
+from app.services.sampling import QuestionSampler
+from app.services.stats import current_generation
+
+# 章节名 -> 题型（与前端 lib/questionBank/conceptTags.ts 的 SECTION_TYPE_MAP 一致）
+SECTION_TYPE_MAP = {
+    "选择题": "choice",
+    "单项选择题": "choice",
+    "单选题": "choice",
+    "填空题": "fill",
+    "计算题": "solution",
+    "应用题": "solution",
+    "证明题": "solution",
+    "综合题": "solution",
+    "解答题": "solution",
+}
+QUESTION_TYPES = ("choice", "fill", "solution")
+
+# int.bit_count 需要 Python 3.10
+_popcount = getattr(int, "bit_count", None) or (lambda bitmap: bin(bitmap).count("1"))
+
+# 遍历结果时每次转换为小整数处理的字节数（大整数上逐位操作每次都是 O(位数)）
+_CHUNK_BYTES = 512
+
+
+def _bitmap(positions: List[int], size: int) -> int:
+    """由位置列表构建位图（先写字节数组再一次性转换，避免逐位或运算）"""
+    data = bytearray((size + 7) // 8)
+    for position in positions:
+        data[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(data, "little")
+
+
+def section_type(section_name: str) -> str:
+    """按章节名推断题型，未知章节视为解答题"""
+    return SECTION_TYPE_MAP.get(section_name, "solution")
+
+
+class MetadataIndex:
+    """题目元数据位图索引（只读）"""
+
+    def __init__(self, rows: Iterable[Tuple[int, int, str, Optional[int], Optional[Sequence[str]]]]):
+        """rows: (题目ID, 年份, 章节名, 难度, 知识点标签)"""
+        rows = sorted(rows, key=lambda row: row[0])
+        self.ids: List[int] = [row[0] for row in rows]
+        self.all = (1 << len(rows)) - 1
+
+        tags: Dict[str, List[int]] = defaultdict(list)
+        difficulty: Dict[int, List[int]] = defaultdict(list)
+        types: Dict[str, List[int]] = defaultdict(list)
+        years: Dict[int, List[int]] = defaultdict(list)
+        for position, (_, year, section_name, level, concept_tags) in enumerate(rows):
+            years[year].append(position)
+            types[section_type(section_name)].append(position)
+            if level is not None:
+                difficulty[level].append(position)
+            for tag in concept_tags or ():
+                tags[tag].append(position)
+
+        size = len(rows)
+        self.tags = {tag: _bitmap(positions, size) for tag, positions in tags.items()}
+        self.difficulty = {level: _bitmap(positions, size) for level, positions in difficulty.items()}
+        self.types = {t: _bitmap(positions, size) for t, positions in types.items()}
+        self.years = {year: _bitmap(positions, size) for year, positions in years.items()}
+        self.sampler = QuestionSampler(rows)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _range(self, bitmaps: Dict[int, int], low: Optional[int], high: Optional[int]) -> int:
+        """取值落在 [low, high] 内的位图之并"""
+        result = 0
+        for value, bitmap in bitmaps.items():
+            if (low is None or value >= low) and (high is None or value <= high):
+                result |= bitmap
+        return result
+
+    def query(self, tags: Sequence[str] = (), match_all: bool = True,
+              difficulty_min: Optional[int] = None, difficulty_max: Optional[int] = None,
+              types: Sequence[str] = (), year_min: Optional[int] = None,
+              year_max: Optional[int] = None) -> int:
+        """各条件之间取交集，返回结果位图；match_all 为假时知识点标签之间取并集"""
+        result = self.all
+        if tags:
+            if match_all:
+                for tag in tags:
+                    result &= self.tags.get(tag, 0)
+            else:
+                any_tag = 0
+                for tag in tags:
+                    any_tag |= self.tags.get(tag, 0)
+                result &= any_tag
+        if difficulty_min is not None or difficulty_max is not None:
+            result &= self._range(self.difficulty, difficulty_min, difficulty_max)
+        if types:
+            any_type = 0
+            for question_type in types:
+                any_type |= self.types.get(question_type, 0)
+            result &= any_type
+        if year_min is not None or year_max is not None:
+            result &= self._range(self.years, year_min, year_max)
+        return result
+
+    @staticmethod
+    def count(bitmap: int) -> int:
+        """位图中的题目数"""
+        return _popcount(bitmap)
+
+    def question_ids(self, bitmap: int, after: int = 0, limit: Optional[int] = None) -> List[int]:
+        """按ID升序取位图中大于 after 的题目ID"""
+        start = bisect_right(self.ids, after)
+        bitmap >>= start
+        data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
+        result = []
+        for offset in range(0, len(data), _CHUNK_BYTES):
+            word = int.from_bytes(data[offset:offset + _CHUNK_BYTES], "little")
+            base = start + offset * 8
+            while word:
+                if limit is not None and len(result) >= limit:
+                    return result
+                lowest = word & -word
+                result.append(self.ids[base + lowest.bit_length() - 1])
+                word ^= lowest
+        return result
+
+    def facets(self, bitmap: int) -> dict:
+        """结果在各难度、题型下的分布"""
+        return {
+            "difficulty": {
+                str(level): _popcount(bitmap & self.difficulty[level])
+                for level in sorted(self.difficulty)
+            },
+            "types": {
+                question_type: _popcount(bitmap & self.types[question_type])
+                for question_type in QUESTION_TYPES if question_type in self.types
+            },
+        }
+
+
+def build_metadata_index(db: Session) -> MetadataIndex:
+    """从数据库读取各题目的元数据并构建索引"""
+    return MetadataIndex(db.execute(
+        select(Question.id, Paper.year, Section.section_name, Question.difficulty, Question.concept_tags)
+        .join(Section, Question.section_id == Section.id)
+        .join(Paper, Section.paper_id == Paper.id)
+    ))
+
+
+# 当前进程中的索引：(数据版本号, 索引)
+_cached: Optional[Tuple[int, MetadataIndex]] = None
+
+
+def get_metadata_index(db: Session) -> MetadataIndex:
+    """取与当前数据版本一致的索引，版本变化时重建"""
+    global _cached
+    generation = current_generation(db)
+    if _cached is None or _cached[0] != generation:
+        _cached = (generation, build_metadata_index(db))
+    return _cached[1]
+
+
+def reset_metadata_index():
+    """丢弃当前进程中的索引（如快照恢复后），下次查询时重建"""
+    global _cached
+    _cached = None
@@ -0,0 +1,231 @@
+"""
+运行时指标（Prometheus 文本格式）
+
+GET /metrics 输出 Prometheus 文本格式（0.0.4）的指标：
+- qb_http_requests_total{method, route, status}：请求数
+- qb_http_request_duration_seconds{method, route}：请求耗时直方图
+- qb_http_requests_in_flight：正在处理的请求数
+- qb_db_statements_per_request{route}：每个请求执行的 SQL 语句数（直方图）
+- qb_db_rows_per_request{route}：每个请求从数据库加载的 ORM 对象数（直方图）
+- qb_cache_requests_total{cache, result}、qb_cache_hit_ratio{cache}：
+  进程内读缓存（response）和试卷详情预渲染缓存（paper_blob）的命中情况
+
+route 为路由模板（如 /api/questions/{question_id}），未匹配任何路由的请求记为 unmatched，
+路径参数不会产生新的标签值。
+
+请求耗时和状态码由 MetricsMiddleware（app.middleware）记录。SQL 语句通过引擎的
+before_cursor_execute 事件、ORM 对象通过实体的 load 事件计入当前请求：请求的计数器
+放在 contextvars 中，AsyncSession.run_sync 中执行的查询同样能取到；
+不在请求中执行的语句（如后台导入任务）不计入。
+
+指标保存在进程内，多 worker 部署时各进程分别统计。METRICS_ENABLED=false 时不采集。
+"""
+import os
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import event
+from app.services.cache import response_cache
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+# Starlette 会为 text/ 类型追加 charset=utf-8
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# 未匹配任何路由的请求
+UNMATCHED_ROUTE = "unmatched"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+ROW_BUCKETS = (0, 1, 10, 50, 100, 500, 1000, 5000, 10000)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """按标签计数的计数器"""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Tuple[str, ...], amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: Tuple[str, ...]) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.label_names, labels)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    """按标签分组的直方图（桶计数在输出时累加）"""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # 标签 -> [各桶计数（最后一个为 +Inf）, 总和, 样本数]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple[str, ...], value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total, samples) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = 'le="' + _number(bound) + '"'
+                    lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {_number(total)}")
+                lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {samples}")
+        return lines
+
+
+class RequestStats:
+    """一个请求中执行的 SQL 语句数和加载的 ORM 对象数"""
+
+    __slots__ = ("statements", "rows")
+
+    def __init__(self):
+        self.statements = 0
+        self.rows = 0
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("qb_request_stats", default=None)
+
+REQUESTS = Counter("qb_http_requests_total", "HTTP 请求数", ("method", "route", "status"))
+LATENCY = Histogram("qb_http_request_duration_seconds", "HTTP 请求耗时（秒）",
+                    ("method", "route"), LATENCY_BUCKETS)
+STATEMENTS = Histogram("qb_db_statements_per_request", "每个请求执行的 SQL 语句数",
+                       ("route",), STATEMENT_BUCKETS)
+ROWS = Histogram("qb_db_rows_per_request", "每个请求从数据库加载的 ORM 对象数",
+                 ("route",), ROW_BUCKETS)
+CACHE_REQUESTS = Counter("qb_cache_requests_total", "缓存查找次数", ("cache", "result"))
+
+_in_flight = 0
+_in_flight_lock = threading.Lock()
+
+
+def begin_request() -> RequestStats:
+    """请求开始：计入正在处理的请求数，并为当前上下文设置 SQL 计数器"""
+    global _in_flight
+    with _in_flight_lock:
+        _in_flight += 1
+    stats = RequestStats()
+    _current.set(stats)
+    return stats
+
+
+def end_request(stats: RequestStats, method: str, route: str, status: int, duration: float):
+    """请求结束：记录耗时、状态码和 SQL 计数"""
+    global _in_flight
+    with _in_flight_lock:
+        _in_flight -= 1
+    REQUESTS.inc((method, route, str(status)))
+    LATENCY.observe((method, route), duration)
+    STATEMENTS.observe((route,), stats.statements)
+    ROWS.observe((route,), stats.rows)
+
+
+def record_cache(cache: str, hit: bool):
+    """记录一次缓存查找"""
+    if METRICS_ENABLED:
+        CACHE_REQUESTS.inc((cache, "hit" if hit else "miss"))
+
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is not None:
+        stats.statements += 1
+
+
+def _count_row(target, context):
+    stats = _current.get()
+    if stats is not None:
+        stats.rows += 1
+
+
+def instrument_engine(sync_engine):
+    """统计引擎上执行的 SQL 语句（异步引擎传入 async_engine.sync_engine）"""
+    event.listen(sync_engine, "before_cursor_execute", _count_statement)
+
+
+def instrument_orm(base):
+    """统计从数据库加载的 ORM 对象（传入声明式基类，对所有模型生效）"""
+    event.listen(base, "load", _count_row, propagate=True)
+
+
+def _cache_lines() -> List[str]:
+    """缓存查找次数和命中率（进程内读缓存的计数由 ResponseCache 自己维护）"""
+    cache_stats = response_cache.stats()
+    lookups = {
+        "response": (cache_stats["hits"], cache_stats["misses"]),
+        "paper_blob": (CACHE_REQUESTS.value(("paper_blob", "hit")), CACHE_REQUESTS.value(("paper_blob", "miss"))),
+    }
+
+    name = "qb_cache_requests_total"
+    lines = [f"# HELP {name} 缓存查找次数", f"# TYPE {name} counter"]
+    for cache, (hits, misses) in lookups.items():
+        lines.append(f'{name}{{cache="{cache}",result="hit"}} {_number(hits)}')
+        lines.append(f'{name}{{cache="{cache}",result="miss"}} {_number(misses)}')
+
+    name = "qb_cache_hit_ratio"
+    lines += [f"# HELP {name} 缓存命中率", f"# TYPE {name} gauge"]
+    for cache, (hits, misses) in lookups.items():
+        ratio = hits / (hits + misses) if hits + misses else 0.0
+        lines.append(f'{name}{{cache="{cache}"}} {_number(ratio)}')
+
+    name = "qb_response_cache_entries"
+    lines += [f"# HELP {name} 进程内读缓存条目数", f"# TYPE {name} gauge",
+              f"{name} {cache_stats['entries']}"]
+    return lines
+
+
+def render_metrics() -> bytes:
+    """输出 Prometheus 文本格式的全部指标"""
+    lines = [
+        "# HELP qb_http_requests_in_flight 正在处理的 HTTP 请求数",
+        "# TYPE qb_http_requests_in_flight gauge",
+        f"qb_http_requests_in_flight {_in_flight}",
+    ]
+    for metric in (REQUESTS, LATENCY, STATEMENTS, ROWS):
+        lines += metric.render()
+    lines += _cache_lines()
+    return ("\n".join(lines) + "\n").encode("utf-8")
@@ -0,0 +1,46 @@
+"""
+游标（keyset）分页
+
+游标是最后一行排序键的不透明编码（base64url JSON），下一页通过
+“排序键大于/小于游标”定位，而不是 OFFSET 跳过前面的行：
+深翻页不会变慢，并发导入插入的新行也不会让已翻过的结果错位。
+"""
+import base64
+import json
+import math
+from typing import Any, List, Sequence
+
+
+class InvalidCursor(ValueError):
+    """游标无法解析或与当前查询不匹配"""
+
+
+def encode_cursor(kind: str, values: List[Any]) -> str:
+    """编码游标"""
+    payload = json.dumps({"k": kind, "v": values}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _matches(value: Any, expected: type) -> bool:
+    """排序键的值是否符合期望类型（bool 不算整数，float 键也接受整数，但不接受 NaN/Infinity）"""
+    if isinstance(value, bool):
+        return False
+    if expected is float:
+        return isinstance(value, (int, float)) and math.isfinite(value)
+    return isinstance(value, expected)
+
+
+def decode_cursor(cursor: str, kind: str, types: Sequence[type]) -> List[Any]:
+    """解码游标并校验其类型、排序键个数和各排序键的值类型（int/float/str）"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        values = payload["v"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor(f"无效的分页游标: {cursor}") from e
+
+    if payload.get("k") != kind or not isinstance(values, list) or len(values) != len(types):
+        raise InvalidCursor(f"分页游标与当前查询不匹配: {cursor}")
+    if not all(_matches(value, expected) for value, expected in zip(values, types)):
+        raise InvalidCursor(f"无效的分页游标: {cursor}")
+    return values
@@ -0,0 +1,140 @@
+"""
+试卷详情预渲染缓存
+
+试卷内容只在导入/删除/重置时变化。首次读取时把 PaperDetail 序列化为 JSON
+存入 paper_blobs 表，并记录当时的数据版本号；之后的请求只要版本号一致，
+就直接返回存储的字节，不再构建 ORM 对象图。
+
+读取和回写分开：读接口用只读会话读取/渲染，需要回写时再交给写会话。
+回写只是优化，尽力而为：写锁被占用（如正在导入）时跳过，数据库仍被其它进程锁住时
+放弃本次回写，都照常返回刚渲染的内容，读请求不会因写冲突失败。
+
+指定了稀疏字段集的请求不使用预渲染缓存，按所选字段现查现渲染
+（结果由调用方放入进程内读缓存）。
+"""
+from typing import FrozenSet, NamedTuple, Optional
+import orjson
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import Session, selectinload
+from app.models.database import Paper, Section, PaperBlob
+from app.models.schemas import PaperDetail
+from app.services.fieldsets import PAPER_QUESTION_FIELDS, question_fields, question_load_options
+from app.services.metrics import record_cache
+from app.services.stats import current_generation
+
+
+def render_paper(db: Session, year: int, province: str, subject: str) -> Optional[bytes]:
+    """从 ORM 加载试卷并序列化为 PaperDetail JSON"""
+    paper = db.scalars(
+        select(Paper)
+        .where(Paper.year == year, Paper.province == province, Paper.subject == subject)
+        .options(selectinload(Paper.sections).selectinload(Section.questions))
+    ).first()
+    if paper is None:
+        return None
+    return PaperDetail.model_validate(paper, from_attributes=True).model_dump_json().encode("utf-8")
+
+
+def render_paper_fields(db: Session, year: int, province: str, subject: str,
+                        fieldset: FrozenSet[str]) -> Optional[bytes]:
+    """按所选题目字段渲染试卷详情 JSON（只加载所需的列）"""
+    paper = db.scalars(
+        select(Paper)
+        .where(Paper.year == year, Paper.province == province, Paper.subject == subject)
+        .options(
+            selectinload(Paper.sections)
+            .selectinload(Section.questions)
+            .options(*question_load_options(fieldset, with_section=False))
+        )
+    ).first()
+    if paper is None:
+        return None
+    return orjson.dumps({
+        "year": paper.year,
+        "province": paper.province,
+        "subject": paper.subject,
+        "exam_type": paper.exam_type,
+        "id": paper.id,
+        "sections": [
+            {
+                "id": section.id,
+                "section_number": section.section_number,
+                "section_name": section.section_name,
+                "questions": [
+                    question_fields(q, fieldset, PAPER_QUESTION_FIELDS)
+                    for q in section.questions
+                ],
+            }
+            for section in paper.sections
+        ],
+        "created_at": paper.created_at,
+    })
+
+
+class PaperBlobResult(NamedTuple):
+    """试卷详情读取结果"""
+    body: Optional[bytes]  # 试卷不存在时为 None
+    generation: int  # 读取时的数据版本号
+    rendered: bool  # 缓存缺失或过期、本次重新渲染（需要回写）
+
+
+def get_paper_blob(db: Session, year: int, province: str, subject: str) -> PaperBlobResult:
+    """读取试卷详情 JSON，缓存缺失或过期时重新渲染（不写库）"""
+    generation = current_generation(db)
+    blob = db.scalars(
+        select(PaperBlob).where(
+            PaperBlob.year == year,
+            PaperBlob.province == province,
+            PaperBlob.subject == subject
+        )
+    ).first()
+    if blob is not None and blob.generation == generation:
+        record_cache("paper_blob", True)
+        return PaperBlobResult(blob.body, generation, False)
+
+    body = render_paper(db, year, province, subject)
+    if body is not None:
+        record_cache("paper_blob", False)
+    return PaperBlobResult(body, generation, body is not None)
+
+
+def store_paper_blob(db: Session, year: int, province: str, subject: str,
+                     generation: int, body: bytes):
+    """回写预渲染缓存并提交（尽力而为，写冲突时放弃）"""
+    try:
+        blob = db.scalars(
+            select(PaperBlob).where(
+                PaperBlob.year == year,
+                PaperBlob.province == province,
+                PaperBlob.subject == subject
+            )
+        ).first()
+        if blob is None:
+            blob = PaperBlob(year=year, province=province, subject=subject)
+            db.add(blob)
+        elif blob.generation > generation:
+            # 已有更新版本的缓存
+            return
+        blob.generation = generation
+        blob.body = body
+        db.commit()
+    except IntegrityError:
+        # 并发请求已写入同一份缓存
+        db.rollback()
+    except OperationalError:
+        # 数据库被其它进程的写事务锁住，下次读取时再回写
+        db.rollback()
+
+
+def clear_paper_blobs(db: Session, year: Optional[int] = None,
+                      province: Optional[str] = None, subject: Optional[str] = None):
+    """删除预渲染缓存（不提交）；不传参数时清空全部"""
+    stmt = delete(PaperBlob)
+    if year is not None:
+        stmt = stmt.where(
+            PaperBlob.year == year,
+            PaperBlob.province == province,
+            PaperBlob.subject == subject
+        )
+    db.execute(stmt)
@@ -0,0 +1,150 @@
+"""
+受约束的随机抽题
+
+题目按 (年份, 章节名, 难度) 预先分桶，每个知识点标签另有一套同样划分的桶，
+桶内是题目ID数组。桶随元数据位图索引一起按数据版本重建（见 app.services.metadata_index）。
+
+抽题时按筛选条件（年份区间、章节名、知识点）选出候选桶，按“桶大小 × 难度权重”
+建别名表（Vose alias method），每次 O(1) 选桶；桶内用惰性 Fisher-Yates
+（只记录被交换的位置）O(1) 取一道未抽过的题，实现不放回抽样。
+桶被抽走一部分后按剩余比例接受/拒绝，剩余权重不足一半时用当前剩余量重建别名表。
+抽 k 道题的耗时为 O(k + 候选桶数)，与题库总题数无关。
+"""
+import random
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# 分桶键：(年份, 章节名, 难度)；未标注难度的题目难度为 None
+BucketKey = Tuple[int, str, Optional[int]]
+
+
+class AliasTable:
+    """别名表：按权重 O(1) 抽取下标"""
+
+    def __init__(self, weights: Sequence[float]):
+        n = len(weights)
+        total = sum(weights)
+        self.probability = [0.0] * n
+        self.alias = [0] * n
+        scaled = [w * n / total for w in weights]
+        small = [i for i, w in enumerate(scaled) if w < 1.0]
+        large = [i for i, w in enumerate(scaled) if w >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.probability[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] = scaled[more] + scaled[less] - 1.0
+            (small if scaled[more] < 1.0 else large).append(more)
+        for i in small + large:
+            # 浮点误差剩下的项概率视为 1
+            self.probability[i] = 1.0
+
+    def draw(self, rng: random.Random) -> int:
+        """抽取一个下标"""
+        i = int(rng.random() * len(self.probability))
+        return i if rng.random() < self.probability[i] else self.alias[i]
+
+
+class _BucketDraw:
+    """一次抽题中某个桶的状态（惰性 Fisher-Yates，不复制桶数组）"""
+
+    __slots__ = ("ids", "weight", "taken", "swaps", "available")
+
+    def __init__(self, ids: Sequence[int], weight: float):
+        self.ids = ids
+        self.weight = weight
+        self.taken = 0
+        self.swaps: Dict[int, int] = {}
+        self.available = len(ids)  # 建当前别名表时的剩余数
+
+    @property
+    def remaining(self) -> int:
+        return len(self.ids) - self.taken
+
+    def take(self, rng: random.Random) -> int:
+        """不放回地随机取一道题"""
+        i = self.taken + int(rng.random() * self.remaining)
+        picked = self.swaps.get(i, i)
+        self.swaps[i] = self.swaps.get(self.taken, self.taken)
+        self.taken += 1
+        return self.ids[picked]
+
+
+class QuestionSampler:
+    """按桶组织的题目，用于受约束的不放回随机抽题"""
+
+    def __init__(self, rows: Iterable[Tuple[int, int, str, Optional[int], Optional[Sequence[str]]]]):
+        """rows: (题目ID, 年份, 章节名, 难度, 知识点标签)"""
+        buckets: Dict[BucketKey, List[int]] = defaultdict(list)
+        tag_buckets: Dict[str, Dict[BucketKey, List[int]]] = defaultdict(lambda: defaultdict(list))
+        for question_id, year, section_name, difficulty, concept_tags in rows:
+            key = (year, section_name, difficulty)
+            buckets[key].append(question_id)
+            for tag in concept_tags or ():
+                tag_buckets[tag][key].append(question_id)
+
+        self.buckets: Dict[BucketKey, Tuple[int, ...]] = {
+            key: tuple(ids) for key, ids in buckets.items()
+        }
+        self.tag_buckets: Dict[str, Dict[BucketKey, Tuple[int, ...]]] = {
+            tag: {key: tuple(ids) for key, ids in family.items()}
+            for tag, family in tag_buckets.items()
+        }
+
+    def _candidates(self, tag: Optional[str], year_min: Optional[int], year_max: Optional[int],
+                    section_name: Optional[str],
+                    difficulty_weights: Optional[Dict[int, float]]) -> List[_BucketDraw]:
+        """符合筛选条件的桶及其权重（难度权重为空时所有题目等概率）"""
+        family = self.buckets if tag is None else self.tag_buckets.get(tag, {})
+        candidates = []
+        for (year, name, difficulty), ids in family.items():
+            if year_min is not None and year < year_min:
+                continue
+            if year_max is not None and year > year_max:
+                continue
+            if section_name and section_name not in name:
+                continue
+            weight = 1.0 if difficulty_weights is None else difficulty_weights.get(difficulty, 0.0)
+            if weight > 0:
+                candidates.append(_BucketDraw(ids, weight))
+        return candidates
+
+    def sample(self, k: int, rng: random.Random, tag: Optional[str] = None,
+               year_min: Optional[int] = None, year_max: Optional[int] = None,
+               section_name: Optional[str] = None,
+               difficulty_weights: Optional[Dict[int, float]] = None,
+               exclude: Iterable[int] = ()) -> Tuple[int, List[int]]:
+        """
+        不放回地抽取至多 k 道题，返回 (候选题目数, 题目ID列表)
+
+        题目被抽中的概率与所在桶的难度权重成正比；exclude 中的题目不会被抽到。
+        候选题目不足 k 道时返回全部候选（随机顺序）。
+        """
+        buckets = self._candidates(tag, year_min, year_max, section_name, difficulty_weights)
+        pool = sum(len(bucket.ids) for bucket in buckets)
+        excluded = set(exclude)
+        result: List[int] = []
+
+        remaining = pool
+        remaining_weight = sum(bucket.weight * bucket.remaining for bucket in buckets)
+        table_weight = 0.0
+        table = None
+        while len(result) < k and remaining > 0:
+            if table is None or remaining_weight < table_weight / 2:
+                # 剩余权重过少时拒绝率升高，按当前剩余量重建别名表
+                for bucket in buckets:
+                    bucket.available = bucket.remaining
+                table = AliasTable([bucket.weight * bucket.available for bucket in buckets])
+                table_weight = remaining_weight
+
+            bucket = buckets[table.draw(rng)]
+            # 桶已被抽走一部分：按剩余比例接受，保持各题被抽中的概率与权重成正比
+            if rng.random() * bucket.available >= bucket.remaining:
+                continue
+            question_id = bucket.take(rng)
+            remaining -= 1
+            remaining_weight -= bucket.weight
+            if question_id not in excluded:
+                result.append(question_id)
+
+        return pool, result
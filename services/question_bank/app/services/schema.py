@@ -0,0 +1,293 @@
+"""
+已有数据库的表结构升级（init_db 调用，可重复执行）
+
+create_all 只创建缺失的表，不会修改已有的表。旧版本建立的 question_bank.db
+缺少后来新增的列（计数、内容哈希、标注元数据、MinHash 签名、图片库字段）、
+试卷 (年份, 省份, 科目) 唯一约束和子表外键的 ON DELETE CASCADE，
+直接查询会报 "no such column"。
+
+SQLite 不能通过 ALTER TABLE 修改约束，表结构与模型不一致的表按 SQLite 推荐的步骤重建：
+关闭外键检查，建新表、复制数据、删旧表、新表改名，整个过程在一个事务中完成，
+提交前检查外键。重建时删除指向不存在父行的孤儿行，以及重复的试卷（保留ID最小的一张，
+即旧版本按条件查询时返回的那张）。
+
+重建后补建缺失的索引，并回填旧数据：
+- 内容哈希为空的试卷，从库中的行还原试卷数据，按导入时的规则计算试卷、章节、题目的
+  内容哈希和冗余计数，之后用差量导入写入同一份数据文件时不会有任何改动
+- question_lsh 表为新建时，计算已有题目的 MinHash 签名并写入 LSH 桶
+
+图片库字段（image_hash、width、height）保持为空，由 scripts/ingest_images.py 回填。
+"""
+from typing import List
+from sqlalchemy import MetaData, Table, UniqueConstraint, bindparam, func, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.schema import CreateTable
+from app.models.database import Base, Paper, Question, QuestionImage, QuestionLsh, Section
+from app.services.importer import _normalize_paper
+from app.services.similarity import content_signature, lsh_buckets
+
+# (子表, 外键列, 父表)，自上而下删除：上层的孤儿行删除后，其下层的行也成为孤儿
+ORPHAN_CHECKS = [
+    ("sections", "paper_id", "papers"),
+    ("questions", "section_id", "sections"),
+    ("question_images", "question_id", "questions"),
+    ("question_lsh", "question_id", "questions"),
+]
+
+
+def upgrade_schema(engine: Engine):
+    """把已有数据库升级到当前模型的表结构，并回填新增列"""
+    existing = set(inspect(engine).get_table_names())
+    outdated = [
+        table for table in Base.metadata.sorted_tables
+        if table.name in existing and _is_outdated(engine, table)
+    ]
+    if outdated:
+        if engine.dialect.name != "sqlite":
+            names = ", ".join(table.name for table in outdated)
+            raise RuntimeError(f"表结构与模型不一致，需要手动迁移: {names}")
+        print(f"🔧 升级表结构: {', '.join(table.name for table in outdated)}")
+        _rebuild_tables(engine, outdated)
+
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+    if "papers" in existing:
+        _backfill_papers(engine)
+    if "questions" in existing and QuestionLsh.__tablename__ not in existing:
+        _backfill_signatures(engine)
+
+
+def _is_outdated(engine: Engine, table: Table) -> bool:
+    """库中的表是否缺少模型中的列、唯一约束或外键的删除级联"""
+    inspector = inspect(engine)
+    columns = {column["name"] for column in inspector.get_columns(table.name)}
+    if set(table.columns.keys()) - columns:
+        return True
+
+    unique_names = {constraint["name"] for constraint in inspector.get_unique_constraints(table.name)}
+    for constraint in table.constraints:
+        if isinstance(constraint, UniqueConstraint) and constraint.name not in unique_names:
+            return True
+
+    foreign_keys = {
+        tuple(fk["constrained_columns"]): (fk.get("options") or {}).get("ondelete")
+        for fk in inspector.get_foreign_keys(table.name)
+    }
+    for fk in table.foreign_keys:
+        ondelete = foreign_keys.get((fk.parent.name,))
+        if fk.ondelete and (ondelete or "").upper() != fk.ondelete.upper():
+            return True
+    return False
+
+
+def _rebuild_tables(engine: Engine, tables: List[Table]):
+    """按模型重建 SQLite 表，保留已有列的数据"""
+    with engine.connect() as conn:
+        # 外键检查只能在事务外切换；重建期间删除旧表不能级联删除子表
+        conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+        try:
+            conn.exec_driver_sql("BEGIN")
+            names = {table.name for table in tables}
+            _delete_orphans(conn)
+            if "papers" in names:
+                _delete_duplicate_papers(conn)
+            for table in tables:
+                _rebuild_table(conn, table)
+            violations = conn.exec_driver_sql("PRAGMA foreign_key_check").fetchall()
+            if violations:
+                raise RuntimeError(f"表结构升级后外键不完整: {violations[:3]}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+
+
+def _rebuild_table(conn: Connection, table: Table):
+    """建新表、复制数据、删旧表、新表改名（旧表的索引随旧表删除，之后统一补建）"""
+    new_name = f"{table.name}_new"
+    staging = table.to_metadata(_referenced_metadata(table), name=new_name)
+    conn.exec_driver_sql(f'DROP TABLE IF EXISTS "{new_name}"')
+    conn.execute(CreateTable(staging))
+
+    old_columns = {column["name"] for column in inspect(conn).get_columns(table.name)}
+    targets, values, params = [], [], {}
+    for column in table.columns:
+        targets.append(f'"{column.name}"')
+        if column.name in old_columns:
+            values.append(f'"{column.name}"')
+        else:
+            # 新增列取模型的标量默认值（如计数列为 0），没有默认值时为 NULL
+            default = column.default.arg if column.default is not None and column.default.is_scalar else None
+            params[column.name] = default
+            values.append(f":{column.name}")
+    conn.execute(
+        text(f'INSERT INTO "{new_name}" ({", ".join(targets)}) '
+             f'SELECT {", ".join(values)} FROM "{table.name}"'),
+        params
+    )
+    conn.exec_driver_sql(f'DROP TABLE "{table.name}"')
+    conn.exec_driver_sql(f'ALTER TABLE "{new_name}" RENAME TO "{table.name}"')
+
+
+def _referenced_metadata(table: Table) -> MetaData:
+    """只含被引用表的 MetaData，供生成新表 DDL 时解析外键"""
+    metadata = MetaData()
+    for fk in table.foreign_keys:
+        fk.column.table.to_metadata(metadata)
+    return metadata
+
+
+def _delete_orphans(conn: Connection):
+    """删除父行已不存在的子表行（旧版本未开启外键检查）"""
+    tables = set(inspect(conn).get_table_names())
+    for child, column, parent in ORPHAN_CHECKS:
+        if child not in tables or parent not in tables:
+            continue
+        deleted = conn.exec_driver_sql(
+            f'DELETE FROM "{child}" WHERE "{column}" NOT IN (SELECT id FROM "{parent}")'
+        ).rowcount
+        if deleted:
+            print(f"⚠️  删除 {child} 中 {deleted} 行孤儿数据")
+
+
+def _delete_duplicate_papers(conn: Connection):
+    """同一 (年份, 省份, 科目) 有多张试卷时只保留ID最小的一张"""
+    duplicates = conn.exec_driver_sql(
+        "SELECT id FROM papers WHERE id NOT IN "
+        "(SELECT MIN(id) FROM papers GROUP BY year, province, subject)"
+    ).scalars().all()
+    if not duplicates:
+        return
+    print(f"⚠️  删除 {len(duplicates)} 张重复试卷: {duplicates[:10]}")
+    # 外键检查已关闭，手动自下而上删除子表行
+    paper_ids = bindparam("paper_ids", duplicates, expanding=True)
+    sections = select(Section.id).where(Section.paper_id.in_(paper_ids))
+    questions = select(Question.id).where(Question.section_id.in_(sections))
+    conn.execute(QuestionImage.__table__.delete().where(QuestionImage.question_id.in_(questions)))
+    if inspect(conn).has_table(QuestionLsh.__tablename__):
+        conn.execute(QuestionLsh.__table__.delete().where(QuestionLsh.question_id.in_(questions)))
+    conn.execute(Question.__table__.delete().where(Question.section_id.in_(sections)))
+    conn.execute(Section.__table__.delete().where(Section.paper_id.in_(paper_ids)))
+    conn.execute(Paper.__table__.delete().where(Paper.id.in_(paper_ids)))
+
+
+def _backfill_papers(engine: Engine):
+    """为内容哈希为空的试卷回填内容哈希和冗余计数（不改动 updated_at）"""
+    with Session(engine) as db:
+        paper_ids = db.scalars(select(Paper.id).where(Paper.content_hash.is_(None))).all()
+        if not paper_ids:
+            return
+        print(f"🔧 回填 {len(paper_ids)} 张试卷的内容哈希和计数...")
+        for paper_id in paper_ids:
+            paper = db.scalars(
+                select(Paper).where(Paper.id == paper_id).options(
+                    selectinload(Paper.sections).selectinload(Section.questions).selectinload(Question.images)
+                )
+            ).one()
+            # 关系按 order_index、题号加载，与还原出的试卷数据逐一对应
+            paper_row, sections = _normalize_paper(_paper_data(paper))
+            section_hashes, question_hashes = [], []
+            for section, (section_row, questions) in zip(paper.sections, sections):
+                section_hashes.append({"row_id": section.id, "content_hash": section_row["content_hash"]})
+                for question, (question_row, _) in zip(section.questions, questions):
+                    question_hashes.append({"row_id": question.id, "content_hash": question_row["content_hash"]})
+            db.expunge_all()
+
+            # updated_at 显式赋为原值，Core 的 UPDATE 同样会应用列的 onupdate
+            db.execute(
+                Paper.__table__.update().where(Paper.id == paper_id)
+                .values(**paper_row, updated_at=Paper.updated_at)
+            )
+            for model, rows in ((Section, section_hashes), (Question, question_hashes)):
+                if rows:
+                    db.execute(
+                        model.__table__.update()
+                        .where(model.id == bindparam("row_id"))
+                        .values(content_hash=bindparam("content_hash")),
+                        rows
+                    )
+            db.commit()
+
+
+def _paper_data(paper: Paper) -> dict:
+    """从库中的行还原导入时的试卷数据（与数据文件格式一致）"""
+    return {
+        "exam_type": paper.exam_type,
+        "sections": [
+            {
+                "section_number": section.section_number,
+                "section_name": section.section_name,
+                "questions": [
+                    {
+                        "question_number": question.question_number,
+                        "content": question.content,
+                        "answer": question.answer,
+                        "metadata": {
+                            "difficulty": question.difficulty,
+                            "timeEstimateSec": question.time_estimate_sec,
+                            "conceptTags": question.concept_tags,
+                            "skills": question.skills,
+                        },
+                        "images": [
+                            {
+                                "alt_text": image.alt_text,
+                                "url": image.url,
+                                "position": image.position,
+                                "caption": image.caption,
+                                "question_ref": image.question_ref,
+                            }
+                            for image in sorted(question.images, key=lambda image: image.id)
+                        ],
+                    }
+                    for question in section.questions
+                ],
+            }
+            for section in paper.sections
+        ],
+    }
+
+
+def _backfill_signatures(engine: Engine, batch_size: int = 2000):
+    """计算已有题目的 MinHash 签名并写入 LSH 桶"""
+    with engine.begin() as conn:
+        total = conn.scalar(select(func.count(Question.id)).where(Question.minhash.is_(None)))
+        if not total:
+            return
+        print(f"🔧 计算 {total} 道题目的相似度签名...")
+        last_id = 0
+        while True:
+            rows = conn.execute(
+                select(Question.id, Question.content)
+                .where(Question.id > last_id, Question.minhash.is_(None))
+                .order_by(Question.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            signatures, buckets = [], []
+            for question_id, content in rows:
+                signature = content_signature(content)
+                if signature is None:
+                    continue
+                signatures.append({"question_id": question_id, "minhash": signature})
+                buckets.extend(
+                    {"band": band, "bucket": bucket, "question_id": question_id}
+                    for band, bucket in lsh_buckets(signature)
+                )
+            if signatures:
+                conn.execute(
+                    Question.__table__.update()
+                    .where(Question.id == bindparam("question_id"))
+                    .values(minhash=bindparam("minhash")),
+                    signatures
+                )
+            if buckets:
+                conn.execute(QuestionLsh.__table__.insert(), buckets)
@@ -0,0 +1,124 @@
+"""
+题目全文检索（SQLite FTS5）
+
+questions_fts 是 questions 表的外部内容索引，覆盖题目内容和答案，
+使用 trigram 分词器，对中文和 LaTeX 片段都能做子串匹配。索引通过触发器
+与 questions 表保持同步，导入、删除、重置无需额外处理。
+
+trigram 只能匹配不少于 3 个字符的关键词；更短的关键词（如“极限”）
+退回到 LIKE 扫描。
+"""
+from typing import Optional
+from sqlalchemy import literal_column, or_, text, func, table, column
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from app.models.database import Question
+
+FTS_TABLE = "questions_fts"
+MIN_FTS_KEYWORD_LENGTH = 3
+
+FTS_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        content, answer,
+        content='questions', content_rowid='id',
+        tokenize='trigram'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS questions_fts_ai AFTER INSERT ON questions BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, content, answer)
+        VALUES (new.id, new.content, new.answer);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS questions_fts_ad AFTER DELETE ON questions BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content, answer)
+        VALUES ('delete', old.id, old.content, old.answer);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS questions_fts_au AFTER UPDATE ON questions BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content, answer)
+        VALUES ('delete', old.id, old.content, old.answer);
+        INSERT INTO {FTS_TABLE}(rowid, content, answer)
+        VALUES (new.id, new.content, new.answer);
+    END
+    """,
+]
+
+# 是否启用了全文索引（非 SQLite 或 SQLite 不支持 trigram 时为 False）
+fts_enabled = False
+
+_fts = literal_column(FTS_TABLE)
+_fts_table = table(FTS_TABLE, column("rowid"), column("rank"))
+
+
+def init_search_index(engine: Engine):
+    """创建全文索引及同步触发器，索引为新建时从 questions 表回填"""
+    global fts_enabled
+    if engine.dialect.name != "sqlite":
+        return
+
+    try:
+        with engine.begin() as conn:
+            existed = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type='table' AND name=:name"),
+                {"name": FTS_TABLE}
+            ).first() is not None
+            for ddl in FTS_DDL:
+                conn.execute(text(ddl))
+            if not existed:
+                conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    except OperationalError as e:
+        print(f"⚠️  全文索引不可用，关键词搜索将使用 LIKE: {e}")
+        return
+
+    fts_enabled = True
+
+
+def rebuild_search_index(db: Session):
+    """从 questions 表重建全文索引"""
+    if fts_enabled:
+        db.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def reset_search_index(db: Session):
+    """清空全文索引并补建触发器（questions 表删表重建后调用）"""
+    if fts_enabled:
+        db.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')"))
+        for ddl in FTS_DDL:
+            db.execute(text(ddl))
+
+
+def _fts_phrase(keyword: str) -> str:
+    """把关键词转成 FTS5 短语查询，避免 LaTeX 符号被当作查询语法"""
+    return '"' + keyword.replace('"', '""') + '"'
+
+
+def uses_fts(keyword: Optional[str]) -> bool:
+    """该关键词是否走全文索引"""
+    return bool(fts_enabled and keyword and len(keyword) >= MIN_FTS_KEYWORD_LENGTH)
+
+
+def apply_keyword_search(query, keyword: str):
+    """
+    为题目查询（select 语句）添加关键词条件
+
+    走全文索引时附带高亮片段列和 bm25 相关度列（越小越相关），
+    返回 (query, snippet_column, rank_column)；否则退回 LIKE，两列均为 None。
+    排序由调用方决定。
+    """
+    if not uses_fts(keyword):
+        pattern = or_(Question.content.contains(keyword), Question.answer.contains(keyword))
+        return query.filter(pattern), None, None
+
+    snippet = func.snippet(_fts, -1, "<mark>", "</mark>", "…", 32).label("snippet")
+    rank = _fts_table.c.rank
+    query = (
+        query.join(_fts_table, _fts_table.c.rowid == Question.id)
+        .filter(_fts.op("MATCH")(_fts_phrase(keyword)))
+        .add_columns(snippet, rank.label("rank"))
+    )
+    return query, snippet, rank
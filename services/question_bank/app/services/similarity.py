@@ -0,0 +1,277 @@
+"""
+近似重复题目检测（MinHash + LSH）
+
+历年真题常有只改动数字或措辞的重复题。每道题的题目内容先做 LaTeX 规范化
+（去掉空白、$、\\left/\\right 等排版命令，统一全角半角），取字符 4-gram 作为 shingle，
+再计算 64 维 MinHash 签名（单次哈希分桶的 one-permutation hashing，空桶按
+右侧最近的非空桶补齐），两题签名相同维度的比例即 Jaccard 相似度的估计。
+
+签名按 16 个 band × 4 行切分，每个 band 的取值哈希为一个桶号，写入 question_lsh 表
+（(band, 桶号) 上有索引）。查相似题时只需按本题的 16 个桶号做索引查找得到候选，
+再比较候选的签名，不需要与全部题目逐一比较。Jaccard 为 s 的两题至少落入一个
+相同桶的概率为 1 - (1 - s^4)^16，s=0.5 时约 0.65，s=0.7 时超过 0.98。
+
+签名和桶在导入时随题目一起写入（差量导入只重算内容变化的题目），
+删除题目时由外键级联删除。
+"""
+import re
+import unicodedata
+import zlib
+from array import array
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session
+from app.models.database import Paper, Section, Question, QuestionLsh
+from app.models.schemas import DuplicateGroup, DuplicateQuestion, DuplicateReport
+from app.services.fieldsets import PREVIEW_LENGTH, content_preview
+
+NUM_HASHES = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_HASHES // BANDS
+SHINGLE_SIZE = 4
+
+# 默认相似度阈值（估计的 Jaccard 相似度）
+DEFAULT_SIMILAR_THRESHOLD = 0.5
+DEFAULT_DUPLICATE_THRESHOLD = 0.8
+
+_BIN_BITS = 6  # 2^6 = NUM_HASHES 个桶
+_VALUE_MASK = (1 << (32 - _BIN_BITS)) - 1
+_MASK64 = (1 << 64) - 1
+_EMPTY = 1 << 32
+# 空桶借用右侧第 d 个桶的值时加上 d * _DENSIFY_OFFSET，避免与该桶本身相等
+_DENSIFY_OFFSET = 1 << (32 - _BIN_BITS)
+
+# 只影响排版、不影响题意的 LaTeX 命令
+_LAYOUT_COMMANDS = re.compile(
+    r"\\(?:left|right|big|Big|bigg|Bigg|displaystyle|textstyle|limits|nolimits|quad|qquad|mathrm|rm)(?![a-zA-Z])"
+    r"|\\[,;:! ]"
+)
+_MARKDOWN_IMAGE = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+_IGNORED_CHARS = re.compile(r"[\s${}]")
+_SYNONYMS = (("\\dfrac", "\\frac"), ("\\tfrac", "\\frac"), ("\\le ", "\\leq "), ("\\ge ", "\\geq "))
+
+
+def normalize_content(content: str) -> str:
+    """题目内容规范化：统一全角半角，去掉图片、空白、公式定界符和排版命令"""
+    text = unicodedata.normalize("NFKC", content or "")
+    text = _MARKDOWN_IMAGE.sub("", text)
+    for old, new in _SYNONYMS:
+        text = text.replace(old, new)
+    text = _LAYOUT_COMMANDS.sub("", text)
+    return _IGNORED_CHARS.sub("", text).lower()
+
+
+def shingles(content: str) -> Set[str]:
+    """规范化内容的字符 4-gram 集合（内容不足 4 个字符时为整段内容）"""
+    text = normalize_content(content)
+    if len(text) <= SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def content_signature(content: str) -> Optional[bytes]:
+    """题目内容的 MinHash 签名（NUM_HASHES 个 32 位无符号整数），内容为空时返回 None"""
+    grams = shingles(content)
+    if not grams:
+        return None
+
+    bins = [_EMPTY] * NUM_HASHES
+    for gram in grams:
+        # CRC32 再乘黄金比例常数打散，高位作桶号、低位作值
+        h = (zlib.crc32(gram.encode("utf-8")) * 0x9E3779B1) & 0xFFFFFFFF
+        index = h >> (32 - _BIN_BITS)
+        value = h & _VALUE_MASK
+        if value < bins[index]:
+            bins[index] = value
+
+    signature = array("I", bytes(4 * NUM_HASHES))
+    for i in range(NUM_HASHES):
+        distance = 0
+        while bins[(i + distance) % NUM_HASHES] == _EMPTY:
+            distance += 1
+        signature[i] = bins[(i + distance) % NUM_HASHES] + distance * _DENSIFY_OFFSET
+    return signature.tobytes()
+
+
+def _values(signature: bytes) -> array:
+    values = array("I")
+    values.frombytes(signature)
+    return values
+
+
+def similarity(a: bytes, b: bytes) -> float:
+    """两个签名估计的 Jaccard 相似度"""
+    if a == b:
+        return 1.0
+    equal = sum(1 for x, y in zip(_values(a), _values(b)) if x == y)
+    return equal / NUM_HASHES
+
+
+def lsh_buckets(signature: bytes) -> List[Tuple[int, int]]:
+    """签名各 band 的 (band, 桶号)，桶号为有符号 64 位整数（可直接存入 SQLite INTEGER）"""
+    width = 4 * ROWS_PER_BAND
+    buckets = []
+    for band in range(BANDS):
+        x = int.from_bytes(signature[band * width:(band + 1) * width], "little")
+        # 128 位折叠为 64 位后乘奇数常数打散
+        h = ((x ^ (x >> 64)) * 0x9E3779B97F4A7C15) & _MASK64
+        buckets.append((band, h - (1 << 64) if h >= 1 << 63 else h))
+    return buckets
+
+
+def _rank(signature: bytes, candidates: Dict[int, bytes], question_id: int,
+          threshold: float, limit: int) -> List[Tuple[int, float]]:
+    """候选按估计相似度从高到低排序（相同时按ID），去掉本题和低于阈值的"""
+    scored = [
+        (candidate_id, similarity(signature, candidate_signature))
+        for candidate_id, candidate_signature in candidates.items()
+        if candidate_id != question_id and candidate_signature is not None
+    ]
+    scored = [(candidate_id, score) for candidate_id, score in scored if score >= threshold]
+    scored.sort(key=lambda item: (-item[1], item[0]))
+    return scored[:limit]
+
+
+def find_similar(db: Session, question_id: int, threshold: float = DEFAULT_SIMILAR_THRESHOLD,
+                 limit: int = 20) -> Optional[List[Tuple[int, float]]]:
+    """
+    查找与指定题目相似的题目，返回 [(题目ID, 估计相似度)]；题目不存在时返回 None
+
+    按本题的各 band 桶号在 question_lsh 上做索引查找得到候选，再比较签名。
+    """
+    row = db.execute(select(Question.minhash).where(Question.id == question_id)).first()
+    if row is None:
+        return None
+    signature = row.minhash
+    if signature is None:
+        return []
+
+    candidate_ids = db.scalars(
+        select(QuestionLsh.question_id).distinct().where(or_(*(
+            and_(QuestionLsh.band == band, QuestionLsh.bucket == bucket)
+            for band, bucket in lsh_buckets(signature)
+        )))
+    ).all()
+    candidates = dict(db.execute(
+        select(Question.id, Question.minhash).where(Question.id.in_(candidate_ids))
+    ).all()) if candidate_ids else {}
+    return _rank(signature, candidates, question_id, threshold, limit)
+
+
+def find_duplicate_groups(db: Session, threshold: float = DEFAULT_DUPLICATE_THRESHOLD) -> List[Tuple[float, List[int]]]:
+    """
+    题库中的近似重复题分组，返回 [(组内相连题目对的最低相似度, 题目ID列表)]
+
+    只比较至少共享一个 LSH 桶的题目对，相似度不低于阈值的题目对连成一组。
+    按组大小、再按最小题目ID排序。
+    """
+    shared = (
+        select(QuestionLsh.band, QuestionLsh.bucket)
+        .group_by(QuestionLsh.band, QuestionLsh.bucket)
+        .having(func.count() > 1)
+        .subquery("shared")
+    )
+    members = defaultdict(list)
+    for band, bucket, question_id in db.execute(
+        select(QuestionLsh.band, QuestionLsh.bucket, QuestionLsh.question_id)
+        .join(shared, and_(QuestionLsh.band == shared.c.band, QuestionLsh.bucket == shared.c.bucket))
+    ):
+        members[(band, bucket)].append(question_id)
+
+    pairs = {
+        (a, b)
+        for ids in members.values()
+        for i, a in enumerate(sorted(ids))
+        for b in sorted(ids)[i + 1:]
+    }
+    involved = {question_id for pair in pairs for question_id in pair}
+    signatures = dict(db.execute(
+        select(Question.id, Question.minhash).where(Question.id.in_(involved))
+    ).all()) if involved else {}
+    return _group_pairs(pairs, signatures, threshold)
+
+
+def duplicate_report(db: Session, threshold: float = DEFAULT_DUPLICATE_THRESHOLD) -> DuplicateReport:
+    """近似重复题报告（附各题所在试卷、章节、题号和内容首行）"""
+    groups = find_duplicate_groups(db, threshold)
+    ids = [question_id for _, group in groups for question_id in group]
+    details = {}
+    for question_id, year, province, section_name, question_number, content in db.execute(
+        select(Question.id, Paper.year, Paper.province, Section.section_name,
+               Question.question_number, func.substr(Question.content, 1, PREVIEW_LENGTH))
+        .join(Section, Question.section_id == Section.id)
+        .join(Paper, Section.paper_id == Paper.id)
+        .where(Question.id.in_(ids))
+    ) if ids else ():
+        details[question_id] = DuplicateQuestion(
+            id=question_id, year=year, province=province, section_name=section_name,
+            question_number=question_number, content_preview=content_preview(content)
+        )
+    return DuplicateReport(
+        threshold=threshold,
+        total_groups=len(groups),
+        total_questions=len(ids),
+        groups=[
+            DuplicateGroup(similarity=score, questions=[details[i] for i in group])
+            for score, group in groups
+        ]
+    )
+
+
+def _group_pairs(pairs: Iterable[Tuple[int, int]], signatures: Dict[int, bytes],
+                 threshold: float) -> List[Tuple[float, List[int]]]:
+    """验证候选题目对的相似度，用并查集连成组"""
+    parent: Dict[int, int] = {}
+
+    def root(x: int) -> int:
+        while parent.setdefault(x, x) != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    edges = []
+    for a, b in pairs:
+        score = similarity(signatures[a], signatures[b])
+        if score >= threshold:
+            edges.append((a, b, score))
+            parent[root(a)] = root(b)
+
+    groups: Dict[int, List[int]] = defaultdict(list)
+    lowest: Dict[int, float] = {}
+    for a, b, score in edges:
+        group = root(a)
+        lowest[group] = min(lowest.get(group, 1.0), score)
+    for question_id in list(parent):
+        groups[root(question_id)].append(question_id)
+
+    result = [(lowest[group], sorted(ids)) for group, ids in groups.items() if group in lowest]
+    result.sort(key=lambda item: (-len(item[1]), item[1][0]))
+    return result
+
+
+class LshIndex:
+    """内存中的 LSH 索引（嵌入模式使用）"""
+
+    def __init__(self, signatures: Dict[int, Optional[bytes]]):
+        self.signatures = signatures
+        self.buckets: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        for question_id, signature in signatures.items():
+            if signature is not None:
+                for key in lsh_buckets(signature):
+                    self.buckets[key].append(question_id)
+
+    def find_similar(self, question_id: int, threshold: float = DEFAULT_SIMILAR_THRESHOLD,
+                     limit: int = 20) -> Optional[List[Tuple[int, float]]]:
+        """同 find_similar"""
+        if question_id not in self.signatures:
+            return None
+        signature = self.signatures[question_id]
+        if signature is None:
+            return []
+        candidates = {
+            candidate_id: self.signatures[candidate_id]
+            for key in lsh_buckets(signature)
+            for candidate_id in self.buckets.get(key, ())
+        }
+        return _rank(signature, candidates, question_id, threshold, limit)
@@ -0,0 +1,255 @@
+"""
+题库快照导出/恢复（仅 SQLite）
+
+导出：通过 SQLite 在线备份 API 复制出一致的数据库副本（导入进行中也可以导出），
+切换为非 WAL 模式并 VACUUM 压缩成单个文件，同时写出清单文件
+<快照名>.json，记录 SHA-256 校验和、大小和各表行数。
+
+恢复：校验清单中的校验和并执行 quick_check，再通过备份 API 把快照整体写入
+当前数据库。全文索引、统计表和预渲染的试卷详情都在快照里，新节点恢复后
+无需重新导入即可全速提供服务。恢复后数据版本号推进到恢复前后都没有用过的值
+（快照中的预渲染缓存随之推进），按版本号缓存的进程内状态不会把旧数据当作有效。
+
+SNAPSHOT_DIR 为快照目录（默认 ./snapshots）。服务启动时如果设置了
+SNAPSHOT_RESTORE_PATH 且当前数据库中没有试卷，会先从该快照恢复。
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from sqlalchemy import update
+from sqlalchemy.exc import OperationalError
+from app.database import engine, write_lock, SessionLocal, IS_SQLITE, PRODUCTION, PRODUCTION_PRAGMAS
+from app.models.database import PaperBlob
+from app.services.metadata_index import reset_metadata_index
+from app.services.stats import current_generation, refresh_stats
+
+SNAPSHOT_DIR = Path(os.getenv("SNAPSHOT_DIR", "./snapshots"))
+SNAPSHOT_RESTORE_PATH = os.getenv("SNAPSHOT_RESTORE_PATH")
+
+# 快照文件名只允许字母数字、下划线、点和连字符，避免路径穿越
+SNAPSHOT_NAME = re.compile(r"^[\w.-]+\.db$")
+# 清单中统计行数的表
+COUNTED_TABLES = ("papers", "sections", "questions", "question_images", "question_lsh", "paper_blobs")
+
+
+class SnapshotError(Exception):
+    """快照无法导出或恢复"""
+
+
+def database_path() -> Path:
+    """当前 SQLite 数据库文件路径"""
+    if not IS_SQLITE or not engine.url.database or engine.url.database == ":memory:":
+        raise SnapshotError("快照只支持文件形式的 SQLite 数据库")
+    return Path(engine.url.database)
+
+
+def _connect(path: Path, read_only: bool = False) -> sqlite3.Connection:
+    """打开 SQLite 连接（写连接等待写锁的时间与生产配置一致）"""
+    if read_only:
+        return sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    return sqlite3.connect(path, timeout=PRODUCTION_PRAGMAS["busy_timeout"] / 1000)
+
+
+def file_sha256(path: Path) -> str:
+    """计算文件的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def manifest_path(snapshot: Path) -> Path:
+    """快照对应的清单文件路径"""
+    return snapshot.with_suffix(".json")
+
+
+def read_manifest(snapshot: Path) -> Optional[dict]:
+    """读取清单，不存在时返回 None"""
+    path = manifest_path(snapshot)
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _count_rows(conn: sqlite3.Connection) -> dict:
+    """统计各表行数"""
+    existing = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    return {
+        table: conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+        for table in COUNTED_TABLES if table in existing
+    }
+
+
+def snapshot_file(name: str) -> Path:
+    """按名称取快照目录中的快照文件"""
+    if not SNAPSHOT_NAME.match(name):
+        raise SnapshotError(f"无效的快照名: {name}")
+    return SNAPSHOT_DIR / name
+
+
+def export_snapshot(dest: Optional[Path] = None) -> dict:
+    """导出快照，返回清单"""
+    source = database_path()
+    if dest is None:
+        dest = SNAPSHOT_DIR / f"question_bank_{datetime.utcnow():%Y%m%d_%H%M%S}.db"
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(dest.name + ".tmp")
+    if tmp.exists():
+        tmp.unlink()
+
+    src = _connect(source, read_only=True)
+    dst = sqlite3.connect(tmp)
+    try:
+        src.backup(dst)
+        dst.execute("PRAGMA journal_mode=DELETE")
+        dst.execute("VACUUM")
+        rows = _count_rows(dst)
+        quick_check = dst.execute("PRAGMA quick_check").fetchone()[0]
+    finally:
+        dst.close()
+        src.close()
+    if quick_check != "ok":
+        tmp.unlink()
+        raise SnapshotError(f"快照完整性检查失败: {quick_check}")
+
+    os.replace(tmp, dest)
+    manifest = {
+        "name": dest.name,
+        "path": str(dest),
+        "size_bytes": dest.stat().st_size,
+        "sha256": file_sha256(dest),
+        "created_at": datetime.utcnow().isoformat(),
+        "rows": rows,
+    }
+    with open(manifest_path(dest), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+def verify_snapshot(snapshot: Path) -> dict:
+    """校验快照文件，返回清单（没有清单时只做完整性检查）"""
+    if not snapshot.exists():
+        raise SnapshotError(f"快照文件不存在: {snapshot}")
+
+    manifest = read_manifest(snapshot)
+    if manifest is not None:
+        checksum = file_sha256(snapshot)
+        if checksum != manifest["sha256"]:
+            raise SnapshotError(f"快照校验和不匹配: {checksum} != {manifest['sha256']}")
+
+    conn = _connect(snapshot, read_only=True)
+    try:
+        quick_check = conn.execute("PRAGMA quick_check").fetchone()[0]
+        if quick_check != "ok":
+            raise SnapshotError(f"快照完整性检查失败: {quick_check}")
+        rows = _count_rows(conn)
+    finally:
+        conn.close()
+
+    if manifest is None:
+        manifest = {"name": snapshot.name, "path": str(snapshot), "rows": rows}
+    return manifest
+
+
+def restore_snapshot(snapshot: Path) -> dict:
+    """
+    校验快照并写入当前数据库，返回清单
+
+    通过备份 API 写入，已打开的连接会自动看到新数据；写入期间持有进程内写锁，
+    等待超时抛出 WriteLockTimeout。恢复后推进数据版本号并丢弃元数据索引，
+    调用方还需要失效进程内读缓存。
+    """
+    manifest = verify_snapshot(snapshot)
+    target = database_path()
+
+    with write_lock():
+        previous = _generation_before_restore()
+        src = _connect(snapshot, read_only=True)
+        dst = _connect(target)
+        try:
+            src.backup(dst)
+            if PRODUCTION:
+                # 快照文件不是 WAL 模式，恢复后切回生产配置
+                dst.execute(f"PRAGMA journal_mode={PRODUCTION_PRAGMAS['journal_mode']}")
+        finally:
+            dst.close()
+            src.close()
+        _advance_generation(previous)
+    reset_metadata_index()
+    return manifest
+
+
+def _generation_before_restore() -> int:
+    """恢复前的数据版本号（新库还没有建表时为 0）"""
+    db = SessionLocal()
+    try:
+        return current_generation(db)
+    except OperationalError:
+        return 0
+    finally:
+        db.close()
+
+
+def _advance_generation(previous: int):
+    """
+    把恢复后的数据版本号推进到比恢复前后都大的值
+
+    快照的版本号可能等于恢复前的版本号，不推进时按版本号缓存的状态
+    （元数据索引、预渲染缓存的有效性判断）会把恢复前的数据当作仍然有效。
+    快照中与快照版本一致的预渲染缓存仍然有效，随之推进。
+    """
+    db = SessionLocal()
+    try:
+        restored = current_generation(db)
+        stats = refresh_stats(db)
+        stats.generation = max(previous, restored) + 1
+        db.execute(
+            update(PaperBlob).where(PaperBlob.generation == restored).values(generation=stats.generation)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def list_snapshots() -> List[dict]:
+    """快照目录中的快照清单（最新的在前）"""
+    if not SNAPSHOT_DIR.exists():
+        return []
+    manifests = []
+    for snapshot in sorted(SNAPSHOT_DIR.glob("*.db"), reverse=True):
+        manifest = read_manifest(snapshot)
+        if manifest is not None:
+            manifests.append(manifest)
+    return manifests
+
+
+def database_is_empty() -> bool:
+    """当前数据库是否还没有试卷（文件不存在或没有 papers 表也算）"""
+    path = database_path()
+    if not path.exists():
+        return True
+    conn = _connect(path, read_only=True)
+    try:
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='papers'").fetchone() is None:
+            return True
+        return conn.execute("SELECT 1 FROM papers LIMIT 1").fetchone() is None
+    finally:
+        conn.close()
+
+
+def restore_on_startup() -> Optional[dict]:
+    """启动时按 SNAPSHOT_RESTORE_PATH 恢复空数据库，返回清单（未恢复时为 None）"""
+    if not SNAPSHOT_RESTORE_PATH or not IS_SQLITE:
+        return None
+    if not database_is_empty():
+        print("ℹ️  数据库已有数据，跳过快照恢复")
+        return None
+    return restore_snapshot(Path(SNAPSHOT_RESTORE_PATH))
@@ -0,0 +1,152 @@
+"""
+题库统计服务
+
+统计结果物化在 bank_stats 表中，由导入/删除/重置等写操作刷新，
+读接口只读取单行记录，耗时与题库规模无关。
+
+导入和删除按增量更新统计（apply_stats_delta）：计数加减本次写入/删除的行数，
+年份范围只在删除的试卷位于边界年份时按年份索引重新取最小/最大值，
+省份和科目只在删除后检查是否还有同值的试卷。整表重新计算（refresh_stats）
+只用于重置、快照恢复和统计表缺失等需要对齐实际数据的场合。
+"""
+from datetime import datetime
+from typing import Iterable, Set, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from app.models.database import Paper, Question, QuestionImage, BankStats
+
+STATS_ROW_ID = 1
+
+
+def compute_stats(db: Session) -> dict:
+    """用聚合 SQL 计算题库统计信息"""
+    total_papers, min_year, max_year = db.execute(
+        select(func.count(Paper.id), func.min(Paper.year), func.max(Paper.year))
+    ).one()
+    total_questions = db.scalar(select(func.count(Question.id)))
+    total_images = db.scalar(select(func.count(QuestionImage.id)))
+    provinces = db.scalars(
+        select(Paper.province).distinct().order_by(Paper.province)
+    ).all()
+    subjects = db.scalars(
+        select(Paper.subject).distinct().order_by(Paper.subject)
+    ).all()
+
+    return {
+        "total_papers": total_papers or 0,
+        "total_questions": total_questions or 0,
+        "total_images": total_images or 0,
+        "min_year": min_year,
+        "max_year": max_year,
+        "provinces": list(provinces),
+        "subjects": list(subjects),
+    }
+
+
+def refresh_stats(db: Session) -> BankStats:
+    """重新计算并写入统计表，同时递增数据版本号（不提交，由调用方控制事务）"""
+    values = compute_stats(db)
+    stats = db.get(BankStats, STATS_ROW_ID)
+    if stats is None:
+        stats = BankStats(id=STATS_ROW_ID, generation=0)
+        db.add(stats)
+    for key, value in values.items():
+        setattr(stats, key, value)
+    stats.generation = (stats.generation or 0) + 1
+    stats.updated_at = datetime.utcnow()
+    db.flush()
+    return stats
+
+
+PaperKey = Tuple[int, str, str]  # (年份, 省份, 科目)
+
+
+class StatsDelta:
+    """一次写操作对统计的增量"""
+
+    def __init__(self):
+        self.papers = 0
+        self.questions = 0
+        self.images = 0
+        self.added: Set[PaperKey] = set()
+        self.removed: Set[PaperKey] = set()
+
+    def add_paper(self, key: PaperKey, questions: int, images: int):
+        self.papers += 1
+        self.questions += questions
+        self.images += images
+        self.added.add(key)
+
+    def remove_paper(self, key: PaperKey, questions: int, images: int):
+        self.papers -= 1
+        self.questions -= questions
+        self.images -= images
+        self.removed.add(key)
+
+    def adjust(self, questions: int, images: int):
+        """已有试卷的题目/图片数变化（差量导入）"""
+        self.questions += questions
+        self.images += images
+
+
+def _remaining(db: Session, column, values: Iterable[str]) -> Set[str]:
+    """删除后仍有试卷使用的省份/科目（按索引逐个检查）"""
+    return {
+        value for value in values
+        if db.scalar(select(Paper.id).where(column == value).limit(1)) is not None
+    }
+
+
+def apply_stats_delta(db: Session, delta: StatsDelta) -> BankStats:
+    """按增量更新统计表，同时递增数据版本号（不提交，由调用方控制事务）"""
+    stats = db.get(BankStats, STATS_ROW_ID)
+    if stats is None:
+        # 旧库还没有统计表行：整表计算一次
+        return refresh_stats(db)
+
+    stats.total_papers += delta.papers
+    stats.total_questions += delta.questions
+    stats.total_images += delta.images
+
+    # 同一试卷删除后又写入（覆盖导入）不影响年份、省份和科目
+    removed = delta.removed - delta.added
+    years = [year for year, _, _ in delta.added]
+    if years:
+        stats.min_year = min(years) if stats.min_year is None else min(stats.min_year, *years)
+        stats.max_year = max(years) if stats.max_year is None else max(stats.max_year, *years)
+    if any(year in (stats.min_year, stats.max_year) for year, _, _ in removed):
+        # MIN/MAX 分开查询，各自只读年份索引的一端
+        stats.min_year = db.scalar(select(func.min(Paper.year)))
+        stats.max_year = db.scalar(select(func.max(Paper.year)))
+
+    provinces = set(stats.provinces) | {province for _, province, _ in delta.added}
+    subjects = set(stats.subjects) | {subject for _, _, subject in delta.added}
+    removed_provinces = {province for _, province, _ in removed} - {province for _, province, _ in delta.added}
+    removed_subjects = {subject for _, _, subject in removed} - {subject for _, _, subject in delta.added}
+    provinces -= removed_provinces - _remaining(db, Paper.province, removed_provinces)
+    subjects -= removed_subjects - _remaining(db, Paper.subject, removed_subjects)
+    stats.provinces = sorted(provinces)
+    stats.subjects = sorted(subjects)
+
+    stats.generation = (stats.generation or 0) + 1
+    stats.updated_at = datetime.utcnow()
+    db.flush()
+    return stats
+
+
+def get_stats(db: Session) -> BankStats:
+    """
+    读取物化统计
+
+    不存在时（如旧库首次访问）即时计算但不写入，版本号视为 0；
+    读路径不产生写操作，统计表在下一次写操作时生成。
+    """
+    stats = db.get(BankStats, STATS_ROW_ID)
+    if stats is None:
+        stats = BankStats(id=STATS_ROW_ID, generation=0, **compute_stats(db))
+    return stats
+
+
+def current_generation(db: Session) -> int:
+    """当前数据版本号"""
+    return get_stats(db).generation
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+响应序列化与压缩基准
+
+在临时 SQLite 库中导入 public/papers 下的真题，对主要读接口测量：
+- 序列化耗时：标准库 json（JSONResponse）与 orjson（ORJSONResponse）
+- 传输字节数和压缩耗时：不压缩 / gzip / brotli
+
+    python3 scripts/bench_responses.py [迭代次数]
+"""
+import sys
+import os
+import tempfile
+import time
+from pathlib import Path
+
+# 使用临时数据库并关闭读缓存
+_tmp_dir = tempfile.mkdtemp(prefix="qb_bench_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp_dir, 'bench.db')}"
+os.environ["CACHE_MAX_ENTRIES"] = "0"
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.testclient import TestClient
+from app.main import app
+from app.database import SessionLocal
+from app.middleware import brotli, compress
+from app.services.importer import import_paper_files
+
+PAPERS_DIR = Path(__file__).resolve().parents[3] / "public" / "papers"
+
+# (说明, 路径, 参数)；试卷详情取题目最多的一套，运行时补充
+ROUTES = [
+    ("题目列表200", "/api/questions", {"limit": 200}),
+    ("全文检索", "/api/questions", {"keyword": "极限", "limit": 200}),
+    ("试卷列表", "/api/papers", {}),
+    ("单题", "/api/questions/100", {}),
+]
+
+
+def timed(fn, iterations: int) -> float:
+    """平均耗时（毫秒）"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) * 1000 / iterations
+
+
+def main():
+    """主函数"""
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    encodings = ["gzip"] + (["br"] if brotli is not None else [])
+
+    print("=" * 78)
+    print("  📈 响应序列化与压缩基准")
+    print("=" * 78)
+
+    with TestClient(app) as client:
+        paths = sorted(PAPERS_DIR.glob("广东_高数_*.json"))
+        result = import_paper_files(SessionLocal(), paths, workers=1)
+        print(f"📂 已导入 {result.papers_imported} 套试卷、{result.questions_imported} 道题目，每项 {iterations} 次\n")
+
+        largest = max(client.get("/api/papers").json(), key=lambda p: p["total_questions"])
+        routes = [(
+            "试卷详情", f"/api/papers/{largest['year']}",
+            {"province": largest["province"], "subject": largest["subject"]}
+        )] + ROUTES
+
+        print(f"{'接口':<12}{'json ms':>10}{'orjson ms':>11}{'原始字节':>12}", end="")
+        for encoding in encodings:
+            print(f"{encoding + '字节':>12}{encoding + ' ms':>10}", end="")
+        print()
+
+        for label, path, params in routes:
+            response = client.get(path, params=params, headers={"Accept-Encoding": "identity"})
+            assert response.status_code == 200, f"{label}: {response.status_code}"
+            raw = response.content
+
+            # 序列化耗时：对同一份响应数据分别用两种响应类编码
+            content = jsonable_encoder(response.json())
+            json_ms = timed(lambda: JSONResponse(content).body, iterations)
+            orjson_ms = timed(lambda: ORJSONResponse(content).body, iterations)
+            print(f"{label:<12}{json_ms:>10.3f}{orjson_ms:>11.3f}{len(raw):>12}", end="")
+
+            for encoding in encodings:
+                response = client.get(path, params=params, headers={"Accept-Encoding": encoding})
+                wire = int(response.headers.get("content-length", len(raw)))
+                assert response.headers.get("content-encoding") in (encoding, None)
+                compress_ms = timed(lambda: compress(raw, encoding), iterations)
+                print(f"{wire:>12}{compress_ms:>10.3f}", end="")
+            print()
+
+    print("=" * 78)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
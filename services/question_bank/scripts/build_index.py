@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+嵌入式题库索引构建脚本
+
+从试卷 JSON 文件生成嵌入模式（BANK_MODE=embedded）使用的索引文件。
+默认读取仓库 public/papers 下的 广东_高数_*.json。
+"""
+import sys
+import os
+import json
+import argparse
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.embedded import EMBEDDED_INDEX_PATH, build_index
+
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+DEFAULT_PAPERS = PROJECT_ROOT / "public" / "papers"
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="构建嵌入式题库索引")
+    parser.add_argument("inputs", nargs="*", help="试卷 JSON 文件或目录（默认 public/papers）")
+    parser.add_argument("-o", "--output", default=str(EMBEDDED_INDEX_PATH), help="索引文件路径")
+    args = parser.parse_args()
+
+    paths = []
+    for item in (args.inputs or [str(DEFAULT_PAPERS)]):
+        item = Path(item)
+        if item.is_dir():
+            paths.extend(sorted(item.glob("广东_高数_*.json")))
+        else:
+            paths.append(item)
+    if not paths:
+        print("❌ 没有找到试卷文件")
+        return 1
+
+    print(f"📂 读取 {len(paths)} 个试卷文件...")
+    index = build_index(paths)
+
+    output = Path(args.output)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+
+    questions = sum(len(s["questions"]) for p in index["papers"] for s in p["sections"])
+    print(f"✅ 索引已写入: {output}")
+    print(f"📄 试卷: {len(index['papers'])}  ❓ 题目: {questions}  💾 {output.stat().st_size / 1024:.0f} KB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
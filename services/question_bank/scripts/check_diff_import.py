@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+差量导入回归检查
+
+在临时 SQLite 库中先导入一张合成试卷，再用差量导入依次写入几组修改后的版本，
+其中包括同一张试卷在一次导入中出现多次的情况（后一次要删除前一次刚新增、
+尚未写入的章节，并再次更新前一次改过的题目）。每次导入后检查：
+
+- 外键完整（没有指向已删除章节/题目的行）
+- 每道题的 LSH 桶数等于分段数，图片行数与数据文件一致（没有重复行）
+- 试卷的冗余计数与实际行数一致，题库内容与最后一次出现的版本一致
+- 按增量更新的统计表与整表重新统计的结果一致
+- 试卷详情中章节和题目的顺序与数据文件一致（在中间插入的章节ID更大，不能按ID排序）
+
+出现问题时以非零状态退出，可在修改导入逻辑后运行：
+
+    python3 scripts/check_diff_import.py
+"""
+import sys
+import os
+import copy
+import json
+import tempfile
+
+# 使用临时数据库
+_tmp_dir = tempfile.mkdtemp(prefix="qb_diff_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp_dir, 'diff.db')}"
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, select, text
+from app.database import SessionLocal, init_db
+from app.models.database import Paper, Section, Question, QuestionImage, QuestionLsh
+from app.services.importer import import_papers
+from app.services.paper_cache import render_paper
+from app.services.stats import compute_stats, get_stats
+from app.services.similarity import BANDS
+
+
+def build_paper(year: int = 2010) -> dict:
+    """生成一张合成试卷"""
+    sections = []
+    number = 1
+    for order, name in enumerate(["单项选择题", "填空题", "计算题"]):
+        questions = []
+        for _ in range(4):
+            questions.append({
+                "question_number": number,
+                "content": f"{year}年第{number}题：求极限 $\\lim_{{x\\to 0}}\\frac{{\\sin {number}x}}{{x}}$",
+                "answer": str(number),
+                "images": [{"url": f"https://example.com/{year}/{number}.png"}] if number % 3 == 0 else []
+            })
+            number += 1
+        sections.append({"section_number": "一二三"[order], "section_name": name, "questions": questions})
+    return {"year": year, "province": "广东", "subject": "高等数学", "exam_type": "专升本", "sections": sections}
+
+
+def with_new_section(paper: dict) -> dict:
+    """新增一个章节（含题目和图片），并修改第一道题"""
+    paper = copy.deepcopy(paper)
+    paper["sections"][0]["questions"][0]["content"] += "（修改一）"
+    paper["sections"].append({
+        "section_number": "四",
+        "section_name": "证明题",
+        "questions": [{
+            "question_number": 99,
+            "content": "证明：当 $x > 0$ 时 $\\sin x < x$",
+            "images": [{"url": "https://example.com/proof.png"}]
+        }]
+    })
+    return paper
+
+
+def without_section(paper: dict, index: int) -> dict:
+    """删除一个章节（之后再导入原版本，相当于在中间插入章节）"""
+    paper = copy.deepcopy(paper)
+    del paper["sections"][index]
+    return paper
+
+
+def with_changed_answers(paper: dict) -> dict:
+    """再次修改第一道题，并修改所有答案"""
+    paper = copy.deepcopy(paper)
+    paper["sections"][0]["questions"][0]["content"] += "（修改二）"
+    for section in paper["sections"]:
+        for question in section["questions"]:
+            question["answer"] = f"{question.get('answer')}'"
+    return paper
+
+
+def check(db, label: str, expected: dict) -> int:
+    """检查数据库与最后写入的试卷版本一致，返回失败数"""
+    failures = []
+    orphans = db.execute(text("PRAGMA foreign_key_check")).all()
+    if orphans:
+        failures.append(f"外键不完整: {orphans[:3]}")
+
+    lsh_counts = db.execute(
+        select(Question.id, func.count(QuestionLsh.question_id))
+        .outerjoin(QuestionLsh, QuestionLsh.question_id == Question.id)
+        .group_by(Question.id)
+    ).all()
+    bad_lsh = [(question_id, count) for question_id, count in lsh_counts if count != BANDS]
+    if bad_lsh:
+        failures.append(f"LSH 桶数不等于 {BANDS}: {bad_lsh[:3]}")
+
+    expected_questions = {
+        (section["section_number"], question["question_number"]): question
+        for section in expected["sections"] for question in section["questions"]
+    }
+    actual_questions = {
+        (section_number, question.question_number): question
+        for question, section_number in db.execute(
+            select(Question, Section.section_number).join(Section, Question.section_id == Section.id)
+        )
+    }
+    if set(actual_questions) != set(expected_questions):
+        failures.append(f"题目不一致: 多出 {sorted(set(actual_questions) - set(expected_questions))}，"
+                        f"缺少 {sorted(set(expected_questions) - set(actual_questions))}")
+    for key, question in actual_questions.items():
+        data = expected_questions.get(key)
+        if data is None:
+            continue
+        if question.content != data["content"] or question.answer != data.get("answer"):
+            failures.append(f"题目内容不是最新版本: {key}")
+        images = db.scalar(select(func.count(QuestionImage.id)).where(QuestionImage.question_id == question.id))
+        if images != len(data.get("images", [])):
+            failures.append(f"图片行数不一致: {key} 有 {images} 行，应为 {len(data.get('images', []))}")
+
+    paper = db.scalars(select(Paper)).one()
+    actual_counts = (
+        db.scalar(select(func.count(Section.id))),
+        db.scalar(select(func.count(Question.id))),
+        db.scalar(select(func.count(QuestionImage.id))),
+    )
+    if (paper.total_sections, paper.total_questions, paper.total_images) != actual_counts:
+        failures.append(f"试卷计数 {(paper.total_sections, paper.total_questions, paper.total_images)}"
+                        f" 与实际行数 {actual_counts} 不一致")
+
+    stats = get_stats(db)
+    actual_stats = {key: getattr(stats, key) for key in compute_stats(db)}
+    if actual_stats != compute_stats(db):
+        failures.append(f"统计表 {actual_stats} 与实际数据 {compute_stats(db)} 不一致")
+
+    expected_order = [
+        (section["section_number"], [question["question_number"] for question in section["questions"]])
+        for section in expected["sections"]
+    ]
+    detail = json.loads(render_paper(db, expected["year"], expected["province"], expected["subject"]))
+    actual_order = [
+        (section["section_number"], [question["question_number"] for question in section["questions"]])
+        for section in detail["sections"]
+    ]
+    if actual_order != expected_order:
+        failures.append(f"试卷详情顺序不一致: {actual_order}，应为 {expected_order}")
+
+    if failures:
+        print(f"  ✗ {label}")
+        for failure in failures:
+            print(f"    {failure}")
+    else:
+        print(f"  ✓ {label}")
+    return len(failures)
+
+
+def main():
+    """主函数"""
+    print("=" * 60)
+    print("  🔍 差量导入回归检查")
+    print("=" * 60)
+
+    init_db()
+    base = build_paper()
+    added = with_new_section(base)
+    changed = with_changed_answers(added)
+
+    # (说明, 本次导入的试卷列表)，每次导入后题库应与列表中最后一个版本一致
+    steps = [
+        ("初始导入", [base]),
+        ("新增章节并修改题目", [added]),
+        ("同一试卷出现两次（删除前一次新增的章节）", [base, added, base]),
+        ("同一试卷出现两次（连续修改同一道题）", [changed, with_changed_answers(changed)]),
+        ("恢复初始版本", [base]),
+        ("删除中间的章节", [without_section(base, 1)]),
+        ("在中间插入章节", [base]),
+    ]
+
+    failures = 0
+    db = SessionLocal()
+    try:
+        for label, papers in steps:
+            try:
+                import_papers(db, copy.deepcopy(papers), diff=True)
+            except Exception as e:
+                db.rollback()
+                print(f"  ✗ {label}: 导入失败 {type(e).__name__}: {str(e).splitlines()[0]}")
+                failures += 1
+                continue
+            failures += check(db, label, papers[-1])
+    finally:
+        db.close()
+
+    print("=" * 60)
+    if failures:
+        print(f"❌ 发现 {failures} 处问题")
+        return 1
+    print("✅ 差量导入结果正确")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+查询计划回归检查
+
+在临时 SQLite 库中导入一份合成题库，依次调用各个 API 路由，
+捕获路由实际执行的 SQL，逐条运行 EXPLAIN QUERY PLAN。
+出现未走索引的全表扫描（且不在该路由的允许列表中）时以非零状态退出，
+可在 CI 或修改模型/查询后运行：
+
+    python3 scripts/check_query_plans.py
+"""
+import sys
+import os
+import re
+import json
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+# 使用临时数据库并关闭读缓存，保证每个路由都真正访问数据库
+_tmp_dir = tempfile.mkdtemp(prefix="qb_plans_")
+_db_path = os.path.join(_tmp_dir, "plans.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_path}"
+os.environ["CACHE_MAX_ENTRIES"] = "0"
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from fastapi.testclient import TestClient
+from app.main import app
+from app.database import engine, async_engine, async_write_engine
+from app.services.pagination import encode_cursor
+
+# 全表扫描：SCAN <表名>，后面没有 USING INDEX / USING COVERING INDEX / VIRTUAL TABLE
+FULL_SCAN = re.compile(r"\bSCAN (\w+)\b(?! USING (?:COVERING )?INDEX| VIRTUAL TABLE)")
+
+# (说明, 方法, 路径, 参数, 允许全表扫描的表)
+ROUTES = [
+    ("统计", "GET", "/api/papers/stats", {}, set()),
+    ("试卷列表", "GET", "/api/papers", {"limit": 5}, set()),
+    ("试卷列表-省份", "GET", "/api/papers", {"province": "广东", "limit": 5}, set()),
+    ("试卷列表-年份", "GET", "/api/papers", {"year": 2010}, set()),
+    ("试卷详情", "GET", "/api/papers/2010", {"province": "广东"}, set()),
+    ("试卷详情-稀疏字段", "GET", "/api/papers/2010",
+     {"province": "广东", "fields": "id,question_number,content_preview"}, set()),
+    ("单题", "GET", "/api/questions/7", {}, set()),
+    ("批量取题", "GET", "/api/questions/batch", {"ids": "3,5,8,13"}, set()),
+    # 无筛选的题目列表沿章节顺序索引和题号索引遍历，在 LIMIT 处停止
+    ("题目列表", "GET", "/api/questions", {"limit": 10}, set()),
+    ("题目列表-游标", "GET", "/api/questions",
+     {"limit": 10, "after": encode_cursor("questions", [2, 1, 5, 8, 8])}, set()),
+    ("题目列表-年份", "GET", "/api/questions", {"year": 2010}, set()),
+    ("题目列表-稀疏字段", "GET", "/api/questions",
+     {"year": 2010, "fields": "id,question_number,section_name,content_preview"}, set()),
+    ("全文检索", "GET", "/api/questions", {"keyword": "极限计算"}, set()),
+    # 短关键词退回 LIKE，本身就需要扫描
+    ("短关键词", "GET", "/api/questions", {"keyword": "极限"}, {"questions"}),
+    # 位图索引在数据版本变化后的首次查询时整表读取重建，之后不访问题目表
+    ("元数据查询", "GET", "/api/questions/query", {"tags": "limit-calculation", "difficulty_min": 3}, {"questions"}),
+    ("相似题", "GET", "/api/questions/7/similar", {}, set()),
+    # 重复题报告按 (band, 桶号) 分组遍历主键索引，再遍历分组结果（共享桶）
+    ("重复题报告", "GET", "/api/admin/duplicates", {}, {"shared"}),
+]
+
+# 统计表刷新中的 COUNT/DISTINCT 需要遍历整表，只在写操作（导入、删除）时执行，不做检查
+STATS_AGGREGATE = re.compile(r"^\s*SELECT (?:count\(|DISTINCT )", re.IGNORECASE)
+
+
+def build_sample_bank(path: Path, years=range(2003, 2025), answer="1"):
+    """生成合成题库文件"""
+    papers = []
+    for year in years:
+        sections = []
+        number = 1
+        for order, name in enumerate(["单项选择题", "填空题", "计算题"]):
+            questions = []
+            for _ in range(5):
+                questions.append({
+                    "question_number": number,
+                    "content": f"{year}年第{number}题：极限计算 $\\lim_{{x\\to 0}}\\frac{{\\sin x}}{{x}}$",
+                    "answer": answer,
+                    "images": [{"url": f"https://example.com/{year}/{number}.png"}] if number % 4 == 0 else []
+                })
+                number += 1
+            sections.append({
+                "section_number": "一二三"[order],
+                "section_name": name,
+                "questions": questions
+            })
+        papers.append({
+            "year": year,
+            "province": "广东",
+            "subject": "高等数学",
+            "exam_type": "专升本",
+            "sections": sections
+        })
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"meta": {}, "papers": papers}, f, ensure_ascii=False)
+
+
+class StatementRecorder:
+    """记录引擎执行的 SQL 语句"""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith("SELECT"):
+            self.statements.append((statement, parameters))
+
+    def take(self):
+        statements, self.statements = self.statements, []
+        return statements
+
+
+def explain(conn: sqlite3.Connection, statement: str, parameters) -> list:
+    """返回查询计划的 detail 列"""
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ()).fetchall()
+    return [row[-1] for row in rows]
+
+
+def check_statements(conn, label, statements, allowed=frozenset(), write_path=False) -> int:
+    """检查一组语句，返回失败数"""
+    failures = 0
+    for statement, parameters in statements:
+        if write_path and STATS_AGGREGATE.match(statement):
+            continue
+        plan = explain(conn, statement, parameters)
+        scans = {m.group(1) for line in plan for m in FULL_SCAN.finditer(line)} - allowed
+        if scans:
+            failures += 1
+            print(f"  ✗ [{label}] 全表扫描 {sorted(scans)}")
+            print(f"    SQL: {' '.join(statement.split())[:200]}")
+            for line in plan:
+                print(f"      {line}")
+    return failures
+
+
+def run_import(client, payload: dict, timeout: float = 60):
+    """提交导入任务并等待完成"""
+    response = client.post("/api/admin/import", json=payload)
+    assert response.status_code == 202, response.text
+    job_id = response.json()["id"]
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/api/admin/jobs/{job_id}").json()
+        if job["status"] in ("succeeded", "failed"):
+            assert job["status"] == "succeeded", job["error"]
+            return job
+        time.sleep(0.05)
+    raise TimeoutError(f"导入任务超时: {job_id}")
+
+
+def _report(conn, label, statements, allowed=frozenset(), write_path=False) -> int:
+    """检查并输出一个路由的结果"""
+    failures = check_statements(conn, label, statements, allowed, write_path)
+    if not failures:
+        print(f"  ✓ {label}: {len(statements)} 条查询")
+    return failures
+
+
+def main():
+    """主函数"""
+    print("=" * 60)
+    print("  🔍 查询计划回归检查")
+    print("=" * 60)
+
+    recorder = StatementRecorder()
+    # 导入任务在后台线程中使用同步引擎
+    engines = {engine, async_engine.sync_engine, async_write_engine.sync_engine}
+    for target in engines:
+        event.listen(target, "before_cursor_execute", recorder)
+
+    data_path = Path(_tmp_dir) / "bank.json"
+    build_sample_bank(data_path)
+
+    failures = 0
+    with TestClient(app) as client:
+        conn = sqlite3.connect(_db_path)
+        recorder.take()  # 丢弃启动时建表产生的查询
+
+        # 导入路径
+        run_import(client, {"data_path": str(data_path)})
+        failures += _report(conn, "导入", recorder.take(), write_path=True)
+
+        # 差量导入路径（答案全部变化）
+        changed_path = Path(_tmp_dir) / "bank_changed.json"
+        build_sample_bank(changed_path, answer="2")
+        run_import(client, {"data_path": str(changed_path), "diff": True})
+        failures += _report(conn, "差量导入", recorder.take(), write_path=True)
+
+        # 读路径
+        for label, method, path, params, allowed in ROUTES:
+            response = client.request(method, path, params=params)
+            assert response.status_code == 200, f"{label}: {response.status_code} {response.text}"
+            failures += _report(conn, label, recorder.take(), allowed)
+
+        # 删除路径
+        response = client.delete("/api/admin/papers/2010", params={"province": "广东"})
+        assert response.status_code == 200, response.text
+        failures += _report(conn, "删除", recorder.take(), write_path=True)
+
+        conn.close()
+
+    print("=" * 60)
+    if failures:
+        print(f"❌ {failures} 条查询出现全表扫描")
+        return 1
+    print("✅ 所有查询均使用索引")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
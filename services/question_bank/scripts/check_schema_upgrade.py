@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+旧数据库表结构升级检查
+
+在临时 SQLite 库中按最初版本的表结构建表并写入两张试卷（另有一张重复试卷和一道孤儿题目），
+然后执行 init_db，检查：
+
+- 各表包含模型中的全部列，子表外键为 ON DELETE CASCADE，试卷有唯一约束，外键完整
+- 试卷的冗余计数与实际行数一致，重复试卷和孤儿行已删除
+- 每道题都有签名和 LSH 桶，统计表与实际数据一致
+- 用差量导入写入同一份试卷数据时没有任何改动（回填的内容哈希与导入时计算的一致）
+- 再次执行 init_db 不做任何修改
+
+出现问题时以非零状态退出，修改模型或 app/services/schema.py 后可运行：
+
+    python3 scripts/check_schema_upgrade.py
+"""
+import sys
+import os
+import copy
+import sqlite3
+import tempfile
+
+# 使用临时数据库
+_tmp_dir = tempfile.mkdtemp(prefix="qb_schema_")
+DB_PATH = os.path.join(_tmp_dir, "old.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, inspect, select, text
+from app.database import SessionLocal, engine, init_db
+from app.models.database import Base, Paper, Section, Question, QuestionImage, QuestionLsh
+from app.services.importer import import_papers
+from app.services.similarity import BANDS
+from app.services.stats import compute_stats, get_stats
+
+# 最初版本的表结构（无计数、哈希、唯一约束，外键不级联）
+BASELINE_DDL = """
+CREATE TABLE papers (
+    id INTEGER NOT NULL, year INTEGER NOT NULL, province VARCHAR(50) NOT NULL,
+    subject VARCHAR(100) NOT NULL, exam_type VARCHAR(50) NOT NULL,
+    created_at DATETIME, updated_at DATETIME, PRIMARY KEY (id)
+);
+CREATE INDEX ix_papers_province ON papers (province);
+CREATE INDEX ix_papers_year ON papers (year);
+CREATE INDEX ix_papers_id ON papers (id);
+CREATE TABLE sections (
+    id INTEGER NOT NULL, paper_id INTEGER NOT NULL, section_number VARCHAR(10) NOT NULL,
+    section_name VARCHAR(100) NOT NULL, order_index INTEGER NOT NULL,
+    PRIMARY KEY (id), FOREIGN KEY(paper_id) REFERENCES papers (id)
+);
+CREATE INDEX ix_sections_id ON sections (id);
+CREATE TABLE questions (
+    id INTEGER NOT NULL, section_id INTEGER NOT NULL, question_number INTEGER NOT NULL,
+    content TEXT NOT NULL, answer TEXT, created_at DATETIME,
+    PRIMARY KEY (id), FOREIGN KEY(section_id) REFERENCES sections (id)
+);
+CREATE INDEX ix_questions_id ON questions (id);
+CREATE TABLE question_images (
+    id INTEGER NOT NULL, question_id INTEGER NOT NULL, alt_text VARCHAR(200), url TEXT NOT NULL,
+    position VARCHAR(50), caption VARCHAR(200), question_ref INTEGER,
+    PRIMARY KEY (id), FOREIGN KEY(question_id) REFERENCES questions (id)
+);
+CREATE INDEX ix_question_images_id ON question_images (id);
+"""
+
+
+def build_paper(year: int) -> dict:
+    """生成一张合成试卷"""
+    sections = []
+    number = 1
+    for order, name in enumerate(["单项选择题", "填空题", "计算题"]):
+        questions = []
+        for _ in range(3):
+            questions.append({
+                "question_number": number,
+                "content": f"{year}年第{number}题：求 $\\int_0^{{{number}}} x^2\\,dx$ 的值",
+                "answer": str(number),
+                "images": [{"url": f"https://example.com/{year}/{number}.png", "alt_text": "图"}]
+                if number % 4 == 0 else []
+            })
+            number += 1
+        sections.append({"section_number": "一二三"[order], "section_name": name, "questions": questions})
+    return {"year": year, "province": "广东", "subject": "高等数学", "exam_type": "专升本", "sections": sections}
+
+
+def write_baseline(papers: list):
+    """按最初版本的表结构建库，写入试卷、一张重复试卷和一道孤儿题目"""
+    conn = sqlite3.connect(DB_PATH)
+    conn.executescript(BASELINE_DDL)
+    for paper in papers + papers[:1]:
+        paper_id = conn.execute(
+            "INSERT INTO papers (year, province, subject, exam_type) VALUES (?, ?, ?, ?)",
+            (paper["year"], paper["province"], paper["subject"], paper["exam_type"])
+        ).lastrowid
+        for idx, section in enumerate(paper["sections"]):
+            section_id = conn.execute(
+                "INSERT INTO sections (paper_id, section_number, section_name, order_index) VALUES (?, ?, ?, ?)",
+                (paper_id, section["section_number"], section["section_name"], idx)
+            ).lastrowid
+            for question in section["questions"]:
+                question_id = conn.execute(
+                    "INSERT INTO questions (section_id, question_number, content, answer) VALUES (?, ?, ?, ?)",
+                    (section_id, question["question_number"], question["content"], question.get("answer"))
+                ).lastrowid
+                for image in question.get("images", []):
+                    conn.execute(
+                        "INSERT INTO question_images (question_id, alt_text, url, position) VALUES (?, ?, ?, ?)",
+                        (question_id, image.get("alt_text"), image["url"], image.get("position", "inline"))
+                    )
+    conn.execute("INSERT INTO questions (section_id, question_number, content) VALUES (9999, 1, '孤儿题目')")
+    conn.commit()
+    conn.close()
+
+
+def check_schema() -> list:
+    """表结构与模型一致"""
+    failures = []
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        missing = set(table.columns.keys()) - columns
+        if missing:
+            failures.append(f"{table.name} 缺少列: {sorted(missing)}")
+        for fk in inspector.get_foreign_keys(table.name):
+            if (fk.get("options") or {}).get("ondelete") != "CASCADE":
+                failures.append(f"{table.name}.{fk['constrained_columns']} 外键没有 ON DELETE CASCADE")
+        indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        missing = {index.name for index in table.indexes} - indexes
+        if missing:
+            failures.append(f"{table.name} 缺少索引: {sorted(missing)}")
+    uniques = {constraint["name"] for constraint in inspector.get_unique_constraints("papers")}
+    if "uq_papers_year_province_subject" not in uniques:
+        failures.append("papers 缺少唯一约束")
+    return failures
+
+
+def check_data(db, papers: list) -> list:
+    """回填的数据与导入时写入的一致"""
+    failures = []
+    orphans = db.execute(text("PRAGMA foreign_key_check")).all()
+    if orphans:
+        failures.append(f"外键不完整: {orphans[:3]}")
+    if db.scalar(select(func.count(Paper.id))) != len(papers):
+        failures.append("重复试卷未删除")
+
+    for paper in db.scalars(select(Paper)):
+        actual = (
+            db.scalar(select(func.count(Section.id)).where(Section.paper_id == paper.id)),
+            db.scalar(select(func.count(Question.id)).join(Section).where(Section.paper_id == paper.id)),
+            db.scalar(select(func.count(QuestionImage.id)).join(Question).join(Section)
+                      .where(Section.paper_id == paper.id)),
+        )
+        if (paper.total_sections, paper.total_questions, paper.total_images) != actual:
+            failures.append(f"试卷 {paper.year} 计数 {(paper.total_sections, paper.total_questions, paper.total_images)}"
+                            f" 与实际行数 {actual} 不一致")
+
+    lsh = db.scalar(select(func.count()).select_from(QuestionLsh))
+    questions = db.scalar(select(func.count(Question.id)))
+    if lsh != questions * BANDS:
+        failures.append(f"LSH 桶数 {lsh}，应为 {questions * BANDS}")
+
+    stats = get_stats(db)
+    actual_stats = {key: getattr(stats, key) for key in compute_stats(db)}
+    if actual_stats != compute_stats(db):
+        failures.append(f"统计表 {actual_stats} 与实际数据 {compute_stats(db)} 不一致")
+
+    result = import_papers(db, copy.deepcopy(papers), diff=True)
+    if result.changes.papers_unchanged != len(papers):
+        failures.append(f"差量导入同一份数据有改动: {result.changes}")
+    return failures
+
+
+def report(label: str, failures: list) -> int:
+    """输出一项检查的结果，返回失败数"""
+    if failures:
+        print(f"  ✗ {label}")
+        for failure in failures:
+            print(f"    {failure}")
+    else:
+        print(f"  ✓ {label}")
+    return len(failures)
+
+
+def main():
+    """主函数"""
+    print("=" * 60)
+    print("  🔍 旧数据库表结构升级检查")
+    print("=" * 60)
+
+    papers = [build_paper(2010), build_paper(2011)]
+    write_baseline(papers)
+    init_db()
+
+    failures = report("表结构", check_schema())
+    db = SessionLocal()
+    try:
+        failures += report("回填数据", check_data(db, papers))
+    finally:
+        db.close()
+
+    before = [row for row in sqlite3.connect(DB_PATH).iterdump()]
+    init_db()
+    after = [row for row in sqlite3.connect(DB_PATH).iterdump()]
+    failures += report("再次初始化", [] if before == after else ["再次执行 init_db 修改了数据库"])
+
+    print("=" * 60)
+    if failures:
+        print(f"❌ 发现 {failures} 处问题")
+        return 1
+    print("✅ 旧数据库升级结果正确")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
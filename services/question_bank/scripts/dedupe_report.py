@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+近似重复题报告
+
+按导入时写入的 MinHash 签名和 LSH 桶，列出当前数据库中相似度不低于阈值的题目分组，
+供人工核对后合并或删除。
+"""
+import sys
+import os
+import argparse
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal
+from app.services.similarity import DEFAULT_DUPLICATE_THRESHOLD, duplicate_report
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="近似重复题报告")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_DUPLICATE_THRESHOLD,
+                        help=f"最低相似度（默认 {DEFAULT_DUPLICATE_THRESHOLD}）")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出完整报告")
+    args = parser.parse_args()
+
+    if not 0 <= args.threshold <= 1:
+        print("❌ 阈值必须在 0 到 1 之间")
+        return 1
+
+    db = SessionLocal()
+    try:
+        report = duplicate_report(db, args.threshold)
+    finally:
+        db.close()
+
+    if args.json:
+        print(report.model_dump_json(indent=2))
+        return 0
+
+    print(f"🔍 相似度 ≥ {report.threshold:.2f} 的近似重复题")
+    for number, group in enumerate(report.groups, 1):
+        print(f"\n{'='*60}")
+        print(f"📎 第 {number} 组（{len(group.questions)} 道，最低相似度 {group.similarity:.2f}）")
+        for q in group.questions:
+            print(f"   #{q.id} {q.year} {q.province} {q.section_name} 第{q.question_number}题: {q.content_preview}")
+
+    print(f"\n{'='*60}")
+    print(f"✅ 共 {report.total_groups} 组、{report.total_questions} 道题目")
+    print(f"{'='*60}")
+    return 0
+
+
+if __name__ == "__main__":
+    # 使用示例:
+    # python3 scripts/dedupe_report.py                     # 默认阈值
+    # python3 scripts/dedupe_report.py --threshold 0.6     # 放宽阈值
+    # python3 scripts/dedupe_report.py --json > dup.json   # 导出 JSON
+    sys.exit(main())
@@ -9,10 +9,9 @@ import os
 # 添加项目根目录到路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from sqlalchemy.orm import Session
-from app.database import SessionLocal, init_db
-from app.routers.admin import import_data
-from app.models.schemas import ImportRequest
+from pathlib import Path
+from app.database import AsyncWriteSessionLocal, init_db
+from app.services.importer import import_file
 import asyncio
 
 
@@ -32,20 +31,15 @@ async def main():
     print(f"📂 准备导入数据: {data_path}")
     
     # 创建数据库会话
-    db = SessionLocal()
+    db = AsyncWriteSessionLocal()
     
     try:
-        # 创建导入请求
-        request = ImportRequest(
-            data_path=data_path,
-            overwrite=True  # 覆盖已存在的数据
-        )
-        
         print("⏳ 开始导入数据...")
-        result = await import_data(request, db)
+        # 覆盖已存在的数据
+        result = await db.run_sync(import_file, Path(data_path), True)
         
         print(f"\n{'='*60}")
-        print(f"✅ 导入成功！")
+        print("✅ 导入成功！")
         print(f"{'='*60}")
         print(f"📄 导入试卷数: {result.papers_imported}")
         print(f"❓ 导入题目数: {result.questions_imported}")
@@ -57,12 +51,8 @@ async def main():
         import traceback
         traceback.print_exc()
     finally:
-        db.close()
+        await db.close()
 
 
 if __name__ == "__main__":
     asyncio.run(main())
-
-
-
-
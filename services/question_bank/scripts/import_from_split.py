@@ -2,71 +2,48 @@
 """
 题库数据导入脚本（支持按年份拆分的文件）
 可以导入单个年份或批量导入所有年份
+
+数据目录由 --data-dir 或环境变量 PAPERS_DATA_DIR 指定（默认仓库 public/papers），
+目录中需要有 index.json。已存在的年份默认整卷覆盖，加 --diff 时按内容哈希差量更新。
 """
 import sys
 import os
+import argparse
 from pathlib import Path
 
 # 添加项目根目录到路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from sqlalchemy.orm import Session
-from app.database import SessionLocal, init_db
-from app.routers.admin import import_data
-from app.models.schemas import ImportRequest
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import AsyncWriteSessionLocal, init_db
+from app.services.importer import import_paper_files
 import asyncio
 import json
 
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+DATA_DIR = Path(os.getenv("PAPERS_DATA_DIR", str(PROJECT_ROOT / "public" / "papers")))
 
-async def import_single_year(year: int, db: Session, overwrite: bool = False):
-    """导入单个年份的数据"""
-    data_dir = Path("/Users/zengchanghuan/Desktop/workspace/flutter/math_seckill_web/data/papers")
-    data_file = data_dir / f"广东_高数_{year}.json"
-    
-    if not data_file.exists():
-        print(f"❌ 文件不存在: {data_file}")
-        return False
-    
-    print(f"\n📂 导入 {year}年 数据...")
-    
-    try:
-        # 读取单年份文件
-        with open(data_file, 'r', encoding='utf-8') as f:
-            year_data = json.load(f)
-        
-        # 转换为批量导入格式
-        batch_data = {
-            "meta": year_data["meta"],
-            "papers": [year_data["paper"]]
-        }
-        
-        # 临时保存为完整格式文件
-        temp_file = data_dir / f"temp_{year}.json"
-        with open(temp_file, 'w', encoding='utf-8') as f:
-            json.dump(batch_data, f, ensure_ascii=False)
-        
-        # 导入
-        request = ImportRequest(
-            data_path=str(temp_file),
-            overwrite=overwrite
-        )
-        result = await import_data(request, db)
-        
-        # 删除临时文件
-        temp_file.unlink()
-        
-        print(f"  ✓ {year}年: {result.questions_imported}题, {result.images_imported}图")
-        return True
-        
-    except Exception as e:
-        print(f"  ✗ {year}年导入失败: {e}")
-        return False
+# 解析进程数，默认使用全部 CPU 核
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", "0")) or None
 
 
-async def import_all_years(db: Session, overwrite: bool = False, years: list = None):
-    """批量导入所有年份或指定年份"""
-    data_dir = Path("/Users/zengchanghuan/Desktop/workspace/flutter/math_seckill_web/data/papers")
-    
+def report_year(path: Path, result, error):
+    """单个年份导入完成后输出结果"""
+    if error is not None:
+        print(f"  ✗ {path.name} 导入失败: {error}")
+    elif result.changes is not None and not result.papers_imported:
+        print(f"  - {path.name}: 无变化")
+    elif result.changes is not None:
+        changes = result.changes
+        print(f"  ✓ {path.name}: 新增{changes.questions_inserted}题, "
+              f"更新{changes.questions_updated}题, 删除{changes.questions_deleted}题")
+    else:
+        print(f"  ✓ {path.name}: {result.questions_imported}题, {result.images_imported}图")
+
+
+async def import_all_years(db: AsyncSession, data_dir: Path = DATA_DIR, overwrite: bool = False,
+                           years: list = None, diff: bool = False):
+    """批量导入所有年份或指定年份（并行解析，单连接写入；diff 时已存在的年份做差量更新）"""
     # 读取索引文件
     index_file = data_dir / "index.json"
     if not index_file.exists():
@@ -82,37 +59,42 @@ async def import_all_years(db: Session, overwrite: bool = False, years: list = N
     else:
         files_to_import = index_data['files']
     
-    print(f"📊 准备导入 {len(files_to_import)} 个年份")
-    print(f"{'='*60}")
-    
-    success_count = 0
-    fail_count = 0
-    total_questions = 0
-    total_images = 0
-    
+    paths = []
+    missing_count = 0
     for file_info in files_to_import:
-        year = file_info['year']
-        success = await import_single_year(year, db, overwrite)
-        
-        if success:
-            success_count += 1
-            total_questions += file_info['total_questions']
-            total_images += file_info['total_images']
+        data_file = data_dir / f"广东_高数_{file_info['year']}.json"
+        if data_file.exists():
+            paths.append(data_file)
         else:
-            fail_count += 1
+            print(f"❌ 文件不存在: {data_file}")
+            missing_count += 1
+    
+    print(f"📊 准备导入 {len(paths)} 个年份")
+    print(f"{'='*60}")
+    
+    result = await db.run_sync(
+        import_paper_files, paths, overwrite, IMPORT_WORKERS, report_year, diff=diff
+    )
     
     print(f"\n{'='*60}")
-    print(f"✅ 导入完成！")
+    print("✅ 导入完成！")
     print(f"{'='*60}")
-    print(f"成功: {success_count} 年份")
-    print(f"失败: {fail_count} 年份")
-    print(f"题目: {total_questions} 道")
-    print(f"图片: {total_images} 张")
+    print(result.message)
+    if missing_count:
+        print(f"缺失: {missing_count} 年份")
+    print(f"题目: {result.questions_imported} 道")
+    print(f"图片: {result.images_imported} 张")
     print(f"{'='*60}")
 
 
 async def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description="按年份导入拆分后的试卷文件")
+    parser.add_argument("years", nargs="*", type=int, help="要导入的年份（默认全部）")
+    parser.add_argument("--data-dir", type=Path, default=DATA_DIR, help=f"试卷目录（默认 {DATA_DIR}）")
+    parser.add_argument("--diff", action="store_true", help="已存在的年份按内容哈希差量更新，而不是整卷覆盖")
+    args = parser.parse_args()
+
     print("="*60)
     print("  📚 题库数据导入工具")
     print("="*60)
@@ -122,26 +104,23 @@ async def main():
     init_db()
     
     # 创建数据库会话
-    db = SessionLocal()
+    db = AsyncWriteSessionLocal()
     
     try:
-        # 检查命令行参数
-        if len(sys.argv) > 1:
+        if args.years:
             # 导入指定年份
-            years = [int(y) for y in sys.argv[1:]]
-            print(f"\n🎯 导入指定年份: {years}")
-            await import_all_years(db, overwrite=True, years=years)
+            print(f"\n🎯 导入指定年份: {args.years}")
         else:
             # 导入所有年份
-            print(f"\n🎯 导入所有年份")
-            await import_all_years(db, overwrite=True)
+            print("\n🎯 导入所有年份")
+        await import_all_years(db, args.data_dir, overwrite=True, years=args.years or None, diff=args.diff)
         
     except Exception as e:
         print(f"\n❌ 导入失败: {e}")
         import traceback
         traceback.print_exc()
     finally:
-        db.close()
+        await db.close()
 
 
 if __name__ == "__main__":
@@ -149,9 +128,7 @@ if __name__ == "__main__":
     # python3 scripts/import_from_split.py          # 导入所有年份
     # python3 scripts/import_from_split.py 2023    # 只导入2023年
     # python3 scripts/import_from_split.py 2021 2022 2023  # 导入多个年份
+    # python3 scripts/import_from_split.py --diff   # 已存在的年份差量更新
+    # python3 scripts/import_from_split.py --data-dir ./data/papers 2023
     
     asyncio.run(main())
-
-
-
-
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+图片库回填脚本
+
+为数据库中尚未存入图片库的题目图片（image_hash 为空）读取原图、存入图片库
+并记录内容哈希和宽高。适用于配置图片来源之前导入的数据，以及 http(s) 图片
+（导入时不下载远程图片）。读取和下载原图时不持有数据库事务，全部处理完后一次写入。
+"""
+import sys
+import os
+import argparse
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select, update
+from app.database import SessionLocal
+from app.models.database import QuestionImage
+from app.services.images import IMAGE_FETCH_REMOTE, IMAGE_SOURCE_DIR, IMAGE_STORE_DIR, ImageIngester
+from app.services.stats import StatsDelta, apply_stats_delta
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="题目图片存入图片库")
+    parser.add_argument("--source-dir", default=IMAGE_SOURCE_DIR, help="本地图片目录（按 URL 中的文件名查找）")
+    parser.add_argument("--fetch", action="store_true", default=IMAGE_FETCH_REMOTE, help="下载 http(s) 图片")
+    args = parser.parse_args()
+
+    ingester = ImageIngester(source_dir=args.source_dir, fetch_remote=args.fetch)
+    if not ingester.enabled:
+        print("❌ 未配置图片来源，请指定 --source-dir 或 --fetch")
+        return 1
+
+    db = SessionLocal()
+    try:
+        rows = db.execute(
+            select(QuestionImage.id, QuestionImage.url).where(QuestionImage.image_hash.is_(None))
+        ).all()
+        # 结束读事务，下载期间不阻塞其它写操作
+        db.rollback()
+        print(f"🖼️  待处理图片: {len(rows)}")
+
+        updates = []
+        for image_id, url in rows:
+            fields = ingester.ingest(url)
+            if fields["image_hash"] is not None:
+                updates.append({"id": image_id, **fields})
+        if updates:
+            db.execute(update(QuestionImage), updates)
+            # 图片数不变，只递增数据版本号
+            apply_stats_delta(db, StatsDelta())
+            db.commit()
+    finally:
+        db.close()
+
+    print(f"\n{'='*60}")
+    print(f"✅ 已更新 {len(updates)} 条图片记录，存入 {ingester.stored} 张不同的图片")
+    if ingester.missing:
+        print(f"⚠️  {ingester.missing} 个 URL 找不到原图")
+    print(f"📁 图片库: {IMAGE_STORE_DIR}")
+    print(f"{'='*60}")
+    return 0
+
+
+if __name__ == "__main__":
+    # 使用示例:
+    # python3 scripts/ingest_images.py --source-dir ./mineru_output/images
+    # IMAGE_FETCH_REMOTE=true python3 scripts/ingest_images.py
+    sys.exit(main())
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+题库快照工具
+
+导出一致、压缩的数据库快照（附带 SHA-256 清单），或把快照恢复到当前数据库。
+新节点可以先恢复快照再启动服务，无需重新导入 JSON 数据。
+"""
+import sys
+import os
+import argparse
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.snapshot import (
+    SnapshotError, database_is_empty, export_snapshot, restore_snapshot, verify_snapshot
+)
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="题库快照导出/恢复")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="导出快照")
+    export_parser.add_argument("path", nargs="?", help="快照文件路径（默认写入 SNAPSHOT_DIR）")
+
+    verify_parser = subparsers.add_parser("verify", help="校验快照")
+    verify_parser.add_argument("path", help="快照文件路径")
+
+    restore_parser = subparsers.add_parser("restore", help="恢复快照到当前数据库")
+    restore_parser.add_argument("path", help="快照文件路径")
+    restore_parser.add_argument("--force", action="store_true", help="当前数据库已有数据时也覆盖")
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == "export":
+            print("📦 导出快照...")
+            manifest = export_snapshot(Path(args.path) if args.path else None)
+        elif args.command == "verify":
+            print("🔍 校验快照...")
+            manifest = verify_snapshot(Path(args.path))
+        else:
+            if not args.force and not database_is_empty():
+                print("❌ 当前数据库已有数据，如需覆盖请加 --force")
+                return 1
+            print("📥 恢复快照...")
+            manifest = restore_snapshot(Path(args.path))
+    except SnapshotError as e:
+        print(f"❌ {e}")
+        return 1
+
+    print(f"\n{'='*60}")
+    print(f"✅ 完成: {manifest['path']}")
+    if manifest.get("sha256"):
+        print(f"🔑 SHA-256: {manifest['sha256']}")
+    if manifest.get("size_bytes"):
+        print(f"💾 大小: {manifest['size_bytes'] / 1024 / 1024:.1f} MB")
+    for table, count in manifest["rows"].items():
+        print(f"   {table}: {count}")
+    print(f"{'='*60}")
+    return 0
+
+
+if __name__ == "__main__":
+    # 使用示例:
+    # python3 scripts/snapshot.py export                       # 导出到 SNAPSHOT_DIR
+    # python3 scripts/snapshot.py export /backup/bank.db       # 导出到指定路径
+    # python3 scripts/snapshot.py verify /backup/bank.db       # 校验快照
+    # python3 scripts/snapshot.py restore /backup/bank.db      # 恢复到空数据库
+    sys.exit(main())